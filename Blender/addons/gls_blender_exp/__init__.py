@@ -13,22 +13,41 @@ bl_info = {
     "category": "Import-Export",
 }
 
-import bpy
-from bpy.types import AddonPreferences
 import json, os
-import bpy.app.handlers as _h
 import atexit
 
+try:
+    import bpy
+    from bpy.types import AddonPreferences
+    import bpy.app.handlers as _h
+except ImportError:
+    # пакет импортирован вне Blender (процессы запекания): доступны только модули без bpy
+    bpy = None
 
-class GSLAddonPreferences(AddonPreferences):
-    bl_idname = __name__
+def _on_debug_endpoints(self, context):
+    from . import profiling
+    profiling.enabled = bool(self.debug_endpoints)
 
-    def draw(self, context):
-        pass
 
-classes = (
-    GSLAddonPreferences,
-)
+if bpy is not None:
+    class GSLAddonPreferences(AddonPreferences):
+        bl_idname = __name__
+
+        debug_endpoints: bpy.props.BoolProperty(  # type: ignore[valid-type]
+            name="Debug Endpoints",
+            description="Serve /debug/profile and /debug/memory (cProfile and tracemalloc capture windows)",
+            default=False,
+            update=_on_debug_endpoints,
+        )
+
+        def draw(self, context):
+            self.layout.prop(self, "debug_endpoints")
+
+    classes = (
+        GSLAddonPreferences,
+    )
+else:
+    classes = ()
 
 def _on_blender_quit(dummy):
     try:
@@ -37,14 +56,27 @@ def _on_blender_quit(dummy):
     except Exception:
         pass
 
-def register():
-    for cls in classes:
-        bpy.utils.register_class(cls)
+def _deferred_start():
+    # Сервер тянет за собой экспортёр, numpy и т.д.: это не должно задерживать запуск Blender
     try:
-        from . import net_server  
+        from . import net_server
         net_server.launch_server()
     except Exception as e:
         print(f"[GSL Exporter] Failed to start HTTP server: {e}")
+    return None
+
+
+def register():
+    for cls in classes:
+        bpy.utils.register_class(cls)
+    try:
+        prefs = bpy.context.preferences.addons[__name__].preferences
+        _on_debug_endpoints(prefs, bpy.context)
+    except Exception:
+        pass
+    from .config import SERVER_START_DELAY
+    # persistent: иначе загрузка .blend из командной строки снимет таймер до первого тика
+    bpy.app.timers.register(_deferred_start, first_interval=SERVER_START_DELAY, persistent=True)
 
     # Регистрируем обработчик выхода Blender (разные версии API)
     if hasattr(_h, "quit_pre"):
@@ -55,6 +87,8 @@ def register():
         atexit.register(_on_blender_quit, None)
 
 def unregister():
+    if bpy.app.timers.is_registered(_deferred_start):
+        bpy.app.timers.unregister(_deferred_start)
     try:
         from . import net_server
         net_server.stop_server()
@@ -0,0 +1,908 @@
+# SPDX-FileCopyrightText: 2025 D.Jorkin
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+asyncio-ядро сервера GSL (config.SERVER_CORE = "asyncio").
+
+Один фоновый поток с циклом событий вместо потока на соединение: простаивающие
+keep-alive соединения и подписчики почти ничего не стоят. HTTP-контракт тот же,
+что у server.py (/link, /batch, /image, /instance, /metrics, /handlers, /debug/*),
+плюс WebSocket /subscribe:
+
+    → {"op": "subscribe", "materials": ["Mat", ...] | "*", "options": {"lod": 1},
+       "rev": {"Mat": "<revision>"}, "payload": true}
+    → {"op": "unsubscribe", "materials": ["Mat", ...] | "*"}
+    ← {"event": "subscribed", "materials": [...]}
+    ← {"event": "changed", "material": "Mat", "revision": "...", "payload": {...}}
+    ← {"event": "missing", "materials": [...]}  — таких материалов в сцене нет
+
+payload — то же, что отдаёт /link: полный или дельта от последней ревизии,
+полученной этим подписчиком. Изменения приходят из depsgraph_update_post,
+копятся SUBSCRIBE_DEBOUNCE и экспортируются один раз на набор опций, сколько бы
+ни было подписчиков. Медленный подписчик не тормозит остальных: у каждого своя
+очередь, где новый payload материала заменяет неотправленный старый; кто не
+читает WS_SEND_TIMEOUT или копит больше WS_MAX_PENDING материалов, отключается.
+
+В главный поток Blender всё (экспорт, подписки, пиксели для постобработки)
+ходит через один MainThreadDispatcher с постоянным таймером.
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import collections
+import concurrent.futures
+import hashlib
+import json
+import os
+import socket
+import struct
+import threading
+import time
+from email.utils import formatdate
+from http import HTTPStatus
+from typing import Optional
+from urllib.parse import urlparse, parse_qs
+
+try:
+    import bpy  # type: ignore
+except Exception:
+    bpy = None  # type: ignore
+
+from .config import HOST, PORT, PORT_RANGE, LINK_TIMEOUT, BATCH_TIMEOUT, DEBUG_TOP
+from .config import KEEPALIVE_TIMEOUT, KEEPALIVE_MAX_REQUESTS, ASYNC_MAX_CONNECTIONS
+from .config import DISPATCH_INTERVAL, DISPATCH_BUDGET, SUBSCRIBE_DEBOUNCE
+from .config import WS_MAX_PENDING, WS_WRITE_BUFFER, WS_SEND_TIMEOUT, WS_PING_INTERVAL, WS_MAX_MESSAGE
+from .server import TRACE_HEADER, instance_info, json_response, trace_id, known_revisions
+from .server import server_started, server_stopped, _endpoint, _query_flag
+from . import exporter
+from . import metrics
+from . import options
+from . import profiling
+from . import recorder
+from . import registry
+from . import revisions
+from . import textures
+
+_IMAGE_CHUNK = 1 << 20
+_EVENT_CACHE = 256
+_MAX_DRAIN = 1 << 16
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_WS_CONT, _WS_TEXT, _WS_BINARY, _WS_CLOSE, _WS_PING, _WS_PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+
+_core: Optional["AsyncServer"] = None
+
+
+#region Main thread
+
+class MainThreadDispatcher:
+    """Очередь задач для главного потока Blender, которую разбирает один постоянный таймер."""
+
+    def __init__(self):
+        self._tasks: collections.deque = collections.deque()
+        self._running = False
+        # bpy.app.timers сравнивает функции по идентичности: привязанный метод берётся один раз
+        self._timer = self._tick
+
+    def submit(self, fn) -> concurrent.futures.Future:
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        self._tasks.append((fn, future))
+        metrics.DISPATCH_QUEUE.inc()
+        return future
+
+    async def run(self, fn, timeout: float):
+        future = self.submit(fn)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            future.cancel()  # ещё не начатая задача так и не займёт главный поток
+            raise
+
+    def start(self) -> None:
+        self._running = True
+        if bpy is not None and not bpy.app.timers.is_registered(self._timer):
+            bpy.app.timers.register(self._timer, first_interval=0.0, persistent=True)
+
+    def stop(self) -> None:
+        self._running = False
+        if bpy is not None and bpy.app.timers.is_registered(self._timer):
+            bpy.app.timers.unregister(self._timer)
+        while self._tasks:
+            _, future = self._tasks.popleft()
+            metrics.DISPATCH_QUEUE.dec()
+            future.cancel()
+
+    def _tick(self):
+        if not self._running:
+            return None
+        deadline = time.perf_counter() + DISPATCH_BUDGET
+        while self._tasks:
+            fn, future = self._tasks.popleft()
+            metrics.DISPATCH_QUEUE.dec()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn())
+            except BaseException as e:
+                future.set_exception(e)
+            # остаток очереди — в следующий проход, чтобы интерфейс Blender не замирал
+            if time.perf_counter() >= deadline:
+                break
+        return 0.0 if self._tasks else DISPATCH_INTERVAL
+
+#endregion
+
+
+#region HTTP
+
+class _Request:
+    __slots__ = ("method", "target", "version", "headers", "close", "status")
+
+    def __init__(self, method: str, target: str, version: str, headers: dict):
+        self.method, self.target, self.version, self.headers = method, target, version, headers
+        connection = headers.get("connection", "").lower()
+        if version == "HTTP/1.1":
+            self.close = "close" in connection
+        else:
+            self.close = "keep-alive" not in connection
+        self.status = 0
+
+    @classmethod
+    def parse(cls, head: bytes) -> Optional["_Request"]:
+        lines = head.decode("latin-1").split("\r\n")
+        parts = lines[0].split()
+        if len(parts) != 3 or not parts[2].startswith("HTTP/1."):
+            return None
+        headers = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, sep, value = line.partition(":")
+            if not sep:
+                return None
+            headers[name.strip().lower()] = value.strip()
+        return cls(parts[0], parts[1], parts[2], headers)
+
+    def is_websocket(self) -> bool:
+        return (self.headers.get("upgrade", "").lower() == "websocket"
+                and "upgrade" in self.headers.get("connection", "").lower())
+
+
+class AsyncServer:
+    def __init__(self):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.dispatcher = MainThreadDispatcher()
+        self.hub = SubscriptionHub(self)
+        self.port = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stopped: Optional[asyncio.Event] = None
+        self._writers: set = set()
+        self._keepalive = 0
+        # постобработка (упаковка, запекание, текстуры) и окна /debug блокируют поток — им небольшой пул
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="gsl-post")
+
+    def start(self, host: str = HOST, port: Optional[int] = None) -> int:
+        """Поднимает цикл событий в фоновом потоке; port=None — первый свободный из PORT … PORT_RANGE."""
+        ready = threading.Event()
+        errors: list = []
+        self._thread = threading.Thread(target=self._run, args=(host, port, ready, errors), daemon=True,
+                                        name="gsl-asyncio")
+        self._thread.start()
+        ready.wait()
+        if errors:
+            raise errors[0]
+        return self.port
+
+    def stop(self) -> None:
+        if self.loop is not None and self._stopped is not None:
+            self.loop.call_soon_threadsafe(self._stopped.set)
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        self._thread = None
+        self.dispatcher.stop()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, host: str, port: Optional[int], ready: threading.Event, errors: list) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self.loop = loop
+        try:
+            loop.run_until_complete(self._main(host, port, ready, errors))
+        finally:
+            ready.set()
+            loop.close()
+
+    async def _main(self, host: str, port: Optional[int], ready: threading.Event, errors: list) -> None:
+        self._stopped = asyncio.Event()
+        try:
+            server = await self._bind(host, port)
+        except OSError as e:
+            errors.append(e)
+            return
+        ready.set()
+        async with server:
+            await self._stopped.wait()
+            server.close()
+            for writer in list(self._writers):
+                writer.transport.abort()
+            await self.hub.close()
+
+    async def _bind(self, host: str, port: Optional[int]):
+        ports = [port] if port is not None else range(PORT, PORT + max(1, PORT_RANGE))
+        last_error: Optional[OSError] = None
+        for candidate in ports:
+            try:
+                server = await asyncio.start_server(self._handle_connection, host, candidate,
+                                                    reuse_address=os.name != "nt")
+            except OSError as e:
+                last_error = e
+                continue
+            self.port = server.sockets[0].getsockname()[1]
+            return server
+        raise last_error or OSError(f"no free port in {PORT}..{PORT + PORT_RANGE - 1}")
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        accepted = time.perf_counter()
+        keepalive = self._keepalive < ASYNC_MAX_CONNECTIONS
+        self._keepalive += keepalive
+        self._writers.add(writer)
+        metrics.HTTP_CONNECTIONS.inc(1, "keepalive" if keepalive else "single")
+        metrics.HTTP_OPEN_CONNECTIONS.inc()
+        served = 0
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEPALIVE_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    break
+                request = _Request.parse(head)
+                if request is None:
+                    await self._error(writer, None, 400)
+                    break
+                started = time.perf_counter()
+                if served == 0:
+                    metrics.HTTP_ACCEPT.observe(started - accepted)
+                served += 1
+                try:
+                    drained = await self._drain_body(reader, request)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+                    break  # тело так и не пришло: отвечать некому
+                if not keepalive or served >= KEEPALIVE_MAX_REQUESTS or not drained:
+                    request.close = True
+                if request.is_websocket() and urlparse(request.target).path == "/subscribe":
+                    # соединение переходит подписчику до конца
+                    await self.hub.serve(reader, writer, request)
+                    break
+                path = urlparse(request.target).path
+                try:
+                    await self._route(request, writer)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    raise
+                except Exception as e:
+                    # как у потокового сервера: падает один запрос, не цикл событий
+                    print(f"[GSL Exporter] {request.method} {request.target} failed: {e!r}")
+                    request.close = True
+                    if request.status == 0:
+                        await self._error(writer, request, 500)
+                finally:
+                    endpoint = _endpoint(path)
+                    metrics.HTTP_REQUESTS.inc(1, endpoint, str(request.status or 500))
+                    metrics.HTTP_DURATION.observe(time.perf_counter() - started, endpoint)
+                if request.close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            # подписчик или ответ, уже начатый к моменту ошибки: остаётся только закрыть соединение
+            print(f"[GSL Exporter] Connection failed: {e!r}")
+        finally:
+            self._keepalive -= keepalive
+            self._writers.discard(writer)
+            metrics.HTTP_OPEN_CONNECTIONS.dec()
+            metrics.HTTP_CONNECTION_REQUESTS.observe(served)
+            writer.close()
+
+    async def _drain_body(self, reader: asyncio.StreamReader, request: _Request) -> bool:
+        # как в server.py: тело GET не должно стать началом следующего запроса
+        if request.headers.get("transfer-encoding", "").lower() == "chunked":
+            return False
+        try:
+            length = int(request.headers.get("content-length") or 0)
+        except ValueError:
+            return False
+        if length > _MAX_DRAIN:
+            return False
+        if length > 0:
+            await asyncio.wait_for(reader.readexactly(length), KEEPALIVE_TIMEOUT)
+        return True
+
+    async def _respond(self, writer: asyncio.StreamWriter, request: Optional[_Request], status: int,
+                       headers: list, body: bytes = b"") -> None:
+        close = request is None or request.close
+        if request is not None:
+            request.status = status
+        lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}", f"Date: {formatdate(usegmt=True)}"]
+        lines += [f"{name}: {value}" for name, value in headers]
+        if not any(name.lower() == "content-length" for name, _ in headers):
+            lines.append(f"Content-Length: {len(body)}")
+        if close:
+            lines.append("Connection: close")
+        else:
+            lines.append(f"Keep-Alive: timeout={KEEPALIVE_TIMEOUT:g}")
+            if request.version == "HTTP/1.0":
+                lines.append("Connection: keep-alive")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        if body and (request is None or request.method != "HEAD"):
+            writer.write(body)
+        await writer.drain()
+
+    async def _error(self, writer: asyncio.StreamWriter, request: Optional[_Request], status: int,
+                     message: str = "") -> None:
+        body = f"{status} {message or HTTPStatus(status).phrase}\n".encode()
+        await self._respond(writer, request, status, [("Content-Type", "text/plain; charset=utf-8")], body)
+
+    async def _send_json(self, writer: asyncio.StreamWriter, request: _Request, data: dict, endpoint: str,
+                         timings: Optional[dict] = None, started: Optional[float] = None) -> int:
+        payload, headers = json_response(data, endpoint, timings, started)
+        await self._respond(writer, request, 200, headers, payload)
+        return len(payload)
+
+    async def _route(self, request: _Request, writer: asyncio.StreamWriter) -> None:
+        parsed = urlparse(request.target)
+        query = parse_qs(parsed.query)
+        path = parsed.path
+        if request.method == "HEAD":
+            if path.startswith("/image/"):
+                await self._image(request, writer, path[len("/image/"):])
+            else:
+                await self._error(writer, request, 404)
+            return
+        if request.method != "GET":
+            request.close = True
+            await self._error(writer, request, 501)
+            return
+        if path == "/link":
+            await self._link(request, writer, query)
+        elif path == "/batch":
+            await self._batch(request, writer, query)
+        elif path.startswith("/image/"):
+            await self._image(request, writer, path[len("/image/"):])
+        elif path == "/instance":
+            await self._send_json(writer, request, instance_info(), "/instance")
+        elif path == "/metrics":
+            await self._respond(writer, request, 200, [("Content-Type", "text/plain; version=0.0.4; charset=utf-8")],
+                                metrics.render().encode())
+        elif path == "/handlers":
+            await self._send_json(writer, request, {"handlers": registry.handler_stats()}, "/handlers")
+            if _query_flag(query, "reset"):
+                registry.reset_handler_stats()
+        elif path in ("/debug/profile", "/debug/memory"):
+            await self._debug(request, writer, path, query)
+        else:
+            await self._error(writer, request, 404)
+
+    async def _link(self, request: _Request, writer: asyncio.StreamWriter, query: dict) -> None:
+        started = time.perf_counter()
+        trace = trace_id(request.headers.get(TRACE_HEADER.lower()), query)
+        timings: dict = {}
+        data = await self.export_link(options.from_query(query), timings)
+        if "error" not in data:
+            data = revisions.resolve(data, known_revisions(query))
+        data["trace"] = trace
+        sent = await self._send_json(writer, request, data, "/link", timings, started)
+        recorder.record(request.target, data, sent, started)
+
+    async def _batch(self, request: _Request, writer: asyncio.StreamWriter, query: dict) -> None:
+        started = time.perf_counter()
+        trace = trace_id(request.headers.get(TRACE_HEADER.lower()), query)
+        timings: dict = {}
+        data = await self.export_batch(query.get("material", []) or None, options.from_query(query), timings,
+                                       group=_query_flag(query, "group"), library=_query_flag(query, "library"))
+        data["trace"] = trace
+        sent = await self._send_json(writer, request, data, "/batch", timings, started)
+        recorder.record(request.target, data, sent, started)
+
+    async def _image(self, request: _Request, writer: asyncio.StreamWriter, digest: str) -> None:
+        entry = textures.lookup(digest)
+        if entry is None:
+            await self._error(writer, request, 404)
+            return
+        try:
+            view, closer = textures.open_source(entry)
+        except OSError:
+            await self._error(writer, request, 410)
+            return
+        try:
+            size = len(view)
+            try:
+                byte_range = textures.parse_range(request.headers.get("range"), size)
+            except ValueError:
+                await self._respond(writer, request, 416, [("Content-Range", f"bytes */{size}")])
+                return
+            start, end = byte_range if byte_range else (0, size - 1)
+            headers = [("Content-Type", "application/octet-stream"), ("Accept-Ranges", "bytes"),
+                       ("ETag", f'"{digest}"'), ("Cache-Control", "public, max-age=31536000, immutable"),
+                       ("Content-Length", str(end - start + 1))]
+            if byte_range:
+                headers.append(("Content-Range", f"bytes {start}-{end}/{size}"))
+            await self._respond(writer, request, 206 if byte_range else 200, headers)
+            if request.method == "HEAD":
+                return
+            for pos in range(start, end + 1, _IMAGE_CHUNK):
+                # копия: буфер транспорта может пережить view над mmap
+                writer.write(bytes(view[pos:min(pos + _IMAGE_CHUNK, end + 1)]))
+                await writer.drain()
+        finally:
+            view.release()
+            if closer is not None:
+                closer.close()
+
+    async def _debug(self, request: _Request, writer: asyncio.StreamWriter, path: str, query: dict) -> None:
+        if not profiling.enabled:
+            await self._error(writer, request, 403, "Debug endpoints are disabled in the add-on preferences")
+            return
+        try:
+            seconds = float(query.get("seconds", ["10"])[0])
+            limit = int(query.get("limit", [str(DEBUG_TOP)])[0])
+            if path == "/debug/profile":
+                capture = lambda: profiling.capture_profile(seconds, query.get("sort", ["cumulative"])[0], limit)
+            else:
+                frames = int(query.get("frames", ["1"])[0])
+                capture = lambda: profiling.capture_memory(seconds, limit, frames)
+            # окно спит seconds: в пуле, а не в цикле событий
+            text = await self.loop.run_in_executor(self._pool, capture)
+        except ValueError:
+            await self._error(writer, request, 400, "seconds, limit and frames must be numbers")
+            return
+        except profiling.CaptureBusy as e:
+            await self._error(writer, request, 409, str(e))
+            return
+        await self._respond(writer, request, 200, [("Content-Type", "text/plain; charset=utf-8")], text.encode())
+
+    #region Export
+
+    async def main_thread(self, task, timeout: float, op: str, timings: Optional[dict] = None) -> dict:
+        """Как exporter._run_on_main_thread, но ожидание не занимает поток."""
+        if bpy is None:
+            return {"error": "bpy unavailable"}
+        phases: dict = {}
+        queued = time.perf_counter()
+        try:
+            data = await self.dispatcher.run(lambda: exporter.main_thread_call(task, op, queued, phases), timeout)
+        except asyncio.TimeoutError:
+            metrics.TIMEOUTS.inc(1, op)
+            return {"error": "timeout"}
+        if timings is not None:
+            timings.update(phases)
+        return data
+
+    async def export_link(self, opts: dict, timings: Optional[dict] = None) -> dict:
+        deferred: dict = {}
+        data = await self.main_thread(exporter.link_task(opts, deferred), LINK_TIMEOUT, "link", timings)
+        if deferred and "error" not in data:
+            data = await self.loop.run_in_executor(self._pool, exporter.finish_link, data, deferred, opts, timings)
+        return data
+
+    async def export_batch(self, names: Optional[list[str]], opts: dict, timings: Optional[dict] = None,
+                           group: bool = False, library: bool = False) -> dict:
+        deferred: dict = {}
+        data = await self.main_thread(exporter.batch_task(names, opts, deferred), BATCH_TIMEOUT, "batch", timings)
+        if "materials" in data and (deferred or group or library):
+            data = await self.loop.run_in_executor(self._pool, exporter.finish_batch, data, deferred, group,
+                                                   library, opts, timings)
+        return data
+
+    #endregion
+
+#endregion
+
+
+#region WebSocket
+
+class _ProtocolError(Exception):
+    pass
+
+
+class _SlowConsumer(Exception):
+    pass
+
+
+def _ws_frame(opcode: int, length: int) -> bytes:
+    if length < 126:
+        return struct.pack("!BB", 0x80 | opcode, length)
+    if length < 1 << 16:
+        return struct.pack("!BBH", 0x80 | opcode, 126, length)
+    return struct.pack("!BBQ", 0x80 | opcode, 127, length)
+
+
+async def _ws_read_frame(reader: asyncio.StreamReader) -> tuple[bool, int, bytes]:
+    b1, b2 = await reader.readexactly(2)
+    if not b2 & 0x80:
+        raise _ProtocolError("client frames must be masked")
+    length = b2 & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", await reader.readexactly(8))[0]
+    if length > WS_MAX_MESSAGE:
+        raise _ProtocolError("message too big")
+    mask = await reader.readexactly(4)
+    data = await reader.readexactly(length)
+    if length:
+        key = int.from_bytes((mask * (length // 4 + 1))[:length], "big")
+        data = (int.from_bytes(data, "big") ^ key).to_bytes(length, "big")
+    return bool(b1 & 0x80), b1 & 0x0F, data
+
+
+async def _ws_read_message(reader: asyncio.StreamReader) -> tuple[int, bytes]:
+    fin, opcode, data = await _ws_read_frame(reader)
+    if opcode >= _WS_CLOSE:
+        return opcode, data
+    chunks = [data]
+    size = len(data)
+    # управляющие кадры между фрагментами наши клиенты не шлют: такое сообщение — ошибка протокола
+    while not fin:
+        fin, more_op, more = await _ws_read_frame(reader)
+        size += len(more)
+        if more_op != _WS_CONT or size > WS_MAX_MESSAGE:
+            raise _ProtocolError("bad fragmented message")
+        chunks.append(more)
+    return opcode, b"".join(chunks)
+
+
+class _Subscriber:
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.materials: set[str] = set()
+        self.all = False
+        self.options: dict = {}
+        self.key = "{}"  # опции в каноническом виде: подписчики с одинаковыми делят экспорт
+        self.payload = True
+        self.known: dict[str, str] = {}  # материал → ревизия, которую клиент уже получил
+        self.pending: "collections.OrderedDict[str, tuple[dict, float]]" = collections.OrderedDict()
+        self.wakeup = asyncio.Event()
+        self.last_seen = time.monotonic()
+        self.slow = False
+        self.closed = False
+
+    def wants(self, material: str) -> bool:
+        return self.all or material in self.materials
+
+    def push(self, material: str, payload: dict, noted: float) -> None:
+        if self.known.get(material) == payload["revision"]:
+            return
+        if material in self.pending:
+            # неотправленный payload устарел: клиенту нужен только последний
+            metrics.WS_EVENTS.inc(1, "coalesced")
+            del self.pending[material]
+        self.pending[material] = (payload, noted)
+        if len(self.pending) > WS_MAX_PENDING:
+            self.slow = True
+        self.wakeup.set()
+
+
+class SubscriptionHub:
+    def __init__(self, core: AsyncServer):
+        self.core = core
+        self.subscribers: set[_Subscriber] = set()
+        self._changed: set[str] = set()
+        self._everything = False
+        self._noted = 0.0
+        self._flush: Optional[asyncio.Task] = None
+        self._tasks: set[asyncio.Task] = set()
+        self._events: dict[tuple, bytes] = {}
+
+    def note_changed(self, names: Optional[set[str]]) -> None:
+        """Из главного потока (depsgraph, load_post); names=None — все подписки."""
+        loop = self.core.loop
+        if loop is None or not self.subscribers:
+            return
+        loop.call_soon_threadsafe(self._mark, names, time.perf_counter())
+
+    def _mark(self, names: Optional[set[str]], noted: float) -> None:
+        if names is None:
+            self._everything = True
+        else:
+            self._changed |= names
+        self._noted = self._noted or noted
+        if self._flush is None or self._flush.done():
+            self._flush = self._spawn(self._flush_later())
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def close(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        for sub in list(self.subscribers):
+            sub.closed = True
+            sub.wakeup.set()
+
+    async def _flush_later(self) -> None:
+        # изменения, пришедшие во время экспорта, уходят следующим проходом
+        while self._changed or self._everything:
+            await asyncio.sleep(SUBSCRIBE_DEBOUNCE)
+            changed, everything, noted = self._changed, self._everything, self._noted
+            self._changed, self._everything, self._noted = set(), False, 0.0
+            try:
+                await self.publish(changed, everything, noted)
+            except Exception as e:
+                print(f"[GSL Exporter] Subscription export failed: {e}")
+
+    async def publish(self, changed: set[str], everything: bool, noted: float) -> None:
+        # один экспорт на набор опций: подписчиков десятки, материал один
+        groups: dict[str, list] = {}
+        for sub in self.subscribers:
+            group = groups.setdefault(sub.key, [sub.options, set(), False])
+            if everything and sub.all:
+                group[2] = True
+            elif everything:
+                group[1] |= sub.materials
+            else:
+                group[1] |= {name for name in changed if sub.wants(name)}
+        for key, (opts, names, all_materials) in groups.items():
+            if not names and not all_materials:
+                continue
+            await self._export_and_push(None if all_materials else sorted(names), opts, key, noted)
+
+    async def _export_and_push(self, names: Optional[list[str]], opts: dict, key: str, noted: float) -> None:
+        data = await self.core.export_batch(names, opts)
+        if "materials" not in data:
+            print(f"[GSL Exporter] Subscription export failed: {data.get('error')}")
+            return
+        if data.get("missing"):
+            for sub in self.subscribers:
+                gone = [name for name in data["missing"] if sub.key == key and sub.wants(name)]
+                if gone:
+                    self._spawn(self._send_event(sub, {"event": "missing", "materials": gone}))
+        for payload in data["materials"]:
+            material = str(payload.get("material", ""))
+            if "error" in payload:
+                continue
+            full = dict(payload)
+            full["revision"] = revisions.remember(payload)
+            for sub in self.subscribers:
+                if sub.key == key and sub.wants(material):
+                    sub.push(material, full, noted)
+        metrics.WS_FANOUT.observe(time.perf_counter() - noted)
+
+    async def serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, request: _Request) -> None:
+        key = request.headers.get("sec-websocket-key", "")
+        if not key or request.headers.get("sec-websocket-version") != "13":
+            request.close = True
+            await self.core._error(writer, request, 400, "WebSocket version 13 handshake expected")
+            return
+        accept = base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+        request.status = 101
+        metrics.HTTP_REQUESTS.inc(1, "/subscribe", "101")
+        # выше этого буфера drain() ждёт клиента: так и видно медленного подписчика
+        writer.transport.set_write_buffer_limits(high=WS_WRITE_BUFFER)
+        sub = _Subscriber(writer)
+        self.subscribers.add(sub)
+        metrics.WS_CLIENTS.inc()
+        sender = self._spawn(self._sender(sub))
+        try:
+            while not sub.closed:
+                opcode, data = await _ws_read_message(reader)
+                sub.last_seen = time.monotonic()
+                if opcode == _WS_CLOSE:
+                    await self._send(sub, _WS_CLOSE, data[:2])
+                    break
+                if opcode == _WS_PING:
+                    await self._send(sub, _WS_PONG, data)
+                elif opcode == _WS_TEXT:
+                    await self._command(sub, data)
+                elif opcode == _WS_BINARY:
+                    raise _ProtocolError("binary messages are not supported")
+        except _ProtocolError as e:
+            try:
+                await self._send(sub, _WS_CLOSE, struct.pack("!H", 1002) + str(e).encode()[:120])
+            except (ConnectionError, _SlowConsumer):
+                pass
+        except (asyncio.IncompleteReadError, ConnectionError, _SlowConsumer):
+            pass
+        finally:
+            sub.closed = True
+            sub.wakeup.set()
+            sender.cancel()
+            self.subscribers.discard(sub)
+            metrics.WS_CLIENTS.dec()
+
+    async def _send(self, sub: _Subscriber, opcode: int, data: bytes) -> None:
+        sub.writer.writelines([_ws_frame(opcode, len(data)), data])
+        try:
+            await asyncio.wait_for(sub.writer.drain(), WS_SEND_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise _SlowConsumer() from None
+
+    async def _send_event(self, sub: _Subscriber, event: dict) -> None:
+        await self._send(sub, _WS_TEXT, json.dumps(event, ensure_ascii=False).encode())
+
+    def _encoded(self, material: str, payload: dict, base: Optional[str], with_payload: bool) -> bytes:
+        # подписчики с той же базовой ревизией получают одни и те же байты: дельта и JSON — один раз
+        key = (material, payload["revision"], base, with_payload)
+        data = self._events.get(key)
+        if data is None:
+            event = {"event": "changed", "material": material, "revision": payload["revision"]}
+            if with_payload:
+                event["payload"] = revisions.resolve(payload, [base] if base else [])
+            data = json.dumps(event, ensure_ascii=False).encode()
+            if len(self._events) >= _EVENT_CACHE:
+                self._events.clear()
+            self._events[key] = data
+        return data
+
+    async def _sender(self, sub: _Subscriber) -> None:
+        try:
+            while not sub.closed:
+                try:
+                    await asyncio.wait_for(sub.wakeup.wait(), WS_PING_INTERVAL)
+                except asyncio.TimeoutError:
+                    if time.monotonic() - sub.last_seen > 2 * WS_PING_INTERVAL:
+                        break  # не отвечает на ping
+                    await self._send(sub, _WS_PING, b"")
+                    continue
+                sub.wakeup.clear()
+                if sub.slow:
+                    raise _SlowConsumer()
+                while sub.pending and not sub.closed:
+                    material, (payload, noted) = sub.pending.popitem(last=False)
+                    await self._send(sub, _WS_TEXT, self._encoded(material, payload, sub.known.get(material),
+                                                                  sub.payload))
+                    sub.known[material] = payload["revision"]
+                    metrics.WS_EVENTS.inc(1, "sent")
+        except _SlowConsumer:
+            metrics.WS_EVENTS.inc(1, "slow")
+            print(f"[GSL Exporter] Dropping slow subscriber ({len(sub.pending)} materials pending)")
+            sock = sub.writer.get_extra_info("socket")
+            if sock is not None:
+                # RST вместо FIN: ядро не держит мегабайты, которые клиент так и не прочтёт
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            if not sub.closed:
+                # читатель в serve() получит ошибку и уберёт подписчика
+                sub.writer.transport.abort()
+
+    async def _command(self, sub: _Subscriber, data: bytes) -> None:
+        try:
+            msg = json.loads(data)
+        except ValueError:
+            msg = None
+        if not isinstance(msg, dict):
+            await self._send_event(sub, {"event": "error", "error": "expected a JSON object"})
+            return
+        op = msg.get("op")
+        materials = msg.get("materials", "*")
+        if isinstance(materials, str) and materials != "*":
+            materials = [materials]
+        if materials != "*" and not isinstance(materials, list):
+            await self._send_event(sub, {"event": "error", "error": "materials must be \"*\" or a list"})
+            return
+        if op == "subscribe":
+            added: Optional[set[str]]
+            if materials == "*":
+                sub.all, added = True, None
+            else:
+                added = {str(m) for m in materials} - sub.materials
+                sub.materials |= added
+            if isinstance(msg.get("options"), dict):
+                sub.options = options.from_query({k: [str(v)] for k, v in msg["options"].items()})
+                sub.key = json.dumps(sub.options, sort_keys=True)
+            sub.payload = bool(msg.get("payload", True))
+            if isinstance(msg.get("rev"), dict):
+                sub.known.update({str(k): str(v) for k, v in msg["rev"].items()})
+            await self._send_event(sub, {"event": "subscribed",
+                                         "materials": "*" if sub.all else sorted(sub.materials)})
+            # текущее состояние — как изменение: подписавшиеся вместе делят экспорт, а у кого
+            # эта ревизия уже есть (остальные подписчики, клиент с rev), push() её пропустит
+            if added is None or added:
+                self._mark(added, time.perf_counter())
+        elif op == "unsubscribe":
+            if materials == "*":
+                sub.all = False
+                sub.materials.clear()
+                sub.pending.clear()
+            else:
+                for name in materials:
+                    sub.materials.discard(str(name))
+                    if not sub.wants(str(name)):
+                        sub.pending.pop(str(name), None)
+            await self._send_event(sub, {"event": "unsubscribed",
+                                         "materials": "*" if sub.all else sorted(sub.materials)})
+        else:
+            await self._send_event(sub, {"event": "error", "error": f"unknown op {op!r}"})
+
+#endregion
+
+
+#region Blender hooks
+
+def _materials_using(tree) -> set[str]:
+    # группа узлов: материалы, где она стоит напрямую (вложенные группы не ищутся)
+    names = set()
+    for mat in bpy.data.materials:
+        node_tree = getattr(mat, "node_tree", None)
+        if node_tree is None:
+            continue
+        if node_tree == tree or any(getattr(n, "node_tree", None) == tree for n in node_tree.nodes
+                                    if getattr(n, "bl_idname", "") == "ShaderNodeGroup"):
+            names.add(mat.name)
+    return names
+
+
+def _on_depsgraph_update(scene, depsgraph=None):
+    core = _core
+    if core is None or depsgraph is None or not core.hub.subscribers:
+        return
+    names: set[str] = set()
+    for update in getattr(depsgraph, "updates", ()):
+        idb = getattr(update.id, "original", update.id)
+        kind = getattr(idb, "id_type", "")
+        if kind == "MATERIAL":
+            names.add(idb.name)
+        elif kind == "NODETREE":
+            names |= _materials_using(idb)
+    if names:
+        core.hub.note_changed(names)
+
+
+def _on_load_post(*_args):
+    if _core is not None:
+        _core.hub.note_changed(None)
+
+
+if bpy is not None and hasattr(bpy.app.handlers, "persistent"):
+    _on_depsgraph_update = bpy.app.handlers.persistent(_on_depsgraph_update)
+    _on_load_post = bpy.app.handlers.persistent(_on_load_post)
+
+
+def _hooks(install: bool) -> None:
+    if bpy is None:
+        return
+    for handlers, fn in ((bpy.app.handlers.depsgraph_update_post, _on_depsgraph_update),
+                         (bpy.app.handlers.load_post, _on_load_post)):
+        if install and fn not in handlers:
+            handlers.append(fn)
+        elif not install and fn in handlers:
+            handlers.remove(fn)
+
+#endregion
+
+
+def launch_server(host: str = HOST, port: Optional[int] = None) -> AsyncServer:
+    global _core
+    if _core is not None:
+        return _core
+    core = AsyncServer()
+    # диспетчер раньше сервера: первый же запрос может пойти в главный поток
+    exporter.set_dispatcher(core.dispatcher)
+    core.dispatcher.start()
+    try:
+        bound = core.start(host, port)
+    except OSError:
+        exporter.set_dispatcher(None)
+        core.dispatcher.stop()
+        raise
+    _core = core
+    _hooks(True)
+    server_started(bound)
+    return core
+
+
+def stop_server() -> None:
+    global _core
+    core, _core = _core, None
+    if core is None:
+        return
+    _hooks(False)
+    exporter.set_dispatcher(None)
+    core.stop()
+    server_stopped()
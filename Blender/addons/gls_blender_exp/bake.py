@@ -0,0 +1,493 @@
+# SPDX-FileCopyrightText: 2025 D.Jorkin
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Офлайн-запекание процедурных подграфов (options: bake=<разрешение>).
+
+Находит в payload дорогие подграфы (шум, Color Ramp, цепочки Mix), которые
+умеет считать evaluator и которые зависят только от UV/Generated, считает их в
+текстуру по тайлам в пуле процессов и подменяет узлом Image Texture с путём к
+PNG. Дальше работает обычный путь tex_image_handler → ShaderSaver.
+
+capture() вызывается в главном потоке Blender (меш и пути), bake_materials() —
+в потоке запроса. Generated запекается через UV-развёртку меша, поэтому без
+меша с UV такие подграфы остаются процедурными.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import struct
+import tempfile
+import zlib
+from typing import Optional
+
+try:
+    import bpy  # type: ignore
+except Exception:  # pragma: no cover
+    bpy = None  # type: ignore
+
+try:
+    import numpy as np  # type: ignore
+except Exception:  # pragma: no cover
+    np = None  # type: ignore
+
+from .config import BAKE_DIR_NAME, BAKE_TILE, BAKE_MARGIN, BAKE_MIN_COST
+from .evaluator import GraphEvaluator, TEX_COORD_OUTPUTS, convert, is_supported
+from .utils import parse_link, sanitize
+from . import options
+from . import textures
+from . import workers
+
+# Грубая стоимость узла для выбора подграфов; шум дополнительно растёт с detail
+_BAKE_WEIGHTS: dict[str, float] = {
+    "TexNoiseModule": 2.0,
+    "TexWhiteNoiseModule": 1.0,
+    "ColorRampModule": 1.0,
+    "MixModule": 1.0,
+    "TexCoordModule": 0.0,
+}
+_DEFAULT_WEIGHT = 0.25
+
+_BAKE_SPACES = ("uv", "generated")
+# Текстуры с незапитанным Vector читают Generated (vector_or_generated)
+_IMPLICIT_GENERATED = ("TexNoiseModule", "TexWhiteNoiseModule")
+_TEX_COORD_NAMES = ["Generated", "Normal", "UV", "Object", "Camera", "Window", "Reflection"]
+_UV_OUTPUT = 2
+
+_RANGE_EPS = 1e-4
+
+
+#region Selection
+
+def _node_cost(node: dict) -> float:
+    cls = node.get("class", "")
+    cost = _BAKE_WEIGHTS.get(cls, _DEFAULT_WEIGHT)
+    if cls == "TexNoiseModule":
+        cost += float(node.get("params", {}).get("detail", 2.0))
+    return cost
+
+
+class _Analysis:
+    """
+    Для каждого узла: можно ли его вычислить на CPU целиком, от каких координат
+    он зависит, какие узлы входят в его поддерево и сколько оно стоит.
+    """
+
+    def __init__(self, payload: dict):
+        self.nodes: dict[str, dict] = {n["id"]: n for n in payload.get("nodes", [])}
+        self.upstream: dict[str, list[tuple[int, str, int]]] = {nid: [] for nid in self.nodes}
+        for link in payload.get("links", []):
+            f, o, t, i = parse_link(link)
+            if f in self.nodes and t in self.nodes:
+                self.upstream[t].append((i, f, o))
+        self._info: dict[str, Optional[tuple[frozenset, frozenset, float]]] = {}
+        self._active: set[str] = set()
+
+    def info(self, nid: str) -> Optional[tuple[frozenset, frozenset, float]]:
+        """(координаты, поддерево, стоимость) или None, если узел не запекается."""
+        if nid in self._info:
+            return self._info[nid]
+        node = self.nodes[nid]
+        cls = node.get("class", "")
+        if not is_supported(cls) or nid in self._active:
+            self._info[nid] = None
+            return None
+
+        self._active.add(nid)
+        spaces: set[str] = set()
+        closure: set[str] = {nid}
+        result: Optional[tuple] = None
+        try:
+            for _, f, o in self.upstream[nid]:
+                if self.nodes[f].get("class") == "TexCoordModule":
+                    name = TEX_COORD_OUTPUTS[o] if 0 <= o < len(TEX_COORD_OUTPUTS) else ""
+                    if name not in _BAKE_SPACES:
+                        break
+                    spaces.add(name)
+                    closure.add(f)
+                    continue
+                sub = self.info(f)
+                if sub is None:
+                    break
+                spaces |= sub[0]
+                closure |= sub[1]
+            else:
+                dims = int(node.get("params", {}).get("dimensions", 2))
+                if cls in _IMPLICIT_GENERATED and dims != 0 and not any(i == 0 for i, _, _ in self.upstream[nid]):
+                    spaces.add("generated")
+                cost = sum(_node_cost(self.nodes[c]) for c in closure)
+                result = (frozenset(spaces), frozenset(closure), cost)
+        finally:
+            self._active.discard(nid)
+        self._info[nid] = result
+        return result
+
+    def bakeable(self, nid: str, has_mesh: bool) -> bool:
+        info = self.info(nid)
+        if info is None:
+            return False
+        spaces, _, cost = info
+        if not spaces or cost < BAKE_MIN_COST:
+            return False
+        return has_mesh or "generated" not in spaces
+
+
+def find_targets(payload: dict, has_mesh: bool = True) -> list[tuple[str, int]]:
+    """
+    Выходы (узел, индекс) на границе запекаемой области: источник запекается,
+    а потребитель — нет (BSDF, неподдерживаемый узел или слишком дешёвый).
+    """
+    an = _Analysis(payload)
+    targets: list[tuple[str, int]] = []
+    for link in payload.get("links", []):
+        f, o, t, _ = parse_link(link)
+        if f not in an.nodes or t not in an.nodes or (f, o) in targets:
+            continue
+        if an.bakeable(f, has_mesh) and not an.bakeable(t, has_mesh):
+            targets.append((f, o))
+    return targets
+
+#endregion
+
+
+#region Coordinates
+
+def _read_mesh(obj) -> Optional[dict]:
+    me = obj.data
+    uv_layer = me.uv_layers.active if me.uv_layers else None
+    if uv_layer is None:
+        return None
+    me.calc_loop_triangles()
+    tri = np.empty(len(me.loop_triangles) * 3, dtype=np.int32)
+    me.loop_triangles.foreach_get("loops", tri)
+    uv = np.empty(len(me.loops) * 2, dtype=np.float32)
+    uv_layer.data.foreach_get("uv", uv)
+    vi = np.empty(len(me.loops), dtype=np.int32)
+    me.loops.foreach_get("vertex_index", vi)
+    co = np.empty(len(me.vertices) * 3, dtype=np.float32)
+    me.vertices.foreach_get("co", co)
+    if not len(tri) or not len(co):
+        return None
+
+    # Generated = позиция, нормированная в AABB меша (normalize_to_aabb в Tex_Cord)
+    co = co.reshape(-1, 3).astype(np.float64)
+    lo, hi = co.min(axis=0), co.max(axis=0)
+    size = np.where(hi - lo > 1e-8, hi - lo, 1.0)
+    orco = (co - lo) / size
+
+    tri_uv = uv.reshape(-1, 2)[tri].reshape(-1, 3, 2).astype(np.float64)
+    tri_gen = orco[vi[tri]].reshape(-1, 3, 3)
+    key = hashlib.sha1(tri_uv.tobytes() + tri_gen.tobytes()).hexdigest()[:12]
+    return {"uv": tri_uv, "generated": tri_gen, "key": key}
+
+
+def _mesh_object(mat):
+    obj = getattr(bpy.context, "object", None)
+    for o in ([obj] if obj is not None else []) + list(bpy.data.objects):
+        if getattr(o, "type", "") != "MESH":
+            continue
+        if any(slot.material == mat for slot in o.material_slots):
+            return o
+    return None
+
+
+def _bake_dir() -> str:
+    custom = options.get("bake_dir")
+    if custom:
+        return custom
+    if bpy is not None and bpy.data.filepath:
+        return bpy.path.abspath("//" + BAKE_DIR_NAME)
+    return os.path.join(tempfile.gettempdir(), BAKE_DIR_NAME)
+
+
+def capture(payload: dict) -> dict:
+    """Всё, что для запекания нужно прочитать из bpy; вызывать в главном потоке."""
+    ctx: dict = {"dir": _bake_dir(), "mesh": None}
+    if bpy is None or np is None:
+        return ctx
+    mat = bpy.data.materials.get(payload.get("material", ""))
+    if mat is None:
+        return ctx
+    an = _Analysis(payload)
+    if any("generated" in an.info(f)[0] for f, _ in find_targets(payload)):
+        obj = _mesh_object(mat)
+        if obj is not None:
+            ctx["mesh"] = _read_mesh(obj)
+    return ctx
+
+
+def _dilate(img, mask, steps: int) -> None:
+    # расширяем острова средним соседей, чтобы фильтрация на швах не тянула пустоту
+    h, w = mask.shape
+    for _ in range(steps):
+        pm = np.pad(mask, 1)
+        pv = np.pad(img, ((1, 1), (1, 1), (0, 0)))
+        acc = np.zeros_like(img)
+        cnt = np.zeros(mask.shape)
+        for dr, dc in ((0, 1), (2, 1), (1, 0), (1, 2)):
+            m = pm[dr:dr + h, dc:dc + w]
+            acc += pv[dr:dr + h, dc:dc + w] * m[..., None]
+            cnt += m
+        grow = ~mask & (cnt > 0)
+        if not grow.any():
+            break
+        img[grow] = acc[grow] / cnt[grow][:, None]
+        mask |= grow
+
+
+def generated_map(mesh: dict, resolution: int):
+    """Растеризация треугольников в UV: (res, res, 3) координат Generated на тексель."""
+    res = resolution
+    out = np.zeros((res, res, 3))
+    mask = np.zeros((res, res), dtype=bool)
+    # центр текселя (c, r) ↔ x = c, y = r; строка 0 — верх картинки (v = 1)
+    px = mesh["uv"][..., 0] * res - 0.5
+    py = (1.0 - mesh["uv"][..., 1]) * res - 0.5
+    gen = mesh["generated"]
+    for t in range(px.shape[0]):
+        (x0, x1, x2), (y0, y1, y2) = px[t], py[t]
+        d = (y1 - y2) * (x0 - x2) + (x2 - x1) * (y0 - y2)
+        if abs(d) < 1e-12:
+            continue
+        c0, c1 = max(int(np.ceil(min(x0, x1, x2))), 0), min(int(np.floor(max(x0, x1, x2))), res - 1)
+        r0, r1 = max(int(np.ceil(min(y0, y1, y2))), 0), min(int(np.floor(max(y0, y1, y2))), res - 1)
+        if c0 > c1 or r0 > r1:
+            continue
+        gx, gy = np.meshgrid(np.arange(c0, c1 + 1), np.arange(r0, r1 + 1))
+        w0 = ((y1 - y2) * (gx - x2) + (x2 - x1) * (gy - y2)) / d
+        w1 = ((y2 - y0) * (gx - x2) + (x0 - x2) * (gy - y2)) / d
+        w2 = 1.0 - w0 - w1
+        inside = (w0 >= -1e-6) & (w1 >= -1e-6) & (w2 >= -1e-6)
+        if not inside.any():
+            continue
+        g = gen[t]
+        vals = w0[inside, None] * g[0] + w1[inside, None] * g[1] + w2[inside, None] * g[2]
+        out[gy[inside], gx[inside]] = vals
+        mask[gy[inside], gx[inside]] = True
+    _dilate(out, mask, BAKE_MARGIN)
+    return out
+
+
+def _tile_coords(res: int, tile: tuple[int, int, int, int], gen_map) -> dict:
+    r0, r1, c0, c1 = tile
+    u = (np.arange(c0, c1) + 0.5) / res
+    v = 1.0 - (np.arange(r0, r1) + 0.5) / res
+    uu, vv = np.meshgrid(u, v)
+    coords = {"uv": np.stack([uu.ravel(), vv.ravel()], axis=1)}
+    if gen_map is not None:
+        coords["generated"] = gen_map[r0:r1, c0:c1].reshape(-1, 3)
+    return coords
+
+#endregion
+
+
+#region Rendering
+
+def _bake_tile(payload: dict, targets: list, coords: dict) -> list:
+    # выполняется в процессе пула: только evaluator, без bpy
+    ev = GraphEvaluator(payload, coords)
+    return [convert(ev.output(f, o), 4).astype(np.float32) for f, o in targets]
+
+
+class _TilePool:
+    """Пул процессов, создаётся при первом запекании и общий для всего пакета."""
+
+    def __init__(self):
+        self._executor = None
+        self._broken = False
+        self.workers = workers.worker_count()
+
+    def _get(self):
+        if self._executor is None and not self._broken:
+            self._executor = workers.new_executor(self.workers, "Bake")
+            self._broken = self._executor is None
+        return self._executor
+
+    def run(self, payload: dict, targets: list, res: int, gen_map) -> list:
+        images = [np.zeros((res, res, 4), dtype=np.float32) for _ in targets]
+        tiles = [(r0, min(r0 + BAKE_TILE, res), c0, min(c0 + BAKE_TILE, res))
+                 for r0 in range(0, res, BAKE_TILE) for c0 in range(0, res, BAKE_TILE)]
+
+        def store(tile, result):
+            r0, r1, c0, c1 = tile
+            for img, arr in zip(images, result):
+                img[r0:r1, c0:c1] = arr.reshape(r1 - r0, c1 - c0, 4)
+
+        executor = self._get() if len(tiles) > 1 else None
+        if executor is not None:
+            try:
+                # не больше двух тайлов на процесс в очереди: координаты не копятся в памяти
+                pending: list = []
+                for tile in tiles:
+                    pending.append((tile, executor.submit(_bake_tile, payload, targets, _tile_coords(res, tile, gen_map))))
+                    if len(pending) >= self.workers * 2:
+                        done, fut = pending.pop(0)
+                        store(done, fut.result())
+                for done, fut in pending:
+                    store(done, fut.result())
+                return images
+            except Exception as e:
+                print(f"[GSL Exporter] Bake pool failed, baking in-process: {e}")
+                self._broken = True
+                self.close()
+        for tile in tiles:
+            store(tile, _bake_tile(payload, targets, _tile_coords(res, tile, gen_map)))
+        return images
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+
+def write_png(path: str, rgba) -> None:
+    """RGBA8 (h, w, 4) → PNG без сторонних зависимостей; запись атомарная."""
+    h, w = rgba.shape[:2]
+    rows = np.ascontiguousarray(rgba, dtype=np.uint8).reshape(h, w * 4)
+    raw = np.concatenate([np.zeros((h, 1), dtype=np.uint8), rows], axis=1).tobytes()
+    png = b"".join((
+        b"\x89PNG\r\n\x1a\n",
+        _png_chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 6, 0, 0, 0)),
+        _png_chunk(b"IDAT", zlib.compress(raw, 6)),
+        _png_chunk(b"IEND", b""),
+    ))
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(png)
+    os.replace(tmp, path)
+
+#endregion
+
+
+#region Payload
+
+def _bake_key(node: dict, out_idx: int, res: int, mesh_key: str) -> str:
+    src = f"{node.get('hash') or node['id']}|{out_idx}|{res}|{mesh_key}"
+    return hashlib.sha1(src.encode("utf-8")).hexdigest()[:16]
+
+
+def _replace(payload: dict, baked: dict[tuple[str, int], str], closure: set[str]) -> None:
+    nodes = {n["id"]: n for n in payload["nodes"]}
+    links = [parse_link(l) for l in payload["links"]]
+
+    coord_id = next((nid for nid, n in nodes.items() if n.get("class") == "TexCoordModule"), None)
+    if coord_id is None:
+        coord_id = "bake_texture_coordinate"
+        nodes[coord_id] = {
+            "id": coord_id, "name": "Texture Coordinate", "class": "TexCoordModule",
+            "inputs": [], "outputs": list(_TEX_COORD_NAMES),
+        }
+
+    remap: dict[tuple[str, int], str] = {}
+    for (f, o), path in baked.items():
+        base = f"{f}_baked" if o == 0 else f"{f}_baked_{o}"
+        nid, suffix = base, 1
+        while nid in nodes:
+            suffix += 1
+            nid = f"{base}_{suffix}"
+        nodes[nid] = {
+            "id": nid, "name": f"{nodes[f].get('name', f)} (baked)", "class": "TexImageModule",
+            "inputs": ["Vector"], "outputs": ["Color", "Alpha"],
+            # значения линейные → Non-Color; EXTEND, чтобы на краях не подмешивался противоположный край
+            "params": {"alpha_mode": 0, "box_blend": 0.0, "color_space": 1, "extension": 1,
+                       "image_path": path.replace("\\", "/"), "interpolation": 0, "projection": 0},
+        }
+        info = textures.register_file(path)
+        if info is not None:
+            nodes[nid]["params"].update({"image_hash": info["hash"], "image_bytes": info["size"],
+                                         "image_file": info["file"]})
+        remap[(f, o)] = nid
+        links.append((coord_id, _UV_OUTPUT, nid, 0))
+
+    links = [(remap[(f, o)], 0, t, i) if (f, o) in remap else (f, o, t, i) for f, o, t, i in links]
+
+    # узлы запечённых поддеревьев без оставшихся потребителей удаляем вместе с входными связями
+    closure = closure - {coord_id}
+    while True:
+        used = {f for f, _, _, _ in links}
+        dead = {nid for nid in closure if nid in nodes and nid not in used}
+        if not dead:
+            break
+        for nid in dead:
+            del nodes[nid]
+        links = [l for l in links if l[2] not in dead]
+
+    payload["nodes"] = sorted(nodes.values(), key=lambda d: d["id"])
+    payload["links"] = [f"{f},{o},{t},{i}" for f, o, t, i in sorted(set(links))]
+
+
+def bake_payload(payload: dict, ctx: dict, resolution: int, pool: Optional[_TilePool] = None) -> dict:
+    """Запекает подграфы одного материала на месте; payload["baked"] — что заменено."""
+    if np is None or resolution <= 0 or "nodes" not in payload:
+        return payload
+    mesh = ctx.get("mesh")
+    targets = find_targets(payload, has_mesh=mesh is not None)
+    if not targets:
+        return payload
+
+    an = _Analysis(payload)
+    closure: set[str] = set()
+    for f, _ in targets:
+        closure |= an.info(f)[1]
+    needs_gen = any("generated" in an.info(f)[0] for f, _ in targets)
+
+    out_dir = ctx.get("dir") or os.path.join(tempfile.gettempdir(), BAKE_DIR_NAME)
+    os.makedirs(out_dir, exist_ok=True)
+    paths: dict[tuple[str, int], str] = {}
+    # имя материала в имени файла: "/", ":" и т.п. в нём не должны ломать путь
+    material = sanitize(str(payload.get("material", "material")))
+    for f, o in targets:
+        mesh_key = mesh["key"] if mesh is not None and "generated" in an.info(f)[0] else ""
+        name = f"{material}_{_bake_key(an.nodes[f], o, resolution, mesh_key)}.png"
+        paths[(f, o)] = os.path.join(out_dir, name)
+
+    # одинаковое поддерево при том же разрешении и меше уже лежит на диске
+    todo = [t for t in targets if not os.path.exists(paths[t])]
+    if todo:
+        sub = {"nodes": [an.nodes[nid] for nid in closure],
+               "links": [l for l in payload["links"] if parse_link(l)[2] in closure]}
+        gen_map = generated_map(mesh, resolution) if needs_gen else None
+        own_pool = pool is None
+        pool = pool or _TilePool()
+        try:
+            images = pool.run(sub, todo, resolution, gen_map)
+        finally:
+            if own_pool:
+                pool.close()
+        for target, img in zip(todo, images):
+            lo, hi = float(np.nanmin(img)), float(np.nanmax(img))
+            if not np.isfinite(img).all() or lo < -_RANGE_EPS or hi > 1.0 + _RANGE_EPS:
+                # PNG хранит только [0, 1] — такой выход остаётся процедурным
+                del paths[target]
+                continue
+            write_png(paths[target], np.round(np.clip(img, 0.0, 1.0) * 255.0))
+
+    if not paths:
+        return payload
+    kept: set[str] = set()
+    for f, _ in paths:
+        kept |= an.info(f)[1]
+    _replace(payload, paths, kept)
+    payload["baked"] = [{"node": f, "output": o, "image": p.replace("\\", "/")} for (f, o), p in sorted(paths.items())]
+    return payload
+
+
+def bake_materials(items: list[tuple[dict, dict]], resolution: int) -> None:
+    """items — пары (payload, capture()); один пул процессов на весь пакет."""
+    pool = _TilePool()
+    try:
+        for payload, ctx in items:
+            try:
+                bake_payload(payload, ctx, resolution, pool)
+            except Exception as e:
+                # материал остаётся процедурным, экспорт не обрывается
+                print(f"[GSL Exporter] Bake failed for {payload.get('material')}: {e}")
+    finally:
+        pool.close()
+
+#endregion
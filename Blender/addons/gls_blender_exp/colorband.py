@@ -0,0 +1,356 @@
+# SPDX-FileCopyrightText: 2025 D.Jorkin
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Вычисление Color Ramp так же, как это делает Blender, и запекание в LUT.
+
+Portions adapted from Blender sources to ensure behavior parity:
+ - source/blender/blenkernel/intern/colorband.cc (BKE_colorband_evaluate)
+ - source/blender/blenkernel/intern/key.cc (key_curve_position_weights)
+ - source/blender/blenlib/intern/math_color.cc (rgb/hsv/hsl conversions)
+Copyright (c) Blender Authors, licensed under GPL-2.0-or-later.
+
+Рампа описывается словарём:
+    {"stops": [[pos, [r, g, b, a]], ...], "interpolation": "LINEAR",
+     "color_mode": "RGB", "hue_interpolation": "NEAR"}
+"""
+from __future__ import annotations
+
+import base64
+import struct
+
+try:
+    import numpy as np  # type: ignore
+except Exception:  # pragma: no cover
+    np = None  # type: ignore
+
+INTERPOLATIONS = ("CONSTANT", "LINEAR", "EASE", "B_SPLINE", "CARDINAL")
+COLOR_MODES = ("RGB", "HSV", "HSL")
+HUE_INTERPOLATIONS = ("NEAR", "FAR", "CW", "CCW")
+
+_EARLY_OUT = ("LINEAR", "EASE", "CONSTANT")
+
+
+def _sorted_stops(ramp: dict) -> tuple[list[float], list[list[float]]]:
+    stops = sorted(ramp.get("stops", []), key=lambda s: float(s[0]))
+    return [float(s[0]) for s in stops], [[float(c) for c in s[1]] for s in stops]
+
+
+def _ipotype(ramp: dict) -> str:
+    # Для HSV/HSL Blender всегда интерполирует линейно
+    if str(ramp.get("color_mode", "RGB")).upper() != "RGB":
+        return "LINEAR"
+    interp = str(ramp.get("interpolation", "LINEAR")).upper()
+    return interp if interp in INTERPOLATIONS else "LINEAR"
+
+
+def _curve_weights(t: float, ipo: str) -> tuple[float, float, float, float]:
+    t2 = t * t
+    t3 = t2 * t
+    if ipo == "CARDINAL":
+        fc = 0.71
+        return (
+            -fc * t3 + 2.0 * fc * t2 - fc * t,
+            (2.0 - fc) * t3 + (fc - 3.0) * t2 + 1.0,
+            (fc - 2.0) * t3 + (3.0 - 2.0 * fc) * t2 + fc * t,
+            fc * t3 - fc * t2,
+        )
+    return (
+        -0.16666666 * t3 + 0.5 * t2 - 0.5 * t + 0.16666666,
+        0.5 * t3 - t2 + 0.66666666,
+        -0.5 * t3 + 0.5 * t2 + 0.5 * t + 0.16666666,
+        0.16666666 * t3,
+    )
+
+
+#region Scalar reference
+
+def _rgb_to_hsv(r: float, g: float, b: float) -> tuple[float, float, float]:
+    k = 0.0
+    if g < b:
+        g, b = b, g
+        k = -1.0
+    min_gb = b
+    if r < g:
+        r, g = g, r
+        k = -2.0 / 6.0 - k
+        min_gb = min(g, b)
+    chroma = r - min_gb
+    return abs(k + (g - b) / (6.0 * chroma + 1e-20)), chroma / (r + 1e-20), r
+
+
+def _hsv_to_rgb(h: float, s: float, v: float) -> tuple[float, float, float]:
+    nr = min(max(abs(h * 6.0 - 3.0) - 1.0, 0.0), 1.0)
+    ng = min(max(2.0 - abs(h * 6.0 - 2.0), 0.0), 1.0)
+    nb = min(max(2.0 - abs(h * 6.0 - 4.0), 0.0), 1.0)
+    return ((nr - 1.0) * s + 1.0) * v, ((ng - 1.0) * s + 1.0) * v, ((nb - 1.0) * s + 1.0) * v
+
+
+def _rgb_to_hsl(r: float, g: float, b: float) -> tuple[float, float, float]:
+    cmax = max(r, g, b)
+    cmin = min(r, g, b)
+    l = min(1.0, (cmax + cmin) / 2.0)
+    if cmax == cmin:
+        return 0.0, 0.0, l
+    d = cmax - cmin
+    s = d / (2.0 - cmax - cmin) if l > 0.5 else d / (cmax + cmin)
+    if cmax == r:
+        h = (g - b) / d + (6.0 if g < b else 0.0)
+    elif cmax == g:
+        h = (b - r) / d + 2.0
+    else:
+        h = (r - g) / d + 4.0
+    return h / 6.0, s, l
+
+
+def _hsl_to_rgb(h: float, s: float, l: float) -> tuple[float, float, float]:
+    nr = min(max(abs(h * 6.0 - 3.0) - 1.0, 0.0), 1.0)
+    ng = min(max(2.0 - abs(h * 6.0 - 2.0), 0.0), 1.0)
+    nb = min(max(2.0 - abs(h * 6.0 - 4.0), 0.0), 1.0)
+    chroma = (1.0 - abs(2.0 * l - 1.0)) * s
+    return (nr - 0.5) * chroma + l, (ng - 0.5) * chroma + l, (nb - 0.5) * chroma + l
+
+
+def _hue_mod(h: float) -> float:
+    return h if h < 1.0 else h - 1.0
+
+
+def _hue_interp(mode: str, mfac: float, fac: float, h1: float, h2: float) -> float:
+    h1 = _hue_mod(h1)
+    h2 = _hue_mod(h2)
+    kind = 0
+    if mode == "NEAR":
+        if h1 < h2 and (h2 - h1) > 0.5:
+            kind = 1
+        elif h1 > h2 and (h2 - h1) < -0.5:
+            kind = 2
+    elif mode == "FAR":
+        if h1 == h2:
+            kind = 1
+        elif h1 < h2 and (h2 - h1) < 0.5:
+            kind = 1
+        elif h1 > h2 and (h2 - h1) > -0.5:
+            kind = 2
+    elif mode == "CCW":
+        kind = 2 if h1 > h2 else 0
+    elif mode == "CW":
+        kind = 1 if h1 < h2 else 0
+    if kind == 1:
+        return _hue_mod(mfac * (h1 + 1.0) + fac * h2)
+    if kind == 2:
+        return _hue_mod(mfac * h1 + fac * (h2 + 1.0))
+    return mfac * h1 + fac * h2
+
+
+def evaluate_scalar(ramp: dict, x: float) -> list[float]:
+    pos, col = _sorted_stops(ramp)
+    if not pos:
+        return [0.0, 0.0, 0.0, 0.0]
+    ipo = _ipotype(ramp)
+    n = len(pos)
+    if n == 1:
+        return list(col[0])
+    if x <= pos[0] and ipo in _EARLY_OUT:
+        return list(col[0])
+
+    # ищем первую точку с pos > x
+    a = 0
+    while a < n and pos[a] <= x:
+        a += 1
+    if a == n:
+        c1, p1 = col[n - 1], 1.0
+        c2, p2 = col[n - 1], pos[n - 1]
+    elif a == 0:
+        c1, p1 = col[0], pos[0]
+        c2, p2 = col[0], 0.0
+    else:
+        c1, p1 = col[a], pos[a]
+        c2, p2 = col[a - 1], pos[a - 1]
+
+    if a == n and ipo in _EARLY_OUT:
+        return list(c2)
+    if ipo == "CONSTANT":
+        return list(c2)
+
+    fac = (x - p1) / (p2 - p1) if p2 != p1 else (0.0 if a != n else 1.0)
+
+    if ipo in ("B_SPLINE", "CARDINAL"):
+        c0 = c1 if a >= n - 1 else col[a + 1]
+        c3 = c2 if a < 2 else col[a - 2]
+        fac = min(max(fac, 0.0), 1.0)
+        t = _curve_weights(fac, ipo)
+        return [min(max(t[3] * c3[i] + t[2] * c2[i] + t[1] * c1[i] + t[0] * c0[i], 0.0), 1.0) for i in range(4)]
+
+    if ipo == "EASE":
+        fac2 = fac * fac
+        fac = 3.0 * fac2 - 2.0 * fac2 * fac
+    mfac = 1.0 - fac
+
+    mode = str(ramp.get("color_mode", "RGB")).upper()
+    if mode in ("HSV", "HSL"):
+        to_space, from_space = (_rgb_to_hsv, _hsv_to_rgb) if mode == "HSV" else (_rgb_to_hsl, _hsl_to_rgb)
+        s1 = to_space(*c1[:3])
+        s2 = to_space(*c2[:3])
+        hue_mode = str(ramp.get("hue_interpolation", "NEAR")).upper()
+        h = _hue_interp(hue_mode, mfac, fac, s1[0], s2[0])
+        rgb = from_space(h, mfac * s1[1] + fac * s2[1], mfac * s1[2] + fac * s2[2])
+        return [rgb[0], rgb[1], rgb[2], mfac * c1[3] + fac * c2[3]]
+    return [mfac * c1[i] + fac * c2[i] for i in range(4)]
+
+#endregion
+
+
+#region NumPy
+
+def _np_rgb_to_hsv(rgb):
+    r, g, b = rgb[:, 0], rgb[:, 1], rgb[:, 2]
+    cmax = np.maximum(np.maximum(r, g), b)
+    cmin = np.minimum(np.minimum(r, g), b)
+    d = cmax - cmin
+    safe = np.where(d > 0.0, d, 1.0)
+    h = np.where(cmax == r, (g - b) / safe, np.where(cmax == g, (b - r) / safe + 2.0, (r - g) / safe + 4.0))
+    h = np.where(d > 0.0, np.mod(h / 6.0, 1.0), 0.0)
+    s = d / (cmax + 1e-20)
+    return np.stack([h, s, cmax], axis=1)
+
+
+def _np_hue_weights(h):
+    nr = np.clip(np.abs(h * 6.0 - 3.0) - 1.0, 0.0, 1.0)
+    ng = np.clip(2.0 - np.abs(h * 6.0 - 2.0), 0.0, 1.0)
+    nb = np.clip(2.0 - np.abs(h * 6.0 - 4.0), 0.0, 1.0)
+    return nr, ng, nb
+
+
+def _np_hsv_to_rgb(h, s, v):
+    nr, ng, nb = _np_hue_weights(h)
+    return np.stack([((nr - 1.0) * s + 1.0) * v, ((ng - 1.0) * s + 1.0) * v, ((nb - 1.0) * s + 1.0) * v], axis=1)
+
+
+def _np_rgb_to_hsl(rgb):
+    r, g, b = rgb[:, 0], rgb[:, 1], rgb[:, 2]
+    cmax = np.maximum(np.maximum(r, g), b)
+    cmin = np.minimum(np.minimum(r, g), b)
+    l = np.minimum(1.0, (cmax + cmin) / 2.0)
+    d = cmax - cmin
+    safe = np.where(d > 0.0, d, 1.0)
+    s_den = np.where(l > 0.5, 2.0 - cmax - cmin, cmax + cmin)
+    s = np.where(d > 0.0, d / np.where(s_den != 0.0, s_den, 1.0), 0.0)
+    h = np.where(cmax == r, (g - b) / safe + np.where(g < b, 6.0, 0.0),
+                 np.where(cmax == g, (b - r) / safe + 2.0, (r - g) / safe + 4.0))
+    h = np.where(d > 0.0, h / 6.0, 0.0)
+    return np.stack([h, s, l], axis=1)
+
+
+def _np_hsl_to_rgb(h, s, l):
+    nr, ng, nb = _np_hue_weights(h)
+    chroma = (1.0 - np.abs(2.0 * l - 1.0)) * s
+    return np.stack([(nr - 0.5) * chroma + l, (ng - 0.5) * chroma + l, (nb - 0.5) * chroma + l], axis=1)
+
+
+def _np_hue_interp(mode: str, mfac, fac, h1, h2):
+    h1 = np.where(h1 < 1.0, h1, h1 - 1.0)
+    h2 = np.where(h2 < 1.0, h2, h2 - 1.0)
+    zero = np.zeros_like(h1, dtype=np.int8)
+    if mode == "NEAR":
+        kind = np.where((h1 < h2) & ((h2 - h1) > 0.5), 1, np.where((h1 > h2) & ((h2 - h1) < -0.5), 2, 0))
+    elif mode == "FAR":
+        kind = np.where(h1 == h2, 1, np.where((h1 < h2) & ((h2 - h1) < 0.5), 1,
+                                              np.where((h1 > h2) & ((h2 - h1) > -0.5), 2, 0)))
+    elif mode == "CCW":
+        kind = np.where(h1 > h2, 2, 0)
+    elif mode == "CW":
+        kind = np.where(h1 < h2, 1, 0)
+    else:
+        kind = zero
+    h = np.where(kind == 1, mfac * (h1 + 1.0) + fac * h2,
+                 np.where(kind == 2, mfac * h1 + fac * (h2 + 1.0), mfac * h1 + fac * h2))
+    return np.where((kind != 0) & (h >= 1.0), h - 1.0, h)
+
+
+def evaluate_array(ramp: dict, x):
+    """
+    Векторизованная версия evaluate_scalar: x — массив любой формы,
+    результат — массив формы x.shape + (4,).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    shape = x.shape
+    x = x.reshape(-1)
+    pos_l, col_l = _sorted_stops(ramp)
+    if not pos_l:
+        return np.zeros(shape + (4,))
+    pos = np.asarray(pos_l, dtype=np.float64)
+    col = np.asarray(col_l, dtype=np.float64).reshape(-1, 4)
+    n = len(pos)
+    if n == 1:
+        return np.broadcast_to(col[0], shape + (4,)).copy()
+
+    ipo = _ipotype(ramp)
+    a = np.searchsorted(pos, x, side="right")
+    i1 = np.minimum(a, n - 1)
+    i2 = np.maximum(a - 1, 0)
+    p1 = np.where(a == n, 1.0, pos[i1])
+    p2 = np.where(a == 0, 0.0, pos[i2])
+    c1 = col[i1]
+    c2 = col[i2]
+
+    if ipo == "CONSTANT":
+        out = c2.copy()
+    else:
+        denom = p2 - p1
+        fac = np.where(denom != 0.0, (x - p1) / np.where(denom != 0.0, denom, 1.0), np.where(a != n, 0.0, 1.0))
+        if ipo in ("B_SPLINE", "CARDINAL"):
+            c0 = col[np.where(a >= n - 1, i1, np.minimum(a + 1, n - 1))]
+            c3 = col[np.where(a < 2, i2, np.maximum(a - 2, 0))]
+            t = np.stack(_curve_weights(np.clip(fac, 0.0, 1.0), ipo), axis=1)
+            out = t[:, 3:4] * c3 + t[:, 2:3] * c2 + t[:, 1:2] * c1 + t[:, 0:1] * c0
+            out = np.clip(out, 0.0, 1.0)
+        else:
+            if ipo == "EASE":
+                fac2 = fac * fac
+                fac = 3.0 * fac2 - 2.0 * fac2 * fac
+            mfac = 1.0 - fac
+            mode = str(ramp.get("color_mode", "RGB")).upper()
+            if mode in ("HSV", "HSL"):
+                to_space, from_space = (_np_rgb_to_hsv, _np_hsv_to_rgb) if mode == "HSV" else (_np_rgb_to_hsl, _np_hsl_to_rgb)
+                s1 = to_space(c1[:, :3])
+                s2 = to_space(c2[:, :3])
+                hue_mode = str(ramp.get("hue_interpolation", "NEAR")).upper()
+                h = _np_hue_interp(hue_mode, mfac, fac, s1[:, 0], s2[:, 0])
+                rgb = from_space(h, mfac * s1[:, 1] + fac * s2[:, 1], mfac * s1[:, 2] + fac * s2[:, 2])
+                out = np.concatenate([rgb, (mfac * c1[:, 3] + fac * c2[:, 3])[:, None]], axis=1)
+            else:
+                out = mfac[:, None] * c1 + fac[:, None] * c2
+
+    if ipo in _EARLY_OUT:
+        out = np.where((a == n)[:, None], col[n - 1], out)
+        out = np.where((x <= pos[0])[:, None], col[0], out)
+    return out.reshape(shape + (4,))
+
+#endregion
+
+
+def bake_lut(ramp: dict, size: int = 257) -> list[list[float]]:
+    size = max(2, int(size))
+    xs = [i / (size - 1) for i in range(size)]
+    if np is not None:
+        return evaluate_array(ramp, xs).tolist()
+    return [evaluate_scalar(ramp, x) for x in xs]
+
+
+def encode_lut(lut, fmt: str = "float") -> dict:
+    """
+    Упаковывает LUT в base64: "rgba32f" — little-endian float32, "rgba8" — байты 0..255.
+    """
+    size = len(lut)
+    if fmt == "byte":
+        if np is not None:
+            raw = np.clip(np.rint(np.asarray(lut, dtype=np.float64) * 255.0), 0, 255).astype(np.uint8).tobytes()
+        else:
+            raw = bytes(min(255, max(0, int(round(c * 255.0)))) for px in lut for c in px)
+        return {"size": size, "format": "rgba8", "data": base64.b64encode(raw).decode("ascii")}
+    if np is not None:
+        raw = np.asarray(lut, dtype="<f4").tobytes()
+    else:
+        flat = [float(c) for px in lut for c in px]
+        raw = struct.pack(f"<{len(flat)}f", *flat)
+    return {"size": size, "format": "rgba32f", "data": base64.b64encode(raw).decode("ascii")}
@@ -6,5 +6,90 @@ from __future__ import annotations
 
 HOST: str = "127.0.0.1"
 PORT: int = 5050
+# Если PORT занят (второй Blender), берётся следующий свободный из PORT … PORT + PORT_RANGE - 1
+PORT_RANGE: int = 16
 
 GODOT_UDP_PORT: int = 6020
+# Как часто Blender сообщает Godot о себе: id, порт, .blend, активный материал (сек)
+ANNOUNCE_INTERVAL: float = 2.0
+
+# HTTP/1.1 keep-alive: Godot и клиенты нагрузки держат одно соединение на много запросов
+KEEPALIVE_TIMEOUT: float = 5.0       # простой соединения до закрытия (сек)
+KEEPALIVE_MAX_REQUESTS: int = 1000   # запросов на соединение, потом Connection: close
+MAX_CONNECTIONS: int = 32            # сверх этого соединение обслуживает один запрос и закрывается
+
+# Ядро сервера: "threading" — http.server, поток на соединение (server.py);
+# "asyncio" — один поток с циклом событий и подписки по WebSocket на /subscribe (async_server.py)
+SERVER_CORE: str = "threading"
+ASYNC_MAX_CONNECTIONS: int = 256     # keep-alive соединений и подписчиков у asyncio-ядра
+DISPATCH_INTERVAL: float = 0.01      # как часто диспетчер главного потока проверяет очередь (сек)
+DISPATCH_BUDGET: float = 0.05        # сколько один его проход может держать главный поток (сек)
+
+# Подписки (asyncio-ядро): изменения материалов копятся SUBSCRIBE_DEBOUNCE, потом один экспорт на всех
+SUBSCRIBE_DEBOUNCE: float = 0.25     # сек
+WS_MAX_PENDING: int = 64             # неотправленных материалов у подписчика; больше — отключение
+WS_WRITE_BUFFER: int = 1 << 20       # байт в буфере сокета, после которых отправка ждёт клиента
+WS_SEND_TIMEOUT: float = 10.0        # столько подписчик может не читать, потом отключение (сек)
+WS_PING_INTERVAL: float = 20.0       # сек
+WS_MAX_MESSAGE: int = 1 << 16        # байт в сообщении от клиента
+
+# Сервер стартует таймером после register(), чтобы не задерживать запуск Blender (сек)
+SERVER_START_DELAY: float = 0.5
+
+# Сколько HTTP-поток ждёт экспорт в главном потоке Blender (сек)
+LINK_TIMEOUT: float = 2.0
+BATCH_TIMEOUT: float = 30.0
+
+# Писать запросы /link и /batch в этот JSONL (Blender/bench/linkload.py); пусто — не писать
+RECORD_SESSIONS: str = ""
+
+# Обёртка обработчиков узлов в registry: время, счётчики, изоляция ошибок
+HANDLER_INSTRUMENTATION: bool = True
+HANDLER_SLOW_MS: float = 50.0       # предупреждение в консоль о вызове дольше этого; 0 — не предупреждать
+
+# Окна /debug/profile и /debug/memory (включаются в настройках аддона), см. profiling.py
+DEBUG_CAPTURE_MAX_SECONDS: float = 120.0
+DEBUG_TOP: int = 40                 # строк pstats и мест аллокаций в ответе
+
+# Сколько последних ревизий каждого материала хранит сервер для построения дельт
+REVISION_HISTORY: int = 8
+
+# Процессы пула для запекания и обработки текстур; 0 — по числу ядер
+WORKER_PROCESSES: int = 0
+
+# Офлайн-запекание (options: bake=<разрешение>)
+BAKE_DIR_NAME: str = "gsl_bake"   # рядом с .blend или во временной папке
+BAKE_TILE: int = 256              # сторона тайла, который считает один процесс
+BAKE_MARGIN: int = 4              # на сколько текселей расширять UV-острова
+BAKE_MIN_COST: float = 2.0        # порог стоимости подграфа, см. bake._BAKE_WEIGHTS
+
+# LOD-варианты материала (options: lod=N); порог 0 выключает правило
+LOD_MAX_LEVEL: int = 3
+LOD_NOISE_DETAIL_STEP: float = 2.0   # на столько падает Detail шума на каждом уровне
+LOD_MIN_NOISE_DETAIL: float = 0.0
+LOD_CUBIC_TO_LINEAR: int = 1         # с какого уровня Image Texture Cubic → Linear
+LOD_BOX_TO_FLAT: int = 3             # с какого уровня проекция Box → Flat
+LOD_DROP_BUMP: int = 2               # с какого уровня Bump отбрасывается
+
+# Бюджеты стоимости материала для payload["stats"]; 0 — без ограничения
+COST_BUDGET_ALU: float = 4000.0
+COST_BUDGET_TEXTURE_SAMPLES: int = 16
+COST_BUDGET_NOISE_OCTAVE_DIMS: int = 96
+COST_BUDGET_BUMP_EVALS: int = 6
+COST_BUDGET_SAMPLERS: int = 16       # sampler2D на материал; у Godot есть и свои
+
+# Упаковка одноканальных Non-Color текстур в одну (options: pack_channels=1)
+PACK_DIR_NAME: str = "gsl_packed"   # рядом с .blend или во временной папке
+PACK_CHANNELS: int = 3               # R, G, B; альфу Godot при импорте правит (fix_alpha_border)
+PACK_TIMEOUT: float = 60.0           # чтение пикселей в главном потоке Blender (сек)
+
+# Профили предобработки текстур (options: texture_profile=<имя>), см. texprep.py
+# max_size — предел стороны (0 — без предела), pot — степень двойки, mips — DDS с mip-уровнями
+TEXTURE_PROFILES: dict[str, dict] = {
+    "desktop": {"max_size": 4096, "pot": True, "mips": True},
+    "mobile": {"max_size": 1024, "pot": True, "mips": True},
+    "preview": {"max_size": 512, "pot": False, "mips": False},
+}
+TEXTURE_CACHE_DIR_NAME: str = "gsl_texture_cache"   # во временной папке, общий для всех .blend
+TEXTURE_TIMEOUT: float = 120.0                     # уменьшение в главном потоке Blender (сек)
+TEXTURE_INDEX_MAX: int = 512                       # версий текстур в индексе /image/<hash>
@@ -0,0 +1,191 @@
+# SPDX-FileCopyrightText: 2025 D.Jorkin
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Статическая оценка стоимости материала по payload.
+
+Модель грубая: ALU-операции на фрагмент по классам узлов, выборки текстур,
+октавы шума (и октавы × размерность), повторные вычисления графа высоты в
+Bump и число sampler-ов. Числа относительные — они нужны, чтобы сравнивать варианты материала
+(LOD) и ловить заведомо тяжёлые материалы до GPU, а не предсказывать время кадра.
+"""
+from __future__ import annotations
+
+from .config import (COST_BUDGET_ALU, COST_BUDGET_TEXTURE_SAMPLES,
+                     COST_BUDGET_NOISE_OCTAVE_DIMS, COST_BUDGET_BUMP_EVALS, COST_BUDGET_SAMPLERS)
+from .utils import parse_link
+
+# Примерное число ALU-операций модуля Godot без учёта входов
+_ALU_WEIGHTS: dict[str, float] = {
+    "MathModule": 2.0,
+    "VectorMathModule": 4.0,
+    "MapRangeModule": 6.0,
+    "MixModule": 6.0,
+    "CombineColorModule": 2.0,
+    "SeparateColorModule": 2.0,
+    "CombineXYZModule": 1.0,
+    "SeparateXYZModule": 1.0,
+    "MappingModule": 20.0,
+    "ColorRampModule": 4.0,
+    "TexCoordModule": 4.0,
+    "TexImageModule": 8.0,
+    "TexWhiteNoiseModule": 30.0,
+    "NormalMapModule": 20.0,
+    "BumpModule": 30.0,
+    "BsdfPrincipledModule": 60.0,
+    "OutputMaterialModule": 0.0,
+}
+_DEFAULT_ALU = 4.0
+
+# Одна октава Perlin по размерности: 2^d углов с хешем и градиентом
+_OCTAVE_ALU: dict[int, float] = {1: 16.0, 2: 40.0, 3: 90.0, 4: 200.0}
+# Сколько ALU стоит одна выборка текстуры при сведении к одному числу
+SAMPLE_WEIGHT: float = 8.0
+
+_MAX_OCTAVES = 16
+_NOISE_COLOR_OUTPUT = 1
+_NOISE_DISTORTION_INPUT = 8
+
+_BUMP_HEIGHT_INPUT = 3
+# eval_height_* в Bump.gd вызывается для h, hx и hy
+BUMP_HEIGHT_EVALS: int = 3
+
+
+def noise_octaves(params: dict) -> int:
+    """Октав за одно вычисление фрактала; запитанный Detail считается по максимуму."""
+    if "detail" not in params:
+        return _MAX_OCTAVES
+    detail = min(max(float(params["detail"]), 0.0), 15.0)
+    octaves = int(detail) + 1
+    return octaves + 1 if detail - int(detail) > 0.0 else octaves
+
+
+def _noise_evaluations(node: dict, linked: set[int], used: set[int]) -> int:
+    # fractal() для значения, ещё два — для каналов Color, dims — для distortion
+    params = node.get("params", {})
+    dims = int(params.get("dimensions", 2)) + 1
+    count = 1
+    if _NOISE_COLOR_OUTPUT in used:
+        count += 2
+    if _NOISE_DISTORTION_INPUT in linked or float(params.get("distortion", 0.0)) != 0.0:
+        count += dims
+    return count
+
+
+def node_cost(node: dict, linked: set[int], used: set[int]) -> dict:
+    """linked — индексы запитанных входов, used — индексы используемых выходов."""
+    cls = node.get("class", "")
+    params = node.get("params", {})
+    alu = _ALU_WEIGHTS.get(cls, _DEFAULT_ALU)
+    samples = 0
+    octaves = 0
+    octave_dims = 0
+
+    if cls == "TexNoiseModule":
+        dims = int(params.get("dimensions", 2)) + 1
+        octaves = noise_octaves(params) * _noise_evaluations(node, linked, used)
+        octave_dims = octaves * dims
+        alu = octaves * _OCTAVE_ALU.get(dims, _OCTAVE_ALU[3])
+    elif cls == "TexImageModule":
+        # Box — три проекции; Cubic в Tex_image.gdshaderinc сейчас идёт веткой Linear
+        samples = 3 if int(params.get("projection", 0)) == 1 else 1
+    elif cls == "ColorRampModule":
+        if "lut" in params:
+            samples = 1
+        else:
+            alu += 4.0 * len(params.get("stops", []))
+
+    return {"alu": alu, "texture_samples": samples, "noise_octaves": octaves, "noise_octave_dims": octave_dims}
+
+
+def count_samplers(payload: dict) -> int:
+    """sampler2D-uniform-ы шейдера: Image Texture (общие — один раз) и Color Ramp."""
+    shared: set[int] = set()
+    count = 0
+    for node in payload.get("nodes", []):
+        cls = node.get("class")
+        if cls == "TexImageModule":
+            slot = node.get("params", {}).get("sampler")
+            if slot is None:
+                count += 1
+            elif slot not in shared:
+                shared.add(slot)
+                count += 1
+        elif cls == "ColorRampModule":
+            count += 1
+    return count
+
+
+def _upstream_closure(start: str, upstream: dict[str, set[str]]) -> set[str]:
+    seen: set[str] = set()
+    stack = [start]
+    while stack:
+        nid = stack.pop()
+        if nid in seen:
+            continue
+        seen.add(nid)
+        stack.extend(upstream.get(nid, ()))
+    return seen
+
+
+def estimate(payload: dict) -> dict:
+    """
+    Суммы по материалу. Bump с запитанной Height заново считает весь граф высоты
+    в eval_height_* (Collector.build_eval_for_bump) — по вызову на h, hx и hy,
+    поэтому этот граф входит в сумму ещё BUMP_HEIGHT_EVALS раз.
+    """
+    linked: dict[str, set[int]] = {}
+    used: dict[str, set[int]] = {}
+    upstream: dict[str, set[str]] = {}
+    height_src: dict[str, str] = {}
+    for link in payload.get("links", []):
+        f, o, t, i = parse_link(link)
+        used.setdefault(f, set()).add(o)
+        linked.setdefault(t, set()).add(i)
+        upstream.setdefault(t, set()).add(f)
+        if i == _BUMP_HEIGHT_INPUT:
+            height_src[t] = f
+
+    per_node = {n["id"]: node_cost(n, linked.get(n["id"], set()), used.get(n["id"], set()))
+                for n in payload.get("nodes", [])}
+    total = {"alu": 0.0, "texture_samples": 0, "noise_octaves": 0, "noise_octave_dims": 0}
+    for c in per_node.values():
+        for key in total:
+            total[key] += c[key]
+
+    bump_evals = 0
+    for node in payload.get("nodes", []):
+        src = height_src.get(node["id"])
+        if node.get("class") != "BumpModule" or src not in per_node:
+            continue
+        bump_evals += BUMP_HEIGHT_EVALS
+        for nid in _upstream_closure(src, upstream):
+            c = per_node.get(nid)
+            if c is None:
+                continue
+            for key in total:
+                total[key] += c[key] * BUMP_HEIGHT_EVALS
+
+    total["alu"] = round(total["alu"], 1)
+    total["bump_height_evals"] = bump_evals
+    total["samplers"] = count_samplers(payload)
+    total["total"] = round(total["alu"] + total["texture_samples"] * SAMPLE_WEIGHT, 1)
+    return total
+
+
+_BUDGETS = (
+    ("alu", COST_BUDGET_ALU),
+    ("texture_samples", COST_BUDGET_TEXTURE_SAMPLES),
+    ("noise_octave_dims", COST_BUDGET_NOISE_OCTAVE_DIMS),
+    ("bump_height_evals", COST_BUDGET_BUMP_EVALS),
+    ("samplers", COST_BUDGET_SAMPLERS),
+)
+
+
+def stats(payload: dict) -> dict:
+    """Блок payload["stats"]: оценка и список превышенных бюджетов из config."""
+    result = estimate(payload)
+    over = [f"{key} {result[key]:g} > {limit:g}" for key, limit in _BUDGETS if limit and result[key] > limit]
+    if over:
+        result["over_budget"] = over
+    return result
@@ -0,0 +1,665 @@
+# SPDX-FileCopyrightText: 2025 D.Jorkin
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Вычисление экспортированного графа на CPU.
+
+Берёт payload gather_material и считает выходы узлов сразу для пакета точек
+через NumPy. Формулы повторяют модули Godot (Nodes/Moduls/*.gd и .gdshaderinc),
+индексы enum — те, что пишут обработчики в params, индексы сокетов — те, что
+в links. Нужен для свёртки констант, запекания и сверки результатов без GPU.
+
+Значение сокета — массив формы (N,) для float, (N, 3) для vec3, (N, 4) для vec4.
+Координаты Texture Coordinate передаются словарём {"generated": (N, 3), "uv": (N, 2|3), ...}.
+"""
+from __future__ import annotations
+
+from typing import Callable, Optional
+
+try:
+    import numpy as np  # type: ignore
+except Exception:  # pragma: no cover
+    np = None  # type: ignore
+
+from . import noise
+from .colorband import evaluate_array
+from .utils import parse_link
+
+
+TEX_COORD_OUTPUTS = ("generated", "normal", "uv", "object", "camera", "window", "reflection")
+
+_LUMA = (0.2126, 0.7152, 0.0722)
+
+
+#region Values
+
+def _width(v) -> int:
+    return 1 if v.ndim == 1 else v.shape[-1]
+
+
+def convert(v, width: int):
+    """Приведение типа сокета как в SocketCompatibility.convert."""
+    w = _width(v)
+    if w == width:
+        return v
+    if w == 1:
+        if width == 3:
+            return np.repeat(v[:, None], 3, axis=1)
+        return np.stack([v, v, v, np.ones_like(v)], axis=1)
+    if w == 3:
+        if width == 4:
+            return np.concatenate([v, np.ones((v.shape[0], 1))], axis=1)
+        return v.mean(axis=1)
+    if width == 3:
+        return v[:, :3]
+    return v[:, :3] @ np.asarray(_LUMA)
+
+
+def constant(value, n: int, width: int):
+    """Значение из params (число или список) → массив нужной ширины."""
+    if isinstance(value, (list, tuple)):
+        comps = [float(x) for x in value]
+        if width == 1:
+            return np.full(n, comps[0] if comps else 0.0)
+        comps = (comps + [0.0, 0.0, 0.0])[:3] if len(comps) < 3 else comps
+        if width == 4 and len(comps) == 3:
+            comps = comps + [1.0]
+        return np.tile(np.asarray(comps[:width], dtype=np.float64), (n, 1))
+    v = float(value)
+    if width == 1:
+        return np.full(n, v)
+    if width == 3:
+        return np.full((n, 3), v)
+    return np.tile(np.asarray([v, v, v, 1.0]), (n, 1))
+
+
+def _safe_divide(a, b):
+    ok = np.abs(b) >= 1e-8
+    return np.where(ok, a / np.where(ok, b, 1.0), 0.0)
+
+
+def _compatible_mod(a, b):
+    ok = np.abs(b) >= 1e-8
+    sb = np.where(ok, b, 1.0)
+    return np.where(ok, a - sb * np.floor(a / sb), 0.0)
+
+
+def _wrap(a, lo, hi):
+    rng = hi - lo
+    return np.where(np.abs(rng) < 1e-8, a, _compatible_mod(a - lo, rng) + lo)
+
+
+def _compatible_pow(a, b):
+    a, b = np.broadcast_arrays(a, b)
+    with np.errstate(all="ignore"):
+        fb = np.abs(b) - np.floor(np.abs(b))
+        is_int = (fb < 1e-5) | (np.abs(1.0 - fb) < 1e-5)
+        ib = np.floor(b + 0.5)
+        neg = np.abs(a) ** ib
+        neg = np.where(np.mod(ib, 2.0) == 0.0, neg, -neg)
+        pos = np.power(np.where(a > 0.0, a, 1.0), b)
+        out = np.where(a > 0.0, pos, np.where(is_int, neg, 0.0))
+        return np.where(a == 0.0, np.where(b == 0.0, 1.0, 0.0), out)
+
+
+def _safe_normalize(v):
+    len2 = np.sum(v * v, axis=-1, keepdims=True)
+    ok = len2 > 1e-35
+    return np.where(ok, v / np.sqrt(np.where(ok, len2, 1.0)), 0.0)
+
+
+def _dot(a, b):
+    return np.sum(a * b, axis=-1)
+
+#endregion
+
+
+#region Color conversions (color_conversions.gdshaderinc)
+
+def _rgb_to_hsv(rgb):
+    r, g, b = rgb[:, 0], rgb[:, 1], rgb[:, 2]
+    cmax = np.max(rgb[:, :3], axis=1)
+    cmin = np.min(rgb[:, :3], axis=1)
+    delta = cmax - cmin
+    s = _safe_divide(delta, cmax)
+    d = np.where(delta != 0.0, delta, 1.0)
+    h = np.where(r == cmax, (g - b) / d, np.where(g == cmax, 2.0 + (b - r) / d, 4.0 + (r - g) / d))
+    h = np.where(s != 0.0, np.mod(h / 6.0 + 1.0, 1.0), 0.0)
+    return np.stack([h, s, cmax], axis=1)
+
+
+def _hsv_to_rgb(hsv):
+    h, s, v = hsv[:, 0], hsv[:, 1], hsv[:, 2]
+    h6 = np.mod(h, 1.0) * 6.0
+    i = np.floor(h6)
+    f = h6 - i
+    p = v * (1.0 - s)
+    q = v * (1.0 - s * f)
+    t = v * (1.0 - s * (1.0 - f))
+    sectors = [i == k for k in range(5)]
+    r = np.select(sectors, [v, q, p, p, t], v)
+    g = np.select(sectors, [t, v, v, q, p], p)
+    b = np.select(sectors, [p, p, t, v, v], q)
+    rgb = np.stack([r, g, b], axis=1)
+    return np.where((s == 0.0)[:, None], v[:, None], rgb)
+
+
+def _rgb_to_hsl(rgb):
+    r, g, b = rgb[:, 0], rgb[:, 1], rgb[:, 2]
+    cmax = np.max(rgb[:, :3], axis=1)
+    cmin = np.min(rgb[:, :3], axis=1)
+    l = np.minimum(1.0, (cmax + cmin) * 0.5)
+    delta = cmax - cmin
+    d = np.where(delta != 0.0, delta, 1.0)
+    s = np.where(l > 0.5, _safe_divide(delta, 2.0 - cmax - cmin), _safe_divide(delta, cmax + cmin))
+    h = np.where(cmax == r, (g - b) / d + np.where(g < b, 6.0, 0.0),
+                 np.where(cmax == g, (b - r) / d + 2.0, (r - g) / d + 4.0))
+    chromatic = cmax != cmin
+    return np.stack([np.where(chromatic, np.mod(h / 6.0, 1.0), 0.0), np.where(chromatic, s, 0.0), l], axis=1)
+
+
+def _hsl_to_rgb(hsl):
+    h, s, l = hsl[:, 0], hsl[:, 1], hsl[:, 2]
+    nr = np.clip(np.abs(h * 6.0 - 3.0) - 1.0, 0.0, 1.0)
+    ng = np.clip(2.0 - np.abs(h * 6.0 - 2.0), 0.0, 1.0)
+    nb = np.clip(2.0 - np.abs(h * 6.0 - 4.0), 0.0, 1.0)
+    chroma = (1.0 - np.abs(2.0 * l - 1.0)) * s
+    return np.stack([(nr - 0.5) * chroma + l, (ng - 0.5) * chroma + l, (nb - 0.5) * chroma + l], axis=1)
+
+#endregion
+
+
+#region Nodes
+
+def _eval_math(ev: "GraphEvaluator", node: dict) -> list:
+    p = node.get("params", {})
+    op = int(p.get("operation", 0))
+    a = ev.input(node, 0, "a", 1, 0.0)
+    b = ev.input(node, 1, "b", 1, 0.0)
+    c = ev.input(node, 2, "c", 1, 0.0)
+    with np.errstate(all="ignore"):
+        if op == 0: r = a + b
+        elif op == 1: r = a - b
+        elif op == 2: r = a * b
+        elif op == 3: r = _safe_divide(a, b)
+        elif op == 4: r = a * b + c
+        elif op == 5: r = _compatible_pow(a, b)
+        elif op == 6: r = np.log(np.maximum(a, 1e-8))
+        elif op == 7: r = np.sqrt(np.maximum(a, 0.0))
+        elif op == 8: r = 1.0 / np.sqrt(np.maximum(a, 1e-8))
+        elif op == 9: r = np.abs(a)
+        elif op == 10: r = np.exp(a)
+        elif op == 11: r = np.sin(a)
+        elif op == 12: r = np.cos(a)
+        elif op == 13: r = np.tan(a)
+        elif op == 14: r = np.floor(a)
+        elif op == 15: r = np.ceil(a)
+        elif op == 16: r = a - np.floor(a)
+        elif op == 17: r = np.minimum(a, b)
+        elif op == 18: r = np.maximum(a, b)
+        elif op == 19: r = (a < b).astype(np.float64)
+        elif op == 20: r = (a > b).astype(np.float64)
+        elif op == 21: r = np.sign(a)
+        elif op == 22: r = _compatible_mod(a, b)
+        elif op == 23: r = a - b * np.trunc(a / np.maximum(b, 1e-8))
+        elif op == 24: r = a - b * np.floor(a / np.maximum(b, 1e-8))
+        elif op == 25: r = _wrap(a, b, c)
+        elif op == 26: r = np.where(np.abs(b) < 1e-8, 0.0, np.floor(_safe_divide(a, b)) * b)
+        elif op == 27:
+            m = 2.0 * np.abs(b)
+            sm = np.where(m != 0.0, m, 1.0)
+            r = np.where(np.abs(b) < 1e-8, 0.0, np.abs(b) - np.abs(a - sm * np.floor(a / sm) - np.abs(b)))
+        elif op == 28: r = np.arctan2(a, b)
+        elif op == 29: r = (np.abs(a - b) <= np.abs(c)).astype(np.float64)
+        elif op in (30, 31, 34, 35, 36, 37, 38, 39, 40, 41):
+            r = {
+                30: lambda x: np.where(x >= 0.0, np.floor(x + 0.5), np.ceil(x - 0.5)),
+                31: np.trunc, 34: np.arcsin, 35: np.arccos, 36: np.arctan,
+                37: np.sinh, 38: np.cosh, 39: np.tanh,
+                40: np.radians, 41: np.degrees,
+            }[op](a)
+        elif op in (32, 33):
+            h = np.maximum(np.abs(c) - np.abs(a - b), 0.0)
+            k = h * h / (4.0 * np.maximum(np.abs(c), 1e-8))
+            r = np.minimum(a, b) - k if op == 32 else np.maximum(a, b) + k
+        else:
+            r = a
+    if p.get("use_clamp"):
+        r = np.clip(r, 0.0, 1.0)
+    return [r]
+
+
+# операции Vector Math с выходом Value
+_VECTOR_MATH_VALUE_OPS = {10, 11, 12}
+
+
+def _eval_vector_math(ev: "GraphEvaluator", node: dict) -> list:
+    op = int(node.get("params", {}).get("operation", 0))
+    a = ev.input(node, 0, "a", 3, 0.0)
+    if op == 13:
+        b = ev.input(node, 1, "b", 1, 1.0)
+    else:
+        b = ev.input(node, 1, "b", 3, 1.0 if op == 24 else 0.0)
+    if op == 8:
+        c = ev.input(node, 2, "c", 1, 1.45)
+    else:
+        c = ev.input(node, 2, "c", 3, [0.0, 0.0, 1.0] if op == 9 else 0.0)
+
+    n = a.shape[0]
+    value = np.zeros(n)
+    vec = np.zeros((n, 3))
+    with np.errstate(all="ignore"):
+        if op == 0: vec = a + b
+        elif op == 1: vec = a - b
+        elif op == 2: vec = a * b
+        elif op == 3: vec = _safe_divide(a, b)
+        elif op == 4: vec = a * b + c
+        elif op == 5: vec = np.cross(a, b)
+        elif op == 6: vec = (_dot(a, b) / np.maximum(_dot(b, b), 1e-8))[:, None] * b
+        elif op == 7:
+            nb = _safe_normalize(b)
+            vec = a - 2.0 * _dot(nb, a)[:, None] * nb
+        elif op == 8:
+            nb = _safe_normalize(b)
+            d = _dot(nb, a)
+            k = 1.0 - c * c * (1.0 - d * d)
+            vec = np.where((k < 0.0)[:, None], 0.0,
+                           c[:, None] * a - (c * d + np.sqrt(np.maximum(k, 0.0)))[:, None] * nb)
+        elif op == 9: vec = np.where((_dot(c, b) < 0.0)[:, None], a, -a)
+        elif op == 10: value = _dot(a, b)
+        elif op == 11: value = np.linalg.norm(a - b, axis=1)
+        elif op == 12: value = np.linalg.norm(a, axis=1)
+        elif op == 13: vec = a * b[:, None]
+        elif op == 14: vec = _safe_normalize(a)
+        elif op == 15: vec = np.abs(a)
+        elif op == 16: vec = _compatible_pow(a, b)
+        elif op == 17: vec = np.sign(a)
+        elif op == 18: vec = np.minimum(a, b)
+        elif op == 19: vec = np.maximum(a, b)
+        elif op == 20: vec = np.floor(a)
+        elif op == 21: vec = np.ceil(a)
+        elif op == 22: vec = a - np.floor(a)
+        elif op == 23: vec = _compatible_mod(a, b)
+        elif op == 24: vec = _wrap(a, b, c)
+        elif op == 25: vec = np.floor(_safe_divide(a, b)) * b
+        elif op == 26: vec = np.sin(a)
+        elif op == 27: vec = np.cos(a)
+        elif op == 28: vec = np.tan(a)
+    return [vec, value]
+
+
+def _eval_map_range(ev: "GraphEvaluator", node: dict) -> list:
+    p = node.get("params", {})
+    width = 3 if int(p.get("data_type", 0)) == 1 else 1
+    val = ev.input(node, 0, "vector" if width == 3 else "value", width, 0.0)
+    fmin = ev.input(node, 1, "from_min", width, 0.0)
+    fmax = ev.input(node, 2, "from_max", width, 1.0)
+    tmin = ev.input(node, 3, "to_min", width, 0.0)
+    tmax = ev.input(node, 4, "to_max", width, 1.0)
+    mode = int(p.get("mode", 0))
+
+    denom = fmax - fmin
+    denom = np.sign(denom) * np.maximum(np.abs(denom), 1e-8)
+    with np.errstate(all="ignore"):
+        t = (val - fmin) / denom
+    if p.get("clamp"):
+        t = np.clip(t, 0.0, 1.0)
+    if mode == 1:
+        k = np.maximum(ev.input(node, 5, "steps", width, 4.0), 1.0)
+        t = np.round(t * (k - 1.0)) / np.maximum(k - 1.0, 1.0)
+    elif mode == 2:
+        tc = np.clip(t, 0.0, 1.0)
+        t = tc * tc * (3.0 - 2.0 * tc)
+    elif mode == 3:
+        t = t * t * t * (t * (t * 6.0 - 15.0) + 10.0)
+    return [tmin + (tmax - tmin) * t]
+
+
+def _blend(mode: int, t, c1, c2):
+    tt = t[:, None]
+    tm = 1.0 - tt
+    with np.errstate(all="ignore"):
+        if mode == 1: return c1 + (np.minimum(c1, c2) - c1) * tt
+        if mode == 2: return c1 + (c1 * c2 - c1) * tt
+        if mode == 3:
+            tmp = tm + tt * c2
+            return np.where(tmp <= 0.0, 0.0, np.clip(1.0 - (1.0 - c1) / np.where(tmp != 0.0, tmp, 1.0), 0.0, 1.0))
+        if mode == 4: return c1 + (np.maximum(c1, c2) - c1) * tt
+        if mode == 5: return 1.0 - (tm + tt * (1.0 - c2)) * (1.0 - c1)
+        if mode == 6:
+            tmp = 1.0 - tt * c2
+            return np.where(c1 == 0.0, 0.0,
+                            np.where(tmp <= 0.0, 1.0, np.clip(c1 / np.where(tmp != 0.0, tmp, 1.0), 0.0, 1.0)))
+        if mode == 7: return c1 + c2 * tt
+        if mode == 8:
+            return np.where(c1 < 0.5, c1 * (tm + 2.0 * tt * c2), 1.0 - (tm + 2.0 * tt * (1.0 - c2)) * (1.0 - c1))
+        if mode == 9:
+            scr = 1.0 - (1.0 - c2) * (1.0 - c1)
+            return tm * c1 + tt * ((1.0 - c1) * c2 * c1 + c1 * scr)
+        if mode == 10:
+            return np.where(c2 > 0.5, c1 + tt * (2.0 * (c2 - 0.5)), c1 + tt * (2.0 * c2 - 1.0))
+        if mode == 11: return c1 + (np.abs(c1 - c2) - c1) * tt
+        if mode == 12: return np.maximum(c1 + (c2 - 2.0 * c1 * c2) * tt, 0.0)
+        if mode == 13: return c1 - c2 * tt
+        if mode == 14: return np.where(c2 != 0.0, tm * c1 + tt * c1 / np.where(c2 != 0.0, c2, 1.0), c1)
+        if mode in (15, 17):
+            hsv2 = _rgb_to_hsv(c2)
+            hsv = _rgb_to_hsv(c1)
+            hsv[:, 0] = hsv2[:, 0]
+            if mode == 17:
+                hsv[:, 1] = hsv2[:, 1]
+            mixed = c1 + (_hsv_to_rgb(hsv) - c1) * tt
+            return np.where((hsv2[:, 1] != 0.0)[:, None], mixed, c1)
+        if mode == 16:
+            hsv = _rgb_to_hsv(c1)
+            hsv2 = _rgb_to_hsv(c2)
+            grey = hsv[:, 1] == 0.0
+            hsv[:, 1] = tm[:, 0] * hsv[:, 1] + t * hsv2[:, 1]
+            return np.where(grey[:, None], c1, _hsv_to_rgb(hsv))
+        if mode == 18:
+            hsv = _rgb_to_hsv(c1)
+            hsv2 = _rgb_to_hsv(c2)
+            hsv[:, 2] = tm[:, 0] * hsv[:, 2] + t * hsv2[:, 2]
+            return _hsv_to_rgb(hsv)
+    return c1 + (c2 - c1) * tt
+
+
+def _eval_mix(ev: "GraphEvaluator", node: dict) -> list:
+    p = node.get("params", {})
+    data_type = int(p.get("data_type", 2))
+    non_uniform = data_type == 1 and int(p.get("vector_factor_mode", 0)) == 1
+    if non_uniform:
+        t = ev.input(node, 0, "nonuniformfactor", 3, 0.5)
+    else:
+        t = ev.input(node, 0, "factor", 1, 0.5)
+    if p.get("clamp_factor"):
+        t = np.clip(t, 0.0, 1.0)
+
+    if data_type == 0:
+        a = ev.input(node, 1, "a", 1, 0.0)
+        b = ev.input(node, 2, "b", 1, 0.0)
+        r = a + (b - a) * t
+        return [convert(r, 4), convert(r, 3), r]
+    if data_type == 1:
+        a = ev.input(node, 1, "a", 3, 0.0)
+        b = ev.input(node, 2, "b", 3, 0.0)
+        r = a + (b - a) * (t if non_uniform else t[:, None])
+        return [convert(r, 4), r, convert(r, 1)]
+
+    a = ev.input(node, 1, "a", 4, [0.5, 0.5, 0.5, 1.0])[:, :3]
+    b = ev.input(node, 2, "b", 4, [0.5, 0.5, 0.5, 1.0])[:, :3]
+    rgb = _blend(int(p.get("blend_type", 0)), t, a, b)
+    if p.get("clamp_result"):
+        rgb = np.clip(rgb, 0.0, 1.0)
+    col = convert(rgb, 4)
+    return [col, rgb, convert(col, 1)]
+
+
+def _eval_combine_color(ev: "GraphEvaluator", node: dict) -> list:
+    mode = int(node.get("params", {}).get("mode", 0))
+    c = np.stack([ev.input(node, i, k, 1, 0.0) for i, k in enumerate(("r", "g", "b"))], axis=1)
+    if mode == 1:
+        c = _hsv_to_rgb(c)
+    elif mode == 2:
+        c = _hsl_to_rgb(c)
+    return [convert(c, 4)]
+
+
+def _eval_separate_color(ev: "GraphEvaluator", node: dict) -> list:
+    mode = int(node.get("params", {}).get("mode", 0))
+    c = ev.input(node, 0, "color", 4, [0.0, 0.0, 0.0, 1.0])[:, :3]
+    if mode == 1:
+        c = _rgb_to_hsv(c)
+    elif mode == 2:
+        c = _rgb_to_hsl(c)
+    return [c[:, 0], c[:, 1], c[:, 2]]
+
+
+def _eval_combine_xyz(ev: "GraphEvaluator", node: dict) -> list:
+    return [np.stack([ev.input(node, i, k, 1, 0.0) for i, k in enumerate(("x", "y", "z"))], axis=1)]
+
+
+def _eval_separate_xyz(ev: "GraphEvaluator", node: dict) -> list:
+    v = ev.input(node, 0, "vector", 3, 0.0)
+    return [v[:, 0], v[:, 1], v[:, 2]]
+
+
+def _rodri_rotate(v, axis: int, angle):
+    # поворот вокруг координатной оси (частный случай rodri_rotate из Mapping.gdshaderinc)
+    k = np.zeros(3)
+    k[axis] = 1.0
+    c = np.cos(angle)[:, None]
+    s = np.sin(angle)[:, None]
+    kk = np.broadcast_to(k, v.shape)
+    return v * c + np.cross(kk, v) * s + kk * _dot(kk, v)[:, None] * (1.0 - c)
+
+
+def _eval_mapping(ev: "GraphEvaluator", node: dict) -> list:
+    mapping_type = int(node.get("params", {}).get("mapping_type", 0))
+    vec = ev.input(node, 0, "vector", 3, 0.0)
+    loc = ev.input(node, 1, "location", 3, 0.0)
+    rot = ev.input(node, 2, "rotation", 3, 0.0)
+    if not ev.is_linked(node, 2):
+        # в params Euler хранится в градусах, Mapping.gd оборачивает его в radians()
+        rot = np.radians(rot)
+    scale = ev.input(node, 3, "scale", 3, 1.0)
+
+    with np.errstate(all="ignore"):
+        if mapping_type in (0, 2):
+            co = vec * scale
+            for axis in range(3):
+                co = _rodri_rotate(co, axis, rot[:, axis])
+            if mapping_type == 0:
+                co = co + loc
+        elif mapping_type == 1:
+            co = vec - loc
+            for axis in (2, 1, 0):
+                co = _rodri_rotate(co, axis, -rot[:, axis])
+            co = co / scale
+        else:
+            cx, sx = np.cos(rot[:, 0]), np.sin(rot[:, 0])
+            cy, sy = np.cos(rot[:, 1]), np.sin(rot[:, 1])
+            cz, sz = np.cos(rot[:, 2]), np.sin(rot[:, 2])
+            one, zero = np.ones_like(cx), np.zeros_like(cx)
+            # mat3(col0, col1, col2) из GLSL: собираем по столбцам
+            rx = np.stack([np.stack([one, zero, zero], -1), np.stack([zero, cx, -sx], -1), np.stack([zero, sx, cx], -1)], -1)
+            ry = np.stack([np.stack([cy, zero, sy], -1), np.stack([zero, one, zero], -1), np.stack([-sy, zero, cy], -1)], -1)
+            rz = np.stack([np.stack([cz, -sz, zero], -1), np.stack([sz, cz, zero], -1), np.stack([zero, zero, one], -1)], -1)
+            r = rx @ ry @ rz
+            co = _safe_normalize(np.einsum("nji,nj->ni", r, vec / scale))
+    return [co]
+
+
+def _eval_color_ramp(ev: "GraphEvaluator", node: dict) -> list:
+    fac = ev.input(node, 0, "fac", 1, 0.5)
+    col = evaluate_array(node.get("params", {}), fac)
+    return [col, col[:, 3]]
+
+
+def _eval_tex_coord(ev: "GraphEvaluator", node: dict) -> list:
+    return [ev.coord(name) for name in TEX_COORD_OUTPUTS]
+
+
+def _rand_offset(dims: int, seed: float):
+    # _rand_*_offset из noise_texture.gdshaderinc
+    if dims == 1:
+        return 100.0 + noise.hash_float_to_float(seed)[0] * 100.0
+    return np.asarray([100.0 + noise.hash_float_to_float(seed, float(i))[0] * 100.0 for i in range(dims)])
+
+
+def _eval_noise(ev: "GraphEvaluator", node: dict) -> list:
+    p = node.get("params", {})
+    dims = int(p.get("dimensions", 2)) + 1
+    fractal_type = int(p.get("fractal_type", 3))
+
+    w = ev.input(node, 1, "w", 1, 0.0)
+    scale = ev.input(node, 2, "scale", 1, 5.0)
+    detail = np.clip(ev.input(node, 3, "detail", 1, 2.0), 0.0, 15.0)
+    rough = ev.input(node, 4, "roughness", 1, 0.5)
+    lac = ev.input(node, 5, "lacunarity", 1, 2.0)
+    offset = ev.input(node, 6, "offset", 1, 0.0)
+    gain = ev.input(node, 7, "gain", 1, 0.5)
+    distortion = ev.input(node, 8, "distortion", 1, 0.0)
+    normalize = bool(p.get("normalize", True))
+
+    if dims == 1:
+        co = (w * scale)[:, None]
+    else:
+        vec = ev.vector_or_generated(node, 0)
+        if dims == 4:
+            co = np.concatenate([vec, w[:, None]], axis=1) * scale[:, None]
+        else:
+            co = vec[:, :dims] * scale[:, None]
+
+    # сиды смещений как в Noise_texture.gd: сначала distortion, затем два канала цвета
+    color_seeds = (float(dims), float(dims + 1))
+    if np.any(distortion != 0.0):
+        if dims == 1:
+            shift = noise.snoise(co + _rand_offset(1, 0.0))[:, None]
+        else:
+            shift = np.stack([noise.snoise(co + _rand_offset(dims, float(k))) for k in range(dims)], axis=1)
+        co = co + shift * distortion[:, None]
+
+    def f(q):
+        return noise.fractal(fractal_type, q, detail, rough, lac, offset, gain, normalize)
+
+    value = f(co)
+
+    def color():
+        c1 = f(co + _rand_offset(dims, color_seeds[0]))
+        c2 = f(co + _rand_offset(dims, color_seeds[1]))
+        return np.stack([value, c1, c2, np.ones_like(value)], axis=1)
+
+    return [value, color]
+
+
+def _eval_white_noise(ev: "GraphEvaluator", node: dict) -> list:
+    dims = int(node.get("params", {}).get("dimensions", 2)) + 1
+    w = ev.input(node, 1, "w", 1, 0.0)
+    h = noise.hash_float_to_float
+    if dims == 1:
+        value = h(w)
+        rgb = np.stack([value, h(w, 1.0), h(w, 2.0)], axis=1)
+    else:
+        v = ev.vector_or_generated(node, 0)
+        x, y, z = v[:, 0], v[:, 1], v[:, 2]
+        if dims == 2:
+            value = h(x, y)
+            rgb = np.stack([value, h(x, y, 1.0), h(x, y, 2.0)], axis=1)
+        elif dims == 3:
+            value = h(x, y, z)
+            rgb = noise.hash_vec3_to_vec3(x, y, z)
+        else:
+            value = h(x, y, z, w)
+            rgb = noise.hash_vec4_to_vec4(x, y, z, w)[:, :3]
+    return [value, convert(rgb, 4)]
+
+
+_NODE_EVALUATORS: dict[str, Callable] = {
+    "MathModule": _eval_math,
+    "VectorMathModule": _eval_vector_math,
+    "MapRangeModule": _eval_map_range,
+    "MixModule": _eval_mix,
+    "CombineColorModule": _eval_combine_color,
+    "SeparateColorModule": _eval_separate_color,
+    "CombineXYZModule": _eval_combine_xyz,
+    "SeparateXYZModule": _eval_separate_xyz,
+    "MappingModule": _eval_mapping,
+    "ColorRampModule": _eval_color_ramp,
+    "TexCoordModule": _eval_tex_coord,
+    "TexNoiseModule": _eval_noise,
+    "TexWhiteNoiseModule": _eval_white_noise,
+}
+
+
+def is_supported(cls: str) -> bool:
+    return cls in _NODE_EVALUATORS
+
+#endregion
+
+
+class GraphEvaluator:
+    """
+    Ленивое вычисление узлов payload: каждый узел считается один раз для
+    всего пакета точек, результаты кешируются по id узла.
+    """
+
+    def __init__(self, payload: dict, coords: Optional[dict] = None, size: Optional[int] = None):
+        if np is None:
+            raise RuntimeError("numpy is required for graph evaluation")
+        self.nodes: dict[str, dict] = {n["id"]: n for n in payload.get("nodes", [])}
+        self.sources: dict[tuple[str, int], tuple[str, int]] = {}
+        for link in payload.get("links", []):
+            f, o, t, i = parse_link(link)
+            self.sources[(t, i)] = (f, o)
+
+        self.coords: dict = {}
+        for name, arr in (coords or {}).items():
+            a = np.asarray(arr, dtype=np.float64)
+            if a.ndim == 2 and a.shape[1] == 2:
+                a = np.concatenate([a, np.zeros((a.shape[0], 1))], axis=1)
+            self.coords[name.lower()] = a
+        if size is None:
+            size = next((a.shape[0] for a in self.coords.values()), 1)
+        self.size = int(size)
+
+        self._cache: dict[str, list] = {}
+        self._active: set[str] = set()
+
+    def coord(self, name: str):
+        a = self.coords.get(name)
+        if a is None:
+            return np.zeros((self.size, 3))
+        return a
+
+    def is_linked(self, node: dict, index: int) -> bool:
+        return (node["id"], index) in self.sources
+
+    def input(self, node: dict, index: int, key: str, width: int, default):
+        src = self.sources.get((node["id"], index))
+        if src is not None:
+            return convert(self.output(*src), width)
+        return constant(node.get("params", {}).get(key, default), self.size, width)
+
+    def vector_or_generated(self, node: dict, index: int):
+        # незапитанный Vector у текстур берёт Generated (get_generated в шейдере)
+        if self.is_linked(node, index):
+            return self.input(node, index, "vector", 3, 0.0)
+        return self.coord("generated")
+
+    def _node_outputs(self, node_id: str) -> list:
+        cached = self._cache.get(node_id)
+        if cached is not None:
+            return cached
+        node = self.nodes.get(node_id)
+        if node is None:
+            raise KeyError(node_id)
+        fn = _NODE_EVALUATORS.get(node.get("class", ""))
+        if fn is None:
+            raise ValueError(f"node class {node.get('class')} is not supported by evaluator")
+        if node_id in self._active:
+            raise ValueError(f"cycle at node {node_id}")
+        self._active.add(node_id)
+        try:
+            result = fn(self, node)
+        finally:
+            self._active.discard(node_id)
+        self._cache[node_id] = result
+        return result
+
+    def outputs(self, node_id: str) -> list:
+        return [self.output(node_id, i) for i in range(len(self._node_outputs(node_id)))]
+
+    def output(self, node_id: str, index: int = 0):
+        outs = self._node_outputs(node_id)
+        if index >= len(outs):
+            return np.zeros(self.size)
+        # дорогие выходы (цвет шума) узел может вернуть функцией — считаем по запросу
+        if callable(outs[index]):
+            outs[index] = outs[index]()
+        return outs[index]
+
+
+def evaluate(payload: dict, node_id: str, output: int = 0,
+             coords: Optional[dict] = None, size: Optional[int] = None):
+    return GraphEvaluator(payload, coords, size).output(node_id, output)
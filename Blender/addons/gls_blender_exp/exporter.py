@@ -2,15 +2,31 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Optional
 
 try:
     import bpy  # type: ignore
 except Exception:  # pragma: no cover
     bpy = None  # type: ignore
 
-from .utils import make_node_id as _make_node_id, bl_to_gsl_class
+from .utils import make_node_id as _make_node_id, bl_to_gsl_class, canonical_value, subtree_hash, parse_link
 from .registry import get_node_handler
 from .link_adapters import get_link_adapter
+from .config import LINK_TIMEOUT, BATCH_TIMEOUT, PACK_TIMEOUT, TEXTURE_TIMEOUT
+from .variants import group_variants
+from .library import extract_library
+from . import options
+from . import bake
+from . import lod
+from . import cost
+from . import samplers
+from . import packing
+from . import texprep
+from . import textures
+from . import metrics
+from . import profiling
 
 
 def _is_visible_socket(s) -> bool:
@@ -27,53 +43,265 @@ def _is_visible_socket(s) -> bool:
     return True
 
 
-def collect_material_data() -> dict:
+def _annotate_subtree_hashes(nodes: list[dict], link_keys) -> None:
+    # Один топологический проход (Kahn): хеш узла зависит от хешей всех узлов выше по графу
+    by_id = {n["id"]: n for n in nodes}
+    upstream: dict[str, list[tuple]] = {nid: [] for nid in by_id}
+    consumers: dict[str, list[str]] = {nid: [] for nid in by_id}
+    pending: dict[str, int] = {nid: 0 for nid in by_id}
+    for from_id, out_idx, to_id, in_idx in link_keys:
+        if from_id not in by_id or to_id not in by_id:
+            continue
+        upstream[to_id].append((in_idx, from_id, out_idx))
+        consumers[from_id].append(to_id)
+        pending[to_id] += 1
+
+    hashes: dict[str, str] = {}
+    ready = [nid for nid, cnt in pending.items() if cnt == 0]
+    while ready:
+        nid = ready.pop()
+        node = by_id[nid]
+        ups = sorted([in_idx, hashes[from_id], out_idx] for in_idx, from_id, out_idx in upstream[nid])
+        hashes[nid] = subtree_hash(node["class"], node.get("params", {}), ups)
+        node["hash"] = hashes[nid]
+        for to_id in consumers[nid]:
+            pending[to_id] -= 1
+            if pending[to_id] == 0:
+                ready.append(to_id)
+
+
+# Мост в главный поток Blender. None — отдельный таймер на каждую задачу;
+# async-ядро (async_server.py) ставит свой диспетчер с одним постоянным таймером
+_dispatcher = None
+
+
+def set_dispatcher(dispatcher) -> None:
+    """dispatcher.submit(fn) -> concurrent.futures.Future, fn выполняется в главном потоке."""
+    global _dispatcher
+    _dispatcher = dispatcher
+
+
+def main_thread_call(task, op: str, queued: float, phases: dict) -> dict:
+    """Тело задачи в главном потоке: метрики ожидания и занятости, фазы, профилирование."""
+    started = time.perf_counter()
+    metrics.MAIN_THREAD_WAIT.observe(started - queued, op)
+    try:
+        with metrics.timing(phases), profiling.export_scope(op):
+            metrics.add_timing("queue", started - queued)
+            return task()
+    except Exception as e:  # pragma: no cover
+        return {"error": str(e)}
+    finally:
+        metrics.MAIN_THREAD_STALL.observe(time.perf_counter() - started, op)
+
+
+def _run_on_main_thread(task, timeout: float, op: str = "link", timings: Optional[dict] = None) -> dict:
+    """
+    op — метка в метриках: ожидание в очереди таймеров и занятость главного
+    потока. timings — куда добавить фазы запроса для Server-Timing.
+    """
     if bpy is None:
         return {"error": "bpy unavailable"}
 
     if threading.current_thread() is threading.main_thread():
-        return gather_material()
+        with metrics.timing(timings), profiling.export_scope(op):
+            return task()
+
+    # свой словарь фаз: после таймаута задача ещё может дописывать в него
+    phases: dict = {}
+    queued = time.perf_counter()
+
+    if _dispatcher is not None:
+        future = _dispatcher.submit(lambda: main_thread_call(task, op, queued, phases))
+        try:
+            data = future.result(timeout=timeout)
+        except FutureTimeout:
+            future.cancel()
+            metrics.TIMEOUTS.inc(1, op)
+            return {"error": "timeout"}
+        if timings is not None:
+            timings.update(phases)
+        return data
 
     result_holder: dict = {}
     done_evt = threading.Event()
 
     def _task():
         try:
-            result_holder["data"] = gather_material()
-        except Exception as e:  # pragma: no cover
-            result_holder["data"] = {"error": str(e)}
+            result_holder["data"] = main_thread_call(task, op, queued, phases)
         finally:
             done_evt.set()
         return None
 
     bpy.app.timers.register(_task)
 
-    if not done_evt.wait(timeout=2.0):
+    if not done_evt.wait(timeout=timeout):
+        metrics.TIMEOUTS.inc(1, op)
         return {"error": "timeout"}
+    if timings is not None:
+        timings.update(phases)
     return result_holder.get("data", {"error": "unknown"})
 
 
+def _report_progress(stage: str, done: int, total: int) -> None:
+    # в консоль и Godot — примерно каждые 5%, чтобы большой пакет не заваливал лог
+    step = max(1, total // 20)
+    if done != total and done % step:
+        return
+    print(f"[GSL Exporter] {stage}: {done}/{total}")
+    from .server import notify_progress
+    notify_progress(stage, done, total)
+
+
+def _postprocess(deferred: dict[str, list]) -> None:
+    # Тяжёлая часть идёт в потоке запроса: главный поток Blender нужен только для capture() и пикселей
+    started = time.perf_counter()
+    packed = deferred.get("pack", [])
+    baked = deferred.get("bake", [])
+    prepared = deferred.get("textures", [])
+    hashed = deferred.get("hash", [])
+    for payload, jobs in hashed:
+        textures.hash_pending(jobs, payload["nodes"])
+    packing.resolve_hashes(packed)
+    texprep.resolve_hashes(prepared)
+    if packed:
+        packing.pack_materials(
+            packed, lambda groups: _run_on_main_thread(lambda: packing.read_channels(groups), PACK_TIMEOUT, "pack"))
+    if baked:
+        bake.bake_materials(baked, int(options.get("bake")))
+    if prepared:
+        texprep.process_materials(
+            prepared, lambda jobs: _run_on_main_thread(lambda: texprep.read_scaled(jobs), TEXTURE_TIMEOUT, "texture"),
+            lambda done, total: _report_progress("Textures", done, total))
+    changed = {id(p): p for p, _ in packed + baked + prepared
+               if p.get("packed") or p.get("baked") or p.get("preprocessed")}
+    # image_hash входит в params: хеши поддеревьев считаются заново
+    changed.update((id(p), p) for p, _ in hashed)
+    for payload in changed.values():
+        samplers.assign(payload)
+        _annotate_subtree_hashes(payload["nodes"], [parse_link(l) for l in payload["links"]])
+        payload["stats"] = cost.stats(payload)
+    metrics.add_timing("postprocess", time.perf_counter() - started)
+
+
+def _capture_deferred(data: dict, tree, node_id_map: dict, value_inputs: set, deferred: dict) -> None:
+    # Всё, что для упаковки, запекания и предобработки нужно прочитать из bpy
+    images = {node_id_map[n]: n.image for n in tree.nodes if getattr(n, "bl_idname", "") == "ShaderNodeTexImage"}
+    if options.get("pack_channels"):
+        groups = packing.capture(data, value_inputs, images)
+        if groups:
+            deferred.setdefault("pack", []).append((data, groups))
+    if options.get("bake"):
+        deferred.setdefault("bake", []).append((data, bake.capture(data)))
+    profile = texprep.get_profile(options.get("texture_profile"))
+    if profile:
+        jobs = texprep.capture(data, images, profile)
+        if jobs:
+            deferred.setdefault("textures", []).append((data, jobs))
+
+
+# Экспорт делится на задачу для главного потока (link_task/batch_task) и доводку
+# в вызывающем потоке (finish_link/finish_batch): async-ядро ждёт первую, не занимая поток
+
+def link_task(opts: Optional[dict], deferred: dict):
+    def _task() -> dict:
+        with options.using(opts):
+            return gather_material(deferred=deferred)
+    return _task
+
+
+def finish_link(data: dict, deferred: dict, opts: Optional[dict], timings: Optional[dict] = None) -> dict:
+    if deferred and "error" not in data:
+        with options.using(opts), metrics.timing(timings), profiling.export_scope("postprocess"):
+            _postprocess(deferred)
+    return data
 
-def gather_material() -> dict:
-    obj = bpy.context.object  # type: ignore[attr-defined]
-    if obj is None:
-        return {"error": "no active object"}
 
-    mat = obj.active_material
-    if mat is None:
-        return {"error": "object has no active material"}
+def collect_material_data(opts: Optional[dict] = None, timings: Optional[dict] = None) -> dict:
+    """timings — куда сложить время фаз запроса (queue, nodes, links, handlers, gather, postprocess)."""
+    deferred: dict = {}
+    data = _run_on_main_thread(link_task(opts, deferred), LINK_TIMEOUT, "link", timings)
+    return finish_link(data, deferred, opts, timings)
+
+
+def batch_task(names: Optional[list[str]], opts: Optional[dict], deferred: dict):
+    def _task() -> dict:
+        with options.using(opts):
+            return gather_materials(names, deferred=deferred)
+    return _task
+
+
+def collect_batch_data(names: Optional[list[str]] = None, group: bool = False, library: bool = False,
+                       opts: Optional[dict] = None, timings: Optional[dict] = None) -> dict:
+    deferred: dict = {}
+    data = _run_on_main_thread(batch_task(names, opts, deferred), BATCH_TIMEOUT, "batch", timings)
+    return finish_batch(data, deferred, group, library, opts, timings)
+
+
+def finish_batch(data: dict, deferred: dict, group: bool = False, library: bool = False,
+                 opts: Optional[dict] = None, timings: Optional[dict] = None) -> dict:
+    if "materials" not in data:
+        return data
+    if deferred:
+        with options.using(opts), metrics.timing(timings), profiling.export_scope("postprocess"):
+            _postprocess(deferred)
+    if library:
+        data.update(extract_library(data["materials"]))
+    if group:
+        grouped = group_variants(data["materials"])
+        for key in ("missing", "library"):
+            if key in data:
+                grouped[key] = data[key]
+        # в группе материалы делят граф, но не значения (Detail и т.п.) — оценка своя у каждого
+        grouped["stats"] = {p["material"]: p["stats"] for p in data["materials"] if "stats" in p}
+        return grouped
+    return data
 
-    if not mat.use_nodes:
-        return {"error": "material.use_nodes is False"}
 
-    tree = mat.node_tree
+def gather_materials(names: Optional[list[str]] = None, deferred: Optional[dict] = None) -> dict:
+    if names:
+        mats = []
+        missing = []
+        for name in names:
+            mat = bpy.data.materials.get(name)  # type: ignore[attr-defined]
+            if mat is None:
+                missing.append(name)
+            else:
+                mats.append(mat)
+    else:
+        missing = []
+        mats = [m for m in bpy.data.materials  # type: ignore[attr-defined]
+                if getattr(m, "use_nodes", False) and getattr(m, "users", 1) > 0
+                and not getattr(m, "is_grease_pencil", False)]
+
+    payloads: list[dict] = []
+    for mat in sorted(mats, key=lambda m: m.name):
+        # ошибка одного материала не должна обрывать весь пакет
+        try:
+            payloads.append(gather_material(mat, deferred))
+        except Exception as e:
+            payloads.append({"error": str(e), "material": mat.name})
+    data: dict = {"materials": payloads}
+    if missing:
+        data["missing"] = missing
+    return data
+
 
+def _collect_nodes(tree, mat) -> tuple[list[dict], dict]:
     nodes: list[dict] = []
     node_id_map: dict = {}
+    used_ids: set[str] = set()
 
     # collect nodes
-    for idx, n in enumerate(tree.nodes):
-        node_id = _make_node_id(n.name or n.bl_idname, idx)
+    for n in tree.nodes:
+        node_id = _make_node_id(n.name or n.bl_idname)
+        # имена в дереве уникальны; защита только от пустых имён
+        suffix = 1
+        base_id = node_id
+        while node_id in used_ids:
+            suffix += 1
+            node_id = f"{base_id}_{suffix}"
+        used_ids.add(node_id)
         node_id_map[n] = node_id
 
         node_info = {
@@ -138,12 +366,19 @@ def gather_material() -> dict:
             handler(n, node_info, params, mat)
 
         if params:
-            node_info["params"] = params
+            node_info["params"] = canonical_value(params)
 
         nodes.append(node_info)
 
-    # collect links
-    links: list[str] = []
+    # Канонический порядок: одинаковые графы дают побайтно одинаковый JSON
+    nodes.sort(key=lambda d: d["id"])
+    return nodes, node_id_map
+
+
+def _collect_links(tree, node_id_map: dict) -> tuple[set[tuple], set[tuple[str, int]]]:
+    """Связи (from, out, to, in) и входы с float-сокетом."""
+    link_keys: set[tuple] = set()
+    value_inputs: set[tuple[str, int]] = set()
     for l in tree.links:
         if l.from_node is None or l.to_node is None:
             continue
@@ -170,13 +405,65 @@ def gather_material() -> dict:
                 continue
             in_idx = new_idx
 
-        # формат: "from_id,out_idx,to_id,in_idx"
-        links.append(f"{from_id},{out_idx},{to_id},{in_idx}")
+        link_keys.add((from_id, int(out_idx), to_id, int(in_idx)))
+        if getattr(l.to_socket, "type", "") == "VALUE":
+            value_inputs.add((to_id, int(in_idx)))
+    return link_keys, value_inputs
+
+
+def gather_material(mat=None, deferred: Optional[dict] = None) -> dict:
+    """deferred — куда сложить захваченное для упаковки, запекания и предобработки текстур."""
+    if mat is None:
+        obj = bpy.context.object  # type: ignore[attr-defined]
+        if obj is None:
+            return {"error": "no active object"}
+
+        mat = obj.active_material
+        if mat is None:
+            return {"error": "object has no active material"}
+
+    if not mat.use_nodes:
+        return {"error": "material.use_nodes is False", "material": mat.name}
+
+    tree = mat.node_tree
+    t0 = time.perf_counter()
+    nodes, node_id_map = _collect_nodes(tree, mat)
+    # новое содержимое текстур: хеш в потоке запроса, а без него (прямой вызов) — сразу
+    pending = textures.take_pending()
+    if pending and deferred is None:
+        textures.hash_pending(pending, nodes)
+    t1 = time.perf_counter()
+    link_keys, value_inputs = _collect_links(tree, node_id_map)
+    t2 = time.perf_counter()
+    metrics.GATHER_PHASE.observe(t1 - t0, "nodes")
+    metrics.GATHER_PHASE.observe(t2 - t1, "links")
+    metrics.add_timing("nodes", t1 - t0)
+    metrics.add_timing("links", t2 - t1)
+
+    # формат: "from_id,out_idx,to_id,in_idx"
+    links: list[str] = [f"{f},{o},{t},{i}" for f, o, t, i in sorted(link_keys)]
 
     data = {
         "material": mat.name,
         "nodes": nodes,
         "links": links,
     }
+    if pending and deferred is not None:
+        deferred.setdefault("hash", []).append((data, pending))
+
+    level = int(options.get("lod") or 0)
+    if level > 0:
+        data["lod"] = lod.apply(data, level)
+
+    samplers.assign(data)
+
+    _annotate_subtree_hashes(data["nodes"], [parse_link(l) for l in data["links"]])
+    data["stats"] = cost.stats(data)
+
+    if deferred is not None:
+        _capture_deferred(data, tree, node_id_map, value_inputs, deferred)
 
+    t3 = time.perf_counter()
+    metrics.GATHER_PHASE.observe(t3 - t2, "post")
+    metrics.add_timing("gather", t3 - t0)
     return data
@@ -8,6 +8,9 @@ try:
 except Exception:
     bpy = None  # type: ignore
 
+from .. import options
+from ..colorband import bake_lut, encode_lut
+
 
 def _get_interp(coba) -> str:
     try:
@@ -16,6 +19,13 @@ def _get_interp(coba) -> str:
         return "LINEAR"
 
 
+def _get_enum(coba, attr: str, default: str) -> str:
+    try:
+        return str(getattr(coba, attr, default)).upper()
+    except Exception:
+        return default
+
+
 def _color4_from_element(el):
     try:
         c = getattr(el, "color")
@@ -61,5 +71,20 @@ def handle(n, node_info: dict, params: dict, mat) -> None:
     if interp == "CONSTANT":
         params["mode"] = "CONSTANT"
     else:
-        # LINEAR, EASE и всё остальное сводим к LINEAR.
+        # LINEAR, EASE и всё остальное сводим к LINEAR (точный результат — через LUT).
         params["mode"] = "LINEAR"
+
+    params["interpolation"] = interp
+    params["color_mode"] = _get_enum(coba, "color_mode", "RGB")
+    params["hue_interpolation"] = _get_enum(coba, "hue_interpolation", "NEAR")
+
+    # Запекание в LUT: все режимы интерполяции и смешивания цвета как в Blender
+    lut_size = int(options.get("color_ramp_lut") or 0)
+    if lut_size > 0:
+        ramp = {
+            "stops": stops,
+            "interpolation": interp,
+            "color_mode": params["color_mode"],
+            "hue_interpolation": params["hue_interpolation"],
+        }
+        params["lut"] = encode_lut(bake_lut(ramp, lut_size), str(options.get("color_ramp_lut_format")))
@@ -10,6 +10,43 @@ except Exception:
 
 import os
 
+from .. import textures
+
+_FORMAT_EXT = {"PNG": "png", "JPEG": "jpg", "OPEN_EXR": "exr", "HDR": "hdr", "TARGA": "tga",
+               "TARGA_RAW": "tga", "BMP": "bmp", "TIFF": "tif", "WEBP": "webp"}
+
+
+def _packed_file_name(img) -> str:
+    name = os.path.basename(getattr(img, "filepath", "") or "")
+    if name:
+        return name
+    ext = _FORMAT_EXT.get(getattr(img, "file_format", "PNG"), "png")
+    return f"{img.name}.{ext}"
+
+
+def _add_content_info(img, node_id: str, params: dict) -> None:
+    # хеш содержимого: Godot не копирует текстуру повторно, упакованные берёт с /image/<hash>;
+    # новое содержимое хешируется после главного потока (textures.hash_pending)
+    info = None
+    try:
+        packed = getattr(img, "packed_file", None)
+        if packed is not None:
+            info = textures.register_packed(img.name, packed, _packed_file_name(img), node_id)
+        elif params.get("image_path"):
+            info = textures.register_file(params["image_path"], node_id)
+    except Exception as e:
+        print(f"[GSL Exporter] Failed to index texture {getattr(img, 'name', '')}: {e}")
+    if info is None:
+        return
+    if info["hash"] is not None:
+        params["image_hash"] = info["hash"]
+    params["image_bytes"] = info["size"]
+    params["image_file"] = info["file"]
+    size = getattr(img, "size", None)
+    if size and size[0] and size[1]:
+        params["image_width"] = int(size[0])
+        params["image_height"] = int(size[1])
+
 
 def handle(n, node_info: dict, params: dict, mat) -> None:
     # интерполяция
@@ -55,3 +92,6 @@ def handle(n, node_info: dict, params: dict, mat) -> None:
         except Exception:
             if src_path:
                 params["image_path"] = src_path.replace("\\", "/")
+
+    if img is not None:
+        _add_content_info(img, node_info["id"], params)
@@ -0,0 +1,128 @@
+# SPDX-FileCopyrightText: 2025 D.Jorkin
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Поиск повторяющихся подграфов в пакете материалов.
+
+Подграф — узел вместе со всем, что выше него по графу; одинаковые подграфы
+узнаются по Merkle-хешу узла ("hash" из exporter). Подграф, встречающийся в
+нескольких материалах, экспортируется один раз как запись библиотеки, а
+материалы ссылаются на неё по имени, чтобы Godot мог сгенерировать одну
+функцию в .gdshaderinc вместо копии кода в каждом шейдере.
+
+Плагин Godot пока не читает "library" и "library_refs": генерации функций
+библиотеки на его стороне нет. Узлы в материалах при этом остаются целиком,
+так что клиент, не знающий о библиотеке, получает полные шейдеры.
+"""
+from __future__ import annotations
+
+from .utils import parse_link
+
+# Корни, которые не имеют смысла как функция, возвращающая значение
+_EXCLUDED_ROOTS = {"OutputMaterialModule", "BsdfPrincipledModule"}
+
+MIN_MATERIALS: int = 2
+MIN_NODES: int = 3
+
+
+def entry_name(subtree_hash: str) -> str:
+    return f"gsl_lib_{subtree_hash[:8]}"
+
+
+def _closures(payload: dict) -> dict[str, frozenset]:
+    upstream: dict[str, list[str]] = {n["id"]: [] for n in payload.get("nodes", [])}
+    for l in payload.get("links", []):
+        from_id, _, to_id, _ = parse_link(l)
+        if from_id in upstream and to_id in upstream:
+            upstream[to_id].append(from_id)
+
+    memo: dict[str, frozenset] = {}
+    for root in upstream:
+        if root in memo:
+            continue
+        # итеративный обход в глубину: деревья бывают очень глубокими
+        stack = [(root, False)]
+        while stack:
+            nid, expanded = stack.pop()
+            if nid in memo:
+                continue
+            if expanded:
+                acc = {nid}
+                for src in upstream[nid]:
+                    acc |= memo[src]
+                memo[nid] = frozenset(acc)
+                continue
+            stack.append((nid, True))
+            for src in upstream[nid]:
+                if src not in memo:
+                    stack.append((src, False))
+    return memo
+
+
+def extract_library(payloads: list[dict], min_materials: int = MIN_MATERIALS, min_nodes: int = MIN_NODES) -> dict:
+    """
+    Возвращает {"library": [...], "materials": [...]}; в каждый payload материала
+    добавляется "library_refs" со ссылками на записи библиотеки.
+    """
+    valid = [p for p in payloads if "error" not in p]
+    closures = [_closures(p) for p in valid]
+    nodes_by_id = [{n["id"]: n for n in p.get("nodes", [])} for p in valid]
+
+    # hash -> [(material index, root id)]
+    occurrences: dict[str, list[tuple[int, str]]] = {}
+    for mi, nodes in enumerate(nodes_by_id):
+        for nid, node in nodes.items():
+            h = node.get("hash")
+            if not h or node.get("class") in _EXCLUDED_ROOTS:
+                continue
+            if len(closures[mi][nid]) < min_nodes:
+                continue
+            occurrences.setdefault(h, []).append((mi, nid))
+
+    candidates = [h for h, occ in occurrences.items() if len({mi for mi, _ in occ}) >= min_materials]
+    # Крупные подграфы первыми: вложенные в уже выбранные повторно не выносим
+    candidates.sort(key=lambda h: (-len(closures[occurrences[h][0][0]][occurrences[h][0][1]]), h))
+
+    covered: list[set[str]] = [set() for _ in valid]
+    refs: list[list[dict]] = [[] for _ in valid]
+    library: list[dict] = []
+    for h in candidates:
+        free = [(mi, nid) for mi, nid in occurrences[h] if nid not in covered[mi]]
+        if len({mi for mi, _ in free}) < min_materials:
+            continue
+        name = entry_name(h)
+        first_mi, first_root = free[0]
+        member_ids = closures[first_mi][first_root]
+        entry_links = []
+        for l in valid[first_mi].get("links", []):
+            from_id, _, to_id, _ = parse_link(l)
+            if from_id in member_ids and to_id in member_ids:
+                entry_links.append(l)
+        root_node = nodes_by_id[first_mi][first_root]
+        library.append({
+            "name": name,
+            "hash": h,
+            "root": first_root,
+            "outputs": root_node.get("outputs", []),
+            "nodes": [nodes_by_id[first_mi][nid] for nid in sorted(member_ids)],
+            "links": entry_links,
+            "uses": len(free),
+        })
+        for mi, nid in free:
+            members = closures[mi][nid]
+            covered[mi] |= members
+            refs[mi].append({"entry": name, "root": nid, "nodes": sorted(members)})
+
+    materials: list[dict] = []
+    vi = 0
+    for p in payloads:
+        if "error" in p:
+            materials.append(p)
+            continue
+        if refs[vi]:
+            p = dict(p)
+            p["library_refs"] = sorted(refs[vi], key=lambda r: r["root"])
+        materials.append(p)
+        vi += 1
+
+    return {"library": library, "materials": materials}
@@ -140,5 +140,33 @@ _REGISTRY: dict[str, _LinkAdapter] = {
 }
 
 
+ENTRY_POINT_GROUP = "gsl_exporter.link_adapters"
+_entry_points_loaded = False
+
+
+def register_link_adapter(bl_idname: str, adapter: _LinkAdapter) -> None:
+    """Пересчёт индекса входа для стороннего типа узла; None из адаптера — связь пропустить."""
+    _REGISTRY[bl_idname] = adapter
+
+
+def unregister_link_adapter(bl_idname: str) -> None:
+    _REGISTRY.pop(bl_idname, None)
+
+
+def _load_entry_points() -> None:
+    global _entry_points_loaded
+    _entry_points_loaded = True
+    from .registry import load_entry_points, resolve
+    for name, value in load_entry_points(ENTRY_POINT_GROUP).items():
+        if name in _REGISTRY:
+            continue
+        try:
+            _REGISTRY[name] = resolve(value)
+        except Exception as e:
+            print(f"[GSL Exporter] Failed to load link adapter {value} for {name}: {e}")
+
+
 def get_link_adapter(bl_idname: str) -> Optional[_LinkAdapter]:
+    if not _entry_points_loaded:
+        _load_entry_points()
     return _REGISTRY.get(bl_idname)
@@ -0,0 +1,110 @@
+# SPDX-FileCopyrightText: 2025 D.Jorkin
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Упрощённые варианты материала для дальних объектов (options: lod=N).
+
+Каждый уровень включает правила предыдущих: меньше Detail у шума, Cubic → Linear
+и Box → Flat у Image Texture, отбрасывание Bump. Пороги уровней — в config.
+Преобразование идёт по готовому payload, поэтому одинаково работает для /link
+и /batch, а выигрыш считается cost.estimate до и после.
+"""
+from __future__ import annotations
+
+from .config import (LOD_MAX_LEVEL, LOD_NOISE_DETAIL_STEP, LOD_MIN_NOISE_DETAIL,
+                     LOD_CUBIC_TO_LINEAR, LOD_BOX_TO_FLAT, LOD_DROP_BUMP)
+from .utils import parse_link
+from . import cost
+
+_BUMP_NORMAL_INPUT = 4
+_INTERP_LINEAR, _INTERP_CUBIC = 0, 2
+_PROJ_FLAT, _PROJ_BOX = 0, 1
+
+
+def _enabled(threshold: int, level: int) -> bool:
+    # 0 в config — правило выключено
+    return 0 < threshold <= level
+
+
+def _simplify_params(node: dict, level: int) -> None:
+    params = node.get("params")
+    if not params:
+        return
+    cls = node.get("class")
+    if cls == "TexNoiseModule" and "detail" in params:
+        detail = float(params["detail"]) - LOD_NOISE_DETAIL_STEP * level
+        params["detail"] = max(min(float(params["detail"]), LOD_MIN_NOISE_DETAIL), detail)
+    elif cls == "TexImageModule":
+        if _enabled(LOD_CUBIC_TO_LINEAR, level) and params.get("interpolation") == _INTERP_CUBIC:
+            params["interpolation"] = _INTERP_LINEAR
+        if _enabled(LOD_BOX_TO_FLAT, level) and params.get("projection") == _PROJ_BOX:
+            params["projection"] = _PROJ_FLAT
+
+
+def _drop_bumps(payload: dict) -> int:
+    nodes = {n["id"]: n for n in payload["nodes"]}
+    links = [parse_link(l) for l in payload["links"]]
+    bumps = {nid for nid, n in nodes.items() if n.get("class") == "BumpModule"}
+    if not bumps:
+        return 0
+
+    # потребители Bump получают его входную нормаль, а без неё — нормаль по умолчанию
+    normal_src = {t: (f, o) for f, o, t, i in links if t in bumps and i == _BUMP_NORMAL_INPUT}
+    rewired = []
+    for f, o, t, i in links:
+        if f in bumps:
+            src = normal_src.get(f)
+            # цепочка Bump → Bump: идём до первой нормали не из Bump
+            while src is not None and src[0] in bumps:
+                src = normal_src.get(src[0])
+            if src is not None:
+                rewired.append((src[0], src[1], t, i))
+            continue
+        rewired.append((f, o, t, i))
+
+    # выше Bump удаляем то, что больше никуда не подключено (граф высоты)
+    upstream: dict[str, set[str]] = {}
+    for f, _, t, _ in links:
+        upstream.setdefault(t, set()).add(f)
+    candidates: set[str] = set()
+    stack = list(bumps)
+    while stack:
+        nid = stack.pop()
+        if nid in candidates:
+            continue
+        candidates.add(nid)
+        stack.extend(upstream.get(nid, ()))
+
+    dead: set[str] = set(bumps)
+    links = [l for l in rewired if l[2] not in dead]
+    while True:
+        used = {f for f, _, _, _ in links}
+        newly = {nid for nid in candidates - dead if nid not in used}
+        if not newly:
+            break
+        dead |= newly
+        links = [l for l in links if l[2] not in dead]
+
+    payload["nodes"] = [n for n in payload["nodes"] if n["id"] not in dead]
+    payload["links"] = [f"{f},{o},{t},{i}" for f, o, t, i in sorted(set(links))]
+    return len(bumps)
+
+
+def apply(payload: dict, level: int) -> dict:
+    """Упрощает payload на месте и возвращает отчёт для payload["lod"]."""
+    level = max(0, min(int(level), LOD_MAX_LEVEL))
+    base = cost.estimate(payload)["total"]
+    dropped = 0
+    if level > 0:
+        for node in payload.get("nodes", []):
+            _simplify_params(node, level)
+        if _enabled(LOD_DROP_BUMP, level):
+            dropped = _drop_bumps(payload)
+    after = cost.estimate(payload)["total"]
+    return {
+        "level": level,
+        "base_cost": round(base, 1),
+        "cost": round(after, 1),
+        "reduction": round(1.0 - after / base, 4) if base > 0 else 0.0,
+        "dropped_bumps": dropped,
+    }
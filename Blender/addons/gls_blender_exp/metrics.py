@@ -0,0 +1,172 @@
+# SPDX-FileCopyrightText: 2025 D.Jorkin
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Счётчики и гистограммы сервера в формате Prometheus (GET /metrics).
+
+Реестр живёт в процессе и обходится без зависимостей: запись — словарь по
+кортежу значений меток под общим замком, гистограмма — bisect по границам.
+Метрики объявлены здесь же, модули только вызывают inc()/observe().
+
+Кроме сводных метрик, время фаз одного запроса собирается в словарь
+(timing()/add_timing()), из которого сервер строит заголовок Server-Timing.
+"""
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Optional
+
+_lock = threading.Lock()
+_metrics: list = []
+_state = threading.local()
+
+# Границы по умолчанию: от 0.5 мс до 30 с
+TIME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+BYTE_BUCKETS = tuple(1024 * 4 ** k for k in range(9))  # 1 КиБ … 64 МиБ
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, doc: str, labels: tuple = ()):
+        self.name, self.doc, self.label_names = name, doc, tuple(labels)
+        self._values: dict[tuple, float] = {}
+        _metrics.append(self)
+
+    def inc(self, amount: float = 1.0, *labels) -> None:
+        with _lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> list[str]:
+        out = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            out.append(f"{self.name}{_labels(self.label_names, labels)} {value:.9g}")
+        return out
+
+
+class Gauge(Counter):
+    def dec(self, amount: float = 1.0, *labels) -> None:
+        self.inc(-amount, *labels)
+
+    def render(self) -> list[str]:
+        out = super().render()
+        out[1] = f"# TYPE {self.name} gauge"
+        return out
+
+
+class Histogram:
+    def __init__(self, name: str, doc: str, labels: tuple = (), buckets: tuple = TIME_BUCKETS):
+        self.name, self.doc, self.label_names = name, doc, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # метки → [счётчики по корзинам (+Inf последней), сумма]
+        self._values: dict[tuple, list] = {}
+        _metrics.append(self)
+
+    def observe(self, value: float, *labels) -> None:
+        idx = bisect_left(self.buckets, value)
+        with _lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][idx] += 1
+            entry[1] += value
+
+    def render(self) -> list[str]:
+        out = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self._values.items()):
+            running = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                running += count
+                le = "+Inf" if bound == float("inf") else f"{bound:.9g}"
+                bucket = _labels(self.label_names, labels, 'le="' + le + '"')
+                out.append(f"{self.name}_bucket{bucket} {running}")
+            out.append(f"{self.name}_sum{_labels(self.label_names, labels)} {total:.9g}")
+            out.append(f"{self.name}_count{_labels(self.label_names, labels)} {running}")
+        return out
+
+
+def render() -> str:
+    with _lock:
+        lines = [line for m in _metrics for line in m.render()]
+    return "\n".join(lines) + "\n"
+
+
+def reset(name: Optional[str] = None) -> None:
+    with _lock:
+        for m in _metrics:
+            if name is None or m.name == name:
+                m._values.clear()
+
+
+#region Request timing
+
+@contextmanager
+def timing(into: Optional[dict]):
+    """Фазы текущего запроса в этом потоке складываются в into (секунды)."""
+    prev = getattr(_state, "timing", None)
+    _state.timing = into
+    try:
+        yield
+    finally:
+        _state.timing = prev
+
+
+def add_timing(name: str, seconds: float) -> None:
+    current = getattr(_state, "timing", None)
+    if current is not None:
+        current[name] = current.get(name, 0.0) + seconds
+
+
+def server_timing(timings: dict) -> str:
+    return ", ".join(f"{name};dur={sec * 1000.0:.2f}" for name, sec in timings.items())
+
+#endregion
+
+
+#region Metrics
+
+HTTP_REQUESTS = Counter("gsl_http_requests_total", "HTTP requests by endpoint and status.", ("endpoint", "status"))
+HTTP_ACCEPT = Histogram("gsl_http_accept_seconds",
+                        "Accepted connection to the first parsed request line and headers.")
+HTTP_CONNECTIONS = Counter("gsl_http_connections_total",
+                           "Accepted connections: keepalive, or single when over MAX_CONNECTIONS.", ("mode",))
+HTTP_OPEN_CONNECTIONS = Gauge("gsl_http_open_connections", "Connections currently open.")
+HTTP_CONNECTION_REQUESTS = Histogram("gsl_http_connection_requests", "Requests served per connection.",
+                                     buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000))
+HTTP_DURATION = Histogram("gsl_http_request_seconds", "Full request handling time.", ("endpoint",))
+
+MAIN_THREAD_WAIT = Histogram("gsl_main_thread_wait_seconds",
+                             "Time a task waited in the Blender timer queue before it ran.", ("op",))
+MAIN_THREAD_STALL = Histogram("gsl_main_thread_stall_seconds",
+                              "Time a task held the Blender main thread.", ("op",))
+TIMEOUTS = Counter("gsl_timeouts_total", "Main-thread tasks that did not finish in time.", ("op",))
+
+GATHER_PHASE = Histogram("gsl_gather_phase_seconds", "gather_material phases: nodes, links, post.", ("phase",))
+HANDLER_SECONDS = Counter("gsl_handler_seconds_total", "Time spent in node handlers.", ("bl_idname",))
+HANDLER_CALLS = Counter("gsl_handler_calls_total", "Node handler calls.", ("bl_idname",))
+HANDLER_ERRORS = Counter("gsl_handler_errors_total", "Node handler calls that raised.", ("bl_idname",))
+HANDLER_SLOW = Counter("gsl_handler_slow_total", "Node handler calls over HANDLER_SLOW_MS.", ("bl_idname",))
+
+DISPATCH_QUEUE = Gauge("gsl_dispatch_queue", "Tasks waiting for the main-thread dispatcher (asyncio core).")
+
+WS_CLIENTS = Gauge("gsl_ws_clients", "Connected WebSocket subscribers.")
+WS_EVENTS = Counter("gsl_ws_events_total",
+                    "Subscription events: sent, coalesced (replaced by a newer one before sending), "
+                    "slow (subscriber disconnected for not reading).", ("outcome",))
+WS_FANOUT = Histogram("gsl_ws_fanout_seconds", "Material change noted to the event queued for subscribers.")
+
+JSON_ENCODE = Histogram("gsl_json_encode_seconds", "json.dumps of a response.", ("endpoint",))
+PAYLOAD_BYTES = Histogram("gsl_payload_bytes", "Response body size.", ("endpoint",), BYTE_BUCKETS)
+
+#endregion
@@ -3,19 +3,35 @@
 
 from __future__ import annotations
 
-from .server import launch_server as _server_launch, stop_server as _server_stop
+import sys
+
+from . import config
 from .exporter import (
     collect_material_data as _export_collect,
     gather_material as _export_gather,
 )
 
 
+def _core():
+    # ядро выбирается при запуске: threading (server.py) или asyncio (async_server.py)
+    if config.SERVER_CORE == "asyncio":
+        from . import async_server
+        return async_server
+    from . import server
+    return server
+
+
 def launch_server() -> None:
-    _server_launch()
+    _core().launch_server()
 
 
 def stop_server() -> None:
-    _server_stop()
+    # останавливаются оба: ядро могли переключить, пока сервер работал
+    from . import server
+    server.stop_server()
+    async_core = sys.modules.get(f"{__package__}.async_server")
+    if async_core is not None:
+        async_core.stop_server()
 
 
 def _collect_material_data() -> dict:
@@ -23,4 +39,4 @@ def _collect_material_data() -> dict:
 
 
 def _gather_material() -> dict:
-    return _export_gather()
\ No newline at end of file
+    return _export_gather()
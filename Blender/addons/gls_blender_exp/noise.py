@@ -0,0 +1,499 @@
+# SPDX-FileCopyrightText: 2025 D.Jorkin
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Шум и хеши Blender на NumPy: то же, что считают blender_hash.gdshaderinc,
+noise_base.gdshaderinc и fractal_noise.gdshaderinc, но сразу для массива точек.
+
+Portions adapted from Blender sources to ensure behavior parity:
+ - source/blender/gpu/shaders/common/gpu_shader_common_hash.glsl
+ - source/blender/gpu/shaders/material/gpu_shader_material_noise.glsl
+ - source/blender/gpu/shaders/material/gpu_shader_material_fractal_noise.glsl
+Copyright (c) Blender Authors, licensed under GPL-2.0-or-later.
+
+Точки передаются массивом формы (N,) для 1D и (N, d) для 2D–4D.
+"""
+from __future__ import annotations
+
+import math
+
+try:
+    import numpy as np  # type: ignore
+except Exception:  # pragma: no cover
+    np = None  # type: ignore
+
+
+_HASH_UINV = 1.0 / 4294967295.0
+_NOISE_WRAP_RANGE = 100000.0
+_PRECISION_LIMIT = 1000000.0
+# Нормировка snoise для 1D..4D (см. _noise_scaleN в noise_base)
+_NOISE_SCALE = (0.2500, 0.6616, 0.9820, 0.8344)
+# Perlin считается кусками: промежуточные массивы помещаются в кеш процессора
+_CHUNK = 32768
+
+
+#region Hash
+
+def _u32(x):
+    return np.atleast_1d(np.asarray(x)).astype(np.uint32)
+
+
+def _rot(x, k: int):
+    return (x << np.uint32(k)) | (x >> np.uint32(32 - k))
+
+
+def _jenkins_mix(a, b, c):
+    a -= c; a ^= _rot(c, 4); c += b
+    b -= a; b ^= _rot(a, 6); a += c
+    c -= b; c ^= _rot(b, 8); b += a
+    a -= c; a ^= _rot(c, 16); c += b
+    b -= a; b ^= _rot(a, 19); a += c
+    c -= b; c ^= _rot(b, 4); b += a
+
+
+def _jenkins_final(a, b, c):
+    c ^= b; c -= _rot(b, 14)
+    a ^= c; a -= _rot(c, 11)
+    b ^= a; b -= _rot(a, 25)
+    c ^= b; c -= _rot(b, 16)
+    a ^= c; a -= _rot(c, 4)
+    b ^= a; b -= _rot(a, 14)
+    c ^= b; c -= _rot(b, 24)
+
+
+def hash_uint(*keys):
+    """hash_uint/hash_uint2/3/4 из blender_hash: 1–4 ключа uint32 → uint32."""
+    n = len(keys)
+    if not 1 <= n <= 4:
+        raise ValueError("hash_uint expects 1..4 keys")
+    ks = np.broadcast_arrays(*[_u32(k) for k in keys])
+    init = np.uint32(0xDEADBEEF + (n << 2) + 13)
+    # a, b, c меняются на месте, как inout в GLSL
+    a = ks[0] + init
+    b = ks[1] + init if n > 1 else np.full(a.shape, init, dtype=np.uint32)
+    c = ks[2] + init if n > 2 else np.full(a.shape, init, dtype=np.uint32)
+    if n == 4:
+        _jenkins_mix(a, b, c)
+        a += ks[3]
+    _jenkins_final(a, b, c)
+    return c
+
+
+def hash_int(*keys):
+    """hash_int..hash_int4: знаковые ключи приводятся к uint32 как uint(k) в GLSL."""
+    return hash_uint(*[np.atleast_1d(np.asarray(k)).astype(np.int64).astype(np.uint32) for k in keys])
+
+
+def _to_unit(h):
+    # float(h) * (1/UINT_MAX) в float32, как на GPU
+    return (h.astype(np.float32) * np.float32(_HASH_UINV)).astype(np.float64)
+
+
+def _float_bits(x):
+    return np.atleast_1d(np.asarray(x, dtype=np.float32)).view(np.uint32)
+
+
+def hash_float_to_float(*components):
+    """hash_float/vec2/vec3/vec4_to_float: хеш битов float32 компонент → [0, 1]."""
+    return _to_unit(hash_uint(*[_float_bits(c) for c in components]))
+
+
+def hash_vec3_to_vec3(x, y, z):
+    return np.stack([
+        hash_float_to_float(x, y, z),
+        hash_float_to_float(x, y, z, 1.0),
+        hash_float_to_float(x, y, z, 2.0),
+    ], axis=-1)
+
+
+def hash_vec4_to_vec4(x, y, z, w):
+    return np.stack([
+        hash_float_to_float(x, y, z, w),
+        hash_float_to_float(w, x, y, z),
+        hash_float_to_float(z, w, x, y),
+        hash_float_to_float(y, z, w, x),
+    ], axis=-1)
+
+#endregion
+
+
+#region Perlin
+
+def _fade(t):
+    return t * t * t * (t * (t * 6.0 - 15.0) + 10.0)
+
+
+_GRAD_TABLES: dict[int, object] = {}
+
+
+def _grad_table(d: int):
+    # _noise_grad линеен по смещению: для каждого значения h это знаки при x, y, z, w.
+    # Таблица строится из эталонного _grad_scalar и заменяет ветвления выборкой.
+    table = _GRAD_TABLES.get(d)
+    if table is None:
+        size = {1: 16, 2: 8, 3: 16, 4: 32}[d]
+        table = np.array([[_grad_scalar(h, [1.0 if j == k else 0.0 for j in range(d)]) for k in range(d)]
+                          for h in range(size)])
+        _GRAD_TABLES[d] = table
+    return table
+
+
+def _grad(h, f):
+    table = _grad_table(f.shape[-1])
+    idx = (h & np.uint32(table.shape[0] - 1)).astype(np.intp)
+    g = table[idx, 0] * f[..., 0]
+    for k in range(1, f.shape[-1]):
+        g += table[idx, k] * f[..., k]
+    return g
+
+
+def perlin(p):
+    """noise_perlin_1d..4d для массива точек (N, d); 1D можно передать формой (N,)."""
+    p = np.asarray(p, dtype=np.float64)
+    if p.ndim == 1:
+        p = p[:, None]
+    if p.shape[0] > _CHUNK:
+        return np.concatenate([perlin(p[i:i + _CHUNK]) for i in range(0, p.shape[0], _CHUNK)])
+    d = p.shape[-1]
+    fl = np.floor(p)
+    ip = fl.astype(np.int64)
+    fp = p - fl
+    # углы решётки: бит k номера угла — смещение по оси k (порядок как в _tri_mix)
+    corners = []
+    for c in range(1 << d):
+        off = np.array([(c >> k) & 1 for k in range(d)], dtype=np.int64)
+        h = hash_int(*[ip[..., k] + off[k] for k in range(d)])
+        corners.append(_grad(h, fp - off))
+    v = np.stack(corners)
+    for k in range(d):
+        u = _fade(fp[..., k])
+        v = v.reshape((-1, 2) + v.shape[1:])
+        v = v[:, 0] * (1.0 - u) + v[:, 1] * u
+    return v[0]
+
+
+def _wrap_coord(p):
+    return np.where(np.abs(p) < _NOISE_WRAP_RANGE, p, np.mod(p, _NOISE_WRAP_RANGE))
+
+
+def _precision_corr(p):
+    return 0.5 * (np.abs(p) >= _PRECISION_LIMIT)
+
+
+def snoise(p):
+    """Знаковый шум в [-1, 1] с нормировкой и защитой точности, как snoise() в шейдере."""
+    p = np.asarray(p, dtype=np.float64)
+    if p.ndim == 1:
+        p = p[:, None]
+    q = _wrap_coord(p) + _precision_corr(p)
+    return _NOISE_SCALE[p.shape[-1] - 1] * perlin(q)
+
+
+def noise(p):
+    return 0.5 * snoise(p) + 0.5
+
+#endregion
+
+
+#region Fractal
+
+def _octave_noise(p, lacunarity, count: int):
+    """
+    snoise во всех октавах сразу: (count, N), октава i берётся в точке p * lacunarity^i.
+    Точки всех октав одного куска уходят в один вызов perlin.
+    """
+    n, d = p.shape
+    lac = np.broadcast_to(lacunarity, (n,))
+    out = np.empty((count, n))
+    step = max(1, _CHUNK // count)
+    for s in range(0, n, step):
+        e = min(n, s + step)
+        scales = np.ones((count, e - s))
+        for i in range(1, count):
+            scales[i] = scales[i - 1] * lac[s:e]
+        pts = (scales[:, :, None] * p[None, s:e]).reshape(-1, d)
+        out[:, s:e] = snoise(pts).reshape(count, e - s)
+    return out
+
+
+def _prepare(p, detail, *params):
+    p = np.asarray(p, dtype=np.float64)
+    if p.ndim == 1:
+        p = p[:, None]
+    n = p.shape[0]
+    detail = np.broadcast_to(np.asarray(detail, dtype=np.float64), (n,))
+    icalc = np.floor(detail)
+    arrays = [np.broadcast_to(np.asarray(v, dtype=np.float64), (n,)) for v in params]
+    rmd = detail - icalc
+    # лишняя октава нужна только под дробный остаток detail
+    count = int(icalc.max(initial=0.0)) + (2 if np.any(rmd != 0.0) else 1)
+    return p, icalc, rmd, count, arrays
+
+
+def fbm(p, detail, roughness, lacunarity, normalize=True):
+    """
+    noise_fbm: detail/roughness/lacunarity — числа или массивы (N,),
+    дробная часть detail смешивает последнюю октаву.
+    """
+    p, icalc, rmd, count, (rough, lac) = _prepare(p, detail, roughness, lacunarity)
+    octaves = _octave_noise(p, lac, count)
+    n = p.shape[0]
+    amp = np.ones(n)
+    maxamp = np.zeros(n)
+    total = np.zeros(n)
+    for i in range(count):
+        active = i <= icalc
+        total = np.where(active, total + octaves[i] * amp, total)
+        maxamp = np.where(active, maxamp + amp, maxamp)
+        if i == count - 1:
+            break
+        amp = np.where(active, amp * rough, amp)
+
+    if not np.any(rmd != 0.0):
+        return 0.5 * total / maxamp + 0.5 if normalize else total
+    # amp — вес следующей за icalc октавы
+    tail_noise = np.take_along_axis(octaves, (icalc + 1).astype(np.intp)[None], axis=0)[0]
+    total2 = total + tail_noise * amp
+    if normalize:
+        base = 0.5 * total / maxamp + 0.5
+        tail = 0.5 * total2 / (maxamp + amp) + 0.5
+    else:
+        base, tail = total, total2
+    return np.where(rmd != 0.0, base + (tail - base) * rmd, base)
+
+
+def multi_fractal(p, detail, roughness, lacunarity):
+    p, icalc, rmd, count, (rough, lac) = _prepare(p, detail, roughness, lacunarity)
+    octaves = _octave_noise(p, lac, count)
+    value = np.ones(p.shape[0])
+    pwr = np.ones(p.shape[0])
+    for i in range(count):
+        full = i <= icalc
+        last = i == icalc + 1
+        term = np.where(full, pwr * octaves[i] + 1.0, np.where(last & (rmd != 0.0), rmd * pwr * octaves[i] + 1.0, 1.0))
+        value = value * term
+        pwr = np.where(full, pwr * rough, pwr)
+    return value
+
+
+def hetero_terrain(p, detail, roughness, lacunarity, offset):
+    p, icalc, rmd, count, (rough, lac, offset) = _prepare(p, detail, roughness, lacunarity, offset)
+    octaves = _octave_noise(p, lac, count)
+    value = offset + octaves[0]
+    pwr = rough.copy()
+    for i in range(1, count):
+        full = i <= icalc
+        last = (i == icalc + 1) & (rmd != 0.0)
+        increment = (octaves[i] + offset) * pwr * value
+        value = np.where(full, value + increment, np.where(last, value + rmd * increment, value))
+        pwr = np.where(full, pwr * rough, pwr)
+    return value
+
+
+def hybrid_multi_fractal(p, detail, roughness, lacunarity, offset, gain):
+    p, icalc, rmd, count, (rough, lac, offset, gain) = _prepare(p, detail, roughness, lacunarity, offset, gain)
+    octaves = _octave_noise(p, lac, count)
+    n = p.shape[0]
+    pwr = np.ones(n)
+    value = np.zeros(n)
+    weight = np.ones(n)
+    for i in range(count):
+        alive = weight > 0.001
+        full = alive & (i <= icalc)
+        last = alive & (i == icalc + 1) & (rmd != 0.0)
+        w = np.minimum(weight, 1.0)
+        signal = (octaves[i] + offset) * pwr
+        value = np.where(full, value + w * signal, np.where(last, value + rmd * w * signal, value))
+        weight = np.where(full, w * gain * signal, weight)
+        pwr = np.where(full, pwr * rough, pwr)
+    return value
+
+
+def ridged_multi_fractal(p, detail, roughness, lacunarity, offset, gain):
+    p, icalc, _rmd, count, (rough, lac, offset, gain) = _prepare(p, detail, roughness, lacunarity, offset, gain)
+    # остаток detail ridged не использует
+    count = int(icalc.max(initial=0.0)) + 1
+    octaves = _octave_noise(p, lac, count)
+    pwr = rough.copy()
+    signal = offset - np.abs(octaves[0])
+    signal = signal * signal
+    value = signal
+    for i in range(1, count):
+        full = i <= icalc
+        weight = np.clip(signal * gain, 0.0, 1.0)
+        s = offset - np.abs(octaves[i])
+        s = s * s * weight
+        value = np.where(full, value + s * pwr, value)
+        signal = np.where(full, s, signal)
+        pwr = np.where(full, pwr * rough, pwr)
+    return value
+
+
+# индексы fractal_type как в Noise_texture.gd
+FRACTAL_TYPES = ("MULTIFRACTAL", "RIDGED_MULTIFRACTAL", "HYBRID_MULTIFRACTAL", "FBM", "HETERO_TERRAIN")
+
+
+def fractal(fractal_type: int, p, detail, roughness, lacunarity, offset, gain, normalize=True):
+    """_compute_fractal из fractal_noise.gdshaderinc."""
+    if fractal_type == 0:
+        return multi_fractal(p, detail, roughness, lacunarity)
+    if fractal_type == 1:
+        return ridged_multi_fractal(p, detail, roughness, lacunarity, offset, gain)
+    if fractal_type == 2:
+        return hybrid_multi_fractal(p, detail, roughness, lacunarity, offset, gain)
+    if fractal_type == 3:
+        return fbm(p, detail, roughness, lacunarity, normalize)
+    return hetero_terrain(p, detail, roughness, lacunarity, offset)
+
+#endregion
+
+
+#region Scalar reference
+
+_M32 = 0xFFFFFFFF
+
+
+def _rot_s(x: int, k: int) -> int:
+    return ((x << k) | (x >> (32 - k))) & _M32
+
+
+def hash_uint_scalar(*keys: int) -> int:
+    """Построчный перенос hash_uint* из GLSL на int Python — эталон для сверки."""
+    n = len(keys)
+    a = b = c = (0xDEADBEEF + (n << 2) + 13) & _M32
+    k = [x & _M32 for x in keys]
+    a = (a + k[0]) & _M32
+    if n > 1:
+        b = (b + k[1]) & _M32
+    if n > 2:
+        c = (c + k[2]) & _M32
+    if n == 4:
+        for s1, s2, s3 in ((4, 6, 8), (16, 19, 4)):
+            a = (a - c) & _M32; a ^= _rot_s(c, s1); c = (c + b) & _M32
+            b = (b - a) & _M32; b ^= _rot_s(a, s2); a = (a + c) & _M32
+            c = (c - b) & _M32; c ^= _rot_s(b, s3); b = (b + a) & _M32
+        a = (a + k[3]) & _M32
+    c ^= b; c = (c - _rot_s(b, 14)) & _M32
+    a ^= c; a = (a - _rot_s(c, 11)) & _M32
+    b ^= a; b = (b - _rot_s(a, 25)) & _M32
+    c ^= b; c = (c - _rot_s(b, 16)) & _M32
+    a ^= c; a = (a - _rot_s(c, 4)) & _M32
+    b ^= a; b = (b - _rot_s(a, 14)) & _M32
+    c ^= b; c = (c - _rot_s(b, 24)) & _M32
+    return c
+
+
+def _grad_scalar(h: int, f: list[float]) -> float:
+    def neg(v, cond):
+        return -v if cond else v
+    if len(f) == 1:
+        h &= 15
+        return neg(1.0 + (h & 7), h & 8) * f[0]
+    if len(f) == 2:
+        h &= 7
+        x, y = f
+        return neg(x if h < 4 else y, h & 1) + neg(2.0 * (y if h < 4 else x), h & 2)
+    if len(f) == 3:
+        h &= 15
+        x, y, z = f
+        vt = x if h in (12, 14) else z
+        return neg(x if h < 8 else y, h & 1) + neg(y if h < 4 else vt, h & 2)
+    h &= 31
+    x, y, z, w = f
+    return neg(x if h < 24 else y, h & 1) + neg(y if h < 16 else z, h & 2) + neg(z if h < 8 else w, h & 4)
+
+
+def perlin_scalar(p: list[float]) -> float:
+    d = len(p)
+    ip = [math.floor(v) for v in p]
+    fp = [v - i for v, i in zip(p, ip)]
+    vals = []
+    for c in range(1 << d):
+        off = [(c >> k) & 1 for k in range(d)]
+        h = hash_uint_scalar(*[ip[k] + off[k] for k in range(d)])
+        vals.append(_grad_scalar(h, [fp[k] - off[k] for k in range(d)]))
+    for k in range(d):
+        u = fp[k] * fp[k] * fp[k] * (fp[k] * (fp[k] * 6.0 - 15.0) + 10.0)
+        vals = [vals[2 * j] * (1.0 - u) + vals[2 * j + 1] * u for j in range(len(vals) // 2)]
+    return vals[0]
+
+
+def snoise_scalar(p: list[float]) -> float:
+    q = []
+    for v in p:
+        w = v if abs(v) < _NOISE_WRAP_RANGE else v - _NOISE_WRAP_RANGE * math.floor(v / _NOISE_WRAP_RANGE)
+        q.append(w + (0.5 if abs(v) >= _PRECISION_LIMIT else 0.0))
+    return _NOISE_SCALE[len(p) - 1] * perlin_scalar(q)
+
+
+def fractal_scalar(fractal_type: int, p: list[float], detail: float, roughness: float,
+                   lacunarity: float, offset: float, gain: float, normalize: bool = True) -> float:
+    """Циклы fractal_noise.gdshaderinc без векторизации."""
+    def sn(q, s):
+        return snoise_scalar([v * s for v in q])
+
+    icalc = int(math.floor(detail))
+    rmd = detail - icalc
+    if fractal_type == 3:
+        fscale, amp, maxamp, total = 1.0, 1.0, 0.0, 0.0
+        for _ in range(icalc + 1):
+            total += sn(p, fscale) * amp
+            maxamp += amp
+            amp *= roughness
+            fscale *= lacunarity
+        if rmd != 0.0:
+            total2 = total + sn(p, fscale) * amp
+            if normalize:
+                a, b = 0.5 * total / maxamp + 0.5, 0.5 * total2 / (maxamp + amp) + 0.5
+            else:
+                a, b = total, total2
+            return a + (b - a) * rmd
+        return 0.5 * total / maxamp + 0.5 if normalize else total
+    if fractal_type == 0:
+        value, pwr, s = 1.0, 1.0, 1.0
+        for _ in range(icalc + 1):
+            value *= pwr * sn(p, s) + 1.0
+            pwr *= roughness
+            s *= lacunarity
+        if rmd != 0.0:
+            value *= rmd * pwr * sn(p, s) + 1.0
+        return value
+    if fractal_type == 4:
+        pwr, value, s = roughness, offset + sn(p, 1.0), lacunarity
+        for _ in range(1, icalc + 1):
+            value += (sn(p, s) + offset) * pwr * value
+            pwr *= roughness
+            s *= lacunarity
+        if rmd != 0.0:
+            value += rmd * (sn(p, s) + offset) * pwr * value
+        return value
+    if fractal_type == 2:
+        pwr, value, weight, s = 1.0, 0.0, 1.0, 1.0
+        i = 0
+        while weight > 0.001 and i <= icalc:
+            weight = min(weight, 1.0)
+            signal = (sn(p, s) + offset) * pwr
+            pwr *= roughness
+            value += weight * signal
+            weight *= gain * signal
+            s *= lacunarity
+            i += 1
+        if rmd != 0.0 and weight > 0.001:
+            weight = min(weight, 1.0)
+            value += rmd * weight * (sn(p, s) + offset) * pwr
+        return value
+    pwr, s = roughness, 1.0
+    signal = offset - abs(sn(p, s))
+    signal *= signal
+    value = signal
+    for _ in range(1, icalc + 1):
+        s *= lacunarity
+        weight = min(max(signal * gain, 0.0), 1.0)
+        signal = offset - abs(sn(p, s))
+        signal *= signal
+        signal *= weight
+        value += signal * pwr
+        pwr *= roughness
+    return value
+
+#endregion
@@ -0,0 +1,77 @@
+# SPDX-FileCopyrightText: 2025 D.Jorkin
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Параметры экспорта, действующие на время одного запроса.
+
+Сервер разбирает их из query-строки, exporter устанавливает их в главном потоке
+на время gather_material, а обработчики узлов читают через get().
+"""
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from typing import Any, Optional
+
+DEFAULTS: dict[str, Any] = {
+    # 0 — отправлять точки Color Ramp как есть, иначе запечь LUT такого размера
+    "color_ramp_lut": 0,
+    # float → RGBA32F, byte → RGBA8
+    "color_ramp_lut_format": "float",
+    # 0 — всё процедурно, иначе запечь дорогие подграфы от UV/Generated в PNG такого размера
+    "bake": 0,
+    # папка для PNG; пусто — BAKE_DIR_NAME рядом с .blend
+    "bake_dir": "",
+    # складывать одноканальные Non-Color текстуры по каналам одного PNG, см. packing.py
+    "pack_channels": False,
+    # профиль предобработки текстур из config.TEXTURE_PROFILES; пусто — файлы как есть
+    "texture_profile": "",
+    # кэш обработанных текстур; пусто — TEXTURE_CACHE_DIR_NAME во временной папке
+    "texture_cache_dir": "",
+    # уровень упрощения для дальних объектов, см. lod.py
+    "lod": 0,
+}
+
+_state = threading.local()
+
+
+def get(name: str) -> Any:
+    current: Optional[dict] = getattr(_state, "options", None)
+    if current and name in current:
+        return current[name]
+    return DEFAULTS.get(name)
+
+
+@contextmanager
+def using(overrides: Optional[dict] = None):
+    prev: Optional[dict] = getattr(_state, "options", None)
+    merged = dict(prev or {})
+    merged.update(overrides or {})
+    _state.options = merged
+    try:
+        yield
+    finally:
+        _state.options = prev
+
+
+def _coerce(raw: str, default: Any) -> Any:
+    if isinstance(default, bool):
+        return raw.strip().lower() in ("1", "true", "yes", "on")
+    if isinstance(default, int):
+        return int(raw)
+    if isinstance(default, float):
+        return float(raw)
+    return raw
+
+
+def from_query(query: dict) -> dict:
+    out: dict = {}
+    for name, default in DEFAULTS.items():
+        values = query.get(name)
+        if not values:
+            continue
+        try:
+            out[name] = _coerce(values[0], default)
+        except (TypeError, ValueError):
+            continue
+    return out
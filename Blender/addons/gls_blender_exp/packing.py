@@ -0,0 +1,287 @@
+# SPDX-FileCopyrightText: 2025 D.Jorkin
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Упаковка одноканальных текстур в одну (options: pack_channels=1).
+
+Шероховатость, металличность, AO и высота обычно лежат в отдельных картинках,
+из которых материал берёт одно число: через Separate Color (RGB) или сразу во
+float-вход (в Godot это яркость). Такие Image Texture с Non-Color, одного
+размера, с одинаковой выборкой и одним входом Vector складываются по каналам
+R/G/B одного PNG. После этого samplers.assign сливает их в одну выборку, а
+нужный канал достаёт Separate Color.
+
+capture() и read_channels() вызываются в главном потоке Blender (граф и
+пиксели), pack_materials() — в потоке запроса: NumPy и PNG в пуле процессов.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import Optional
+
+try:
+    import bpy  # type: ignore
+except Exception:  # pragma: no cover
+    bpy = None  # type: ignore
+
+try:
+    import numpy as np  # type: ignore
+except Exception:  # pragma: no cover
+    np = None  # type: ignore
+
+from .config import PACK_DIR_NAME, PACK_CHANNELS
+from .bake import write_png
+from .utils import parse_link, sanitize
+from . import options
+from . import textures
+from . import workers
+
+_TEX_IMAGE = "TexImageModule"
+_SEPARATE_COLOR = "SeparateColorModule"
+_NON_COLOR = 1
+_COLOR_OUTPUT, _ALPHA_OUTPUT = 0, 1
+_VECTOR_INPUT = 0
+_SEP_MODE_RGB = 0
+# float-вход получает vec4 как яркость (convert_socket в Godot)
+_LUMA = (0.2126, 0.7152, 0.0722)
+_LUMA_SOURCE = "luma"
+# 8 бит на канал: 16-битные и float-картинки (высота) в PNG8 теряли бы точность
+_MAX_BYTE_DEPTH = 32
+# параметры изображения, а не выборки: у упакованных узлов они свои
+_IMAGE_PARAMS = ("image_path", "image_hash", "image_bytes", "image_file", "sampler")
+
+_PACK_VERSION = "1"
+
+
+#region Capture
+
+def _pack_dir() -> str:
+    custom = options.get("bake_dir")
+    if custom:
+        return custom
+    if bpy is not None and bpy.data.filepath:
+        return bpy.path.abspath("//" + PACK_DIR_NAME)
+    return os.path.join(tempfile.gettempdir(), PACK_DIR_NAME)
+
+
+def _is_byte_image(img) -> bool:
+    if img is None or getattr(img, "is_float", False):
+        return False
+    try:
+        return 0 < int(img.depth) <= _MAX_BYTE_DEPTH and img.size[0] > 0 and img.size[1] > 0
+    except Exception:
+        return False
+
+
+def _single_channel_use(nid: str, nodes: dict, consumers: dict, value_inputs: set) -> Optional[tuple]:
+    """(источник, Separate Color) — что узел отдаёт дальше, если это одно число; иначе None."""
+    if consumers.get((nid, _ALPHA_OUTPUT)):
+        return None
+    uses = consumers.get((nid, _COLOR_OUTPUT), [])
+    if not uses:
+        return None
+    if all(use in value_inputs for use in uses):
+        return _LUMA_SOURCE, None
+    if len(uses) != 1:
+        return None
+    sep, in_idx = uses[0]
+    node = nodes.get(sep, {})
+    if node.get("class") != _SEPARATE_COLOR or in_idx != 0:
+        return None
+    if int(node.get("params", {}).get("mode", _SEP_MODE_RGB)) != _SEP_MODE_RGB:
+        return None
+    outs = {o for (f, o) in consumers if f == sep and consumers[(f, o)]}
+    if len(outs) != 1:
+        return None
+    return next(iter(outs)), sep
+
+
+def _pack_key(members: list[dict]) -> str:
+    src = json.dumps([_PACK_VERSION] + [[m["hash"], m["source"]] for m in members])
+    return hashlib.sha1(src.encode("utf-8")).hexdigest()[:16]
+
+
+def capture(payload: dict, value_inputs: set, images: dict) -> list[dict]:
+    """
+    Группы упаковки материала; вызывать в главном потоке.
+    value_inputs — (узел, вход) с float-сокетом, images — id узла → bpy Image.
+    """
+    nodes = {n["id"]: n for n in payload.get("nodes", [])}
+    consumers: dict[tuple[str, int], list[tuple[str, int]]] = {}
+    vector_src: dict[str, tuple[str, int]] = {}
+    for f, o, t, i in (parse_link(l) for l in payload.get("links", [])):
+        consumers.setdefault((f, o), []).append((t, i))
+        if nodes.get(t, {}).get("class") == _TEX_IMAGE and i == _VECTOR_INPUT:
+            vector_src[t] = (f, o)
+
+    buckets: dict[str, list[dict]] = {}
+    for nid, node in sorted(nodes.items()):
+        params = node.get("params", {})
+        if node.get("class") != _TEX_IMAGE or params.get("color_space") != _NON_COLOR:
+            continue
+        if not params.get("image_file") or not params.get("image_width"):
+            continue
+        img = images.get(nid)
+        if not _is_byte_image(img):
+            continue
+        use = _single_channel_use(nid, nodes, consumers, value_inputs)
+        if use is None:
+            continue
+        sampling = {k: v for k, v in params.items() if k not in _IMAGE_PARAMS}
+        key = json.dumps([sampling, vector_src.get(nid)], sort_keys=True)
+        buckets.setdefault(key, []).append({
+            "node": nid, "image": img.name, "hash": None, "params": params,
+            "source": use[0], "separate": use[1],
+        })
+
+    groups: list[dict] = []
+    for members in buckets.values():
+        for start in range(0, len(members), PACK_CHANNELS):
+            chunk = members[start:start + PACK_CHANNELS]
+            if len(chunk) < 2:
+                continue
+            for channel, m in enumerate(chunk):
+                m["channel"] = channel
+            # ключ и путь зависят от хешей исходников: они появятся в resolve_hashes()
+            groups.append({"key": None, "path": None, "material": payload.get("material", "material"),
+                           "members": chunk})
+    return groups
+
+
+def resolve_hashes(items: list[tuple[dict, list]]) -> None:
+    """После textures.hash_pending: хеши исходников → ключ и путь PNG группы."""
+    out_dir = _pack_dir()
+    for _, groups in items:
+        for group in list(groups):
+            for m in group["members"]:
+                m["hash"] = m.pop("params").get("image_hash")
+            if not all(m["hash"] for m in group["members"]):
+                groups.remove(group)  # исходник не прочитался — группа не упаковывается
+                continue
+            group["key"] = _pack_key(group["members"])
+            material = sanitize(str(group.pop("material")))  # годится для имени файла
+            group["path"] = os.path.join(out_dir, f"{material}_packed_{group['key']}.png")
+
+
+def read_channels(groups: list[dict]) -> dict[str, list]:
+    """key группы → каналы uint8 (h, w), верхняя строка первой; вызывать в главном потоке."""
+    out: dict[str, list] = {}
+    if bpy is None or np is None:
+        return out
+    for group in groups:
+        channels = []
+        for m in group["members"]:
+            img = bpy.data.images.get(m["image"])
+            if not _is_byte_image(img):
+                break
+            w, h = int(img.size[0]), int(img.size[1])
+            px = np.empty(w * h * int(img.channels), dtype=np.float32)
+            img.pixels.foreach_get(px)
+            px = px.reshape(h, w, int(img.channels))[::-1]
+            if px.shape[2] < 3:
+                value = px[..., 0]
+            elif m["source"] == _LUMA_SOURCE:
+                value = px[..., :3] @ np.asarray(_LUMA, dtype=np.float32)
+            else:
+                value = px[..., int(m["source"])]
+            channels.append(np.round(np.clip(value, 0.0, 1.0) * 255.0).astype(np.uint8))
+        # размеры в params могли устареть — пакуем только совпавшие
+        if len(channels) == len(group["members"]) and len({c.shape for c in channels}) == 1:
+            out[group["key"]] = channels
+    return out
+
+#endregion
+
+
+#region Pack
+
+def _write_packed(path: str, channels: list) -> str:
+    # выполняется в процессе пула
+    h, w = channels[0].shape
+    rgba = np.zeros((h, w, 4), dtype=np.uint8)
+    for idx, channel in enumerate(channels):
+        rgba[..., idx] = channel
+    rgba[..., 3] = 255
+    write_png(path, rgba)
+    return path
+
+
+def write_packs(groups: list[dict], pixels: dict[str, list]) -> None:
+    """Пишет недостающие PNG; одна задача пула на группу."""
+    # одинаковые группы из разных материалов пакета пишутся один раз
+    jobs = list({g["path"]: (g["path"], pixels[g["key"]]) for g in groups if g["key"] in pixels}.values())
+    if not jobs:
+        return
+    for directory in {os.path.dirname(path) for path, _ in jobs}:
+        os.makedirs(directory, exist_ok=True)
+    results = workers.run_all(_write_packed, jobs, "Pack")
+    for (path, _), result in zip(jobs, results):
+        if isinstance(result, Exception):
+            print(f"[GSL Exporter] Channel packing failed for {os.path.basename(path)}: {result}")
+
+
+def _unique_id(base: str, taken) -> str:
+    nid, suffix = base, 1
+    while nid in taken:
+        suffix += 1
+        nid = f"{base}_{suffix}"
+    return nid
+
+
+def apply(payload: dict, groups: list[dict]) -> None:
+    """Переводит узлы групп с готовым PNG на упакованную текстуру; payload["packed"] — что упаковано."""
+    nodes = {n["id"]: n for n in payload["nodes"]}
+    links = [parse_link(l) for l in payload["links"]]
+    report = payload.setdefault("packed", [])
+    for group in groups:
+        if not os.path.exists(group["path"]):
+            continue
+        info = textures.register_file(group["path"])
+        if info is None:
+            continue
+        path = group["path"].replace("\\", "/")
+        for m in group["members"]:
+            nid, channel = m["node"], m["channel"]
+            nodes[nid]["params"].update({"image_path": path, "image_hash": info["hash"],
+                                         "image_bytes": info["size"], "image_file": info["file"]})
+            if m["separate"] is not None:
+                sep, source = m["separate"], int(m["source"])
+                links = [(f, channel, t, i) if (f, o) == (sep, source) else (f, o, t, i) for f, o, t, i in links]
+                continue
+            sep = _unique_id(f"{nid}_channel", nodes)
+            nodes[sep] = {"id": sep, "name": f"{nodes[nid].get('name', nid)} (channel)",
+                          "class": _SEPARATE_COLOR, "inputs": ["Color"], "outputs": ["Red", "Green", "Blue"],
+                          "params": {"mode": _SEP_MODE_RGB}}
+            links = [(sep, channel, t, i) if (f, o) == (nid, _COLOR_OUTPUT) else (f, o, t, i) for f, o, t, i in links]
+            links.append((nid, _COLOR_OUTPUT, sep, 0))
+        report.append({"image": path, "nodes": [m["node"] for m in group["members"]]})
+
+    if not report:
+        payload.pop("packed", None)
+        return
+    payload["nodes"] = sorted(nodes.values(), key=lambda d: d["id"])
+    payload["links"] = [f"{f},{o},{t},{i}" for f, o, t, i in sorted(set(links))]
+
+
+def pack_materials(items: list[tuple[dict, list]], read_pixels) -> None:
+    """
+    items — пары (payload, capture()). read_pixels(groups) читает пиксели
+    недостающих PNG (read_channels в главном потоке); готовые берутся с диска.
+    """
+    missing = [g for _, groups in items for g in groups if not os.path.exists(g["path"])]
+    if missing and np is not None:
+        pixels = read_pixels(missing)
+        if isinstance(pixels, dict) and "error" not in pixels:
+            write_packs(missing, pixels)
+        else:
+            print(f"[GSL Exporter] Channel packing skipped: {pixels.get('error') if isinstance(pixels, dict) else pixels}")
+    for payload, groups in items:
+        try:
+            apply(payload, groups)
+        except Exception as e:
+            print(f"[GSL Exporter] Channel packing failed for {payload.get('material')}: {e}")
+
+#endregion
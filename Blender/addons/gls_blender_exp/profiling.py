@@ -0,0 +1,167 @@
+# SPDX-FileCopyrightText: 2025 D.Jorkin
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Окна профилирования экспорта: /debug/profile?seconds=N и /debug/memory?seconds=N.
+
+Эндпоинты выключены, пока в настройках аддона не включён Debug Endpoints
+(enabled здесь). Запрос держит окно открытым N секунд и отвечает текстом:
+
+* profile — каждый экспорт за окно (gather в главном потоке и постобработка в
+  потоке запроса, обёрнутые export_scope) идёт под своим cProfile; профили
+  сливаются в один pstats, сортировка по cumulative;
+* memory — tracemalloc на всё окно: снимки до и после, топ мест аллокаций,
+  пик за окно и пик каждого экспорта.
+
+Одновременно открыто не больше одного окна каждого вида.
+"""
+from __future__ import annotations
+
+import cProfile
+import io
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Optional
+
+from .config import DEBUG_CAPTURE_MAX_SECONDS, DEBUG_TOP
+
+# Выставляется настройкой аддона (GSLAddonPreferences.debug_endpoints)
+enabled: bool = False
+
+_window_lock = threading.Lock()
+# cProfile в Python 3.12+ не допускает два активных профайлера сразу: экспорты профилируются по одному
+_profile_lock = threading.Lock()
+_profile: Optional[dict] = None
+_memory: Optional[dict] = None
+
+
+class CaptureBusy(RuntimeError):
+    pass
+
+
+@contextmanager
+def export_scope(label: str):
+    """Обёртка одной единицы экспорта; вне окна почти ничего не стоит."""
+    prof_window, mem_window = _profile, _memory
+    if prof_window is None and mem_window is None:
+        yield
+        return
+    profiler = None
+    if prof_window is not None and _profile_lock.acquire(blocking=False):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # уже работает другой профайлер (например, запущенный вручную)
+            profiler = None
+            _profile_lock.release()
+    if mem_window is not None and tracemalloc.is_tracing():
+        # пик окна не теряем: сброс нужен, чтобы мерить пик этого экспорта
+        peak = tracemalloc.get_traced_memory()[1]
+        with _window_lock:
+            mem_window["peak"] = max(mem_window["peak"], peak)
+        tracemalloc.reset_peak()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            _profile_lock.release()
+            with _window_lock:
+                prof_window["profiles"].append(profiler)
+                prof_window["exports"].append(label)
+        elif prof_window is not None:
+            with _window_lock:
+                prof_window["skipped"] += 1
+        if mem_window is not None and tracemalloc.is_tracing():
+            peak = tracemalloc.get_traced_memory()[1]
+            with _window_lock:
+                mem_window["exports"].append((label, (time.perf_counter() - started) * 1000.0, peak))
+
+
+def _clamp_seconds(seconds: float) -> float:
+    return max(0.1, min(float(seconds), DEBUG_CAPTURE_MAX_SECONDS))
+
+
+def _mib(n: float) -> str:
+    return f"{n / (1024 * 1024):.2f} MiB"
+
+
+def capture_profile(seconds: float, sort: str = "cumulative", limit: int = DEBUG_TOP) -> str:
+    global _profile
+    seconds = _clamp_seconds(seconds)
+    with _window_lock:
+        if _profile is not None:
+            raise CaptureBusy("profile capture already running")
+        window = _profile = {"profiles": [], "exports": [], "skipped": 0}
+    try:
+        time.sleep(seconds)
+    finally:
+        with _window_lock:
+            _profile = None
+
+    out = io.StringIO()
+    out.write(f"GSL profile: {len(window['exports'])} exports in {seconds:g} s")
+    if window["skipped"]:
+        out.write(f", {window['skipped']} concurrent exports not profiled")
+    out.write("\n")
+    for label in window["exports"]:
+        out.write(f"  {label}\n")
+    if not window["profiles"]:
+        out.write("no exports ran during the window\n")
+        return out.getvalue()
+    stats = pstats.Stats(window["profiles"][0], stream=out)
+    for profiler in window["profiles"][1:]:
+        stats.add(profiler)
+    try:
+        stats.sort_stats(sort)
+    except KeyError:
+        stats.sort_stats("cumulative")
+    stats.print_stats(limit)
+    return out.getvalue()
+
+
+def capture_memory(seconds: float, limit: int = DEBUG_TOP, frames: int = 1) -> str:
+    global _memory
+    seconds = _clamp_seconds(seconds)
+    with _window_lock:
+        if _memory is not None:
+            raise CaptureBusy("memory capture already running")
+        window = _memory = {"exports": [], "peak": 0}
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start(max(1, frames))
+    try:
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        time.sleep(seconds)
+        after = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        peak = max(peak, window["peak"])
+    finally:
+        with _window_lock:
+            _memory = None
+        if started_tracing:
+            tracemalloc.stop()
+
+    # аллокации самих инструментов (и окна profile, если оно открыто одновременно) не интересны
+    ignore = [tracemalloc.Filter(False, m.__file__) for m in (tracemalloc, cProfile, pstats)]
+    ignore.append(tracemalloc.Filter(False, __file__))
+    before, after = before.filter_traces(ignore), after.filter_traces(ignore)
+    key = "traceback" if frames > 1 else "lineno"
+    out = io.StringIO()
+    out.write(f"GSL memory: {len(window['exports'])} exports in {seconds:g} s, "
+              f"peak {_mib(peak)}, traced now {_mib(current)}\n")
+    for label, ms, export_peak in window["exports"]:
+        out.write(f"  {label}: {ms:.1f} ms, peak {_mib(export_peak)}\n")
+    out.write(f"\nTop {limit} allocation sites by growth over the window:\n")
+    for stat in after.compare_to(before, key)[:limit]:
+        out.write(f"{stat}\n")
+    out.write(f"\nTop {limit} allocation sites alive at the end:\n")
+    for stat in after.statistics(key)[:limit]:
+        out.write(f"{stat}\n")
+    return out.getvalue()
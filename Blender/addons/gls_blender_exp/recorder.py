@@ -0,0 +1,72 @@
+# SPDX-FileCopyrightText: 2025 D.Jorkin
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Запись сессий /link и /batch в JSONL для Blender/bench/linkload.py.
+
+Строка на запрос: время, путь с query, код, длительность, размер ответа и то,
+что нужно для синтетической замены при повторе (материал, число узлов и связей).
+Включается config.RECORD_SESSIONS при запуске сервера или вручную:
+
+    from gls_blender_exp import recorder; recorder.start("/tmp/gsl_session.jsonl")
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+
+_lock = threading.Lock()
+_file = None
+
+
+def start(path: str) -> None:
+    global _file
+    with _lock:
+        if _file is not None:
+            _file.close()
+        _file = open(path, "a", encoding="utf-8")
+    print(f"[GSL Exporter] Recording sessions to {path}")
+
+
+def stop() -> None:
+    global _file
+    with _lock:
+        if _file is not None:
+            _file.close()
+            _file = None
+
+
+def active() -> bool:
+    return _file is not None
+
+
+def _summary(data: dict) -> dict:
+    if "materials" in data:
+        mats = [m for m in data["materials"] if isinstance(m, dict)]
+        return {"materials": [{"material": m.get("material"), "nodes": len(m.get("nodes") or []),
+                               "links": len(m.get("links") or [])} for m in mats]}
+    out = {"material": data.get("material"), "nodes": len(data.get("nodes") or []),
+           "links": len(data.get("links") or [])}
+    if "delta" in data:
+        out["delta"] = True
+    return out
+
+
+def record(path: str, data: dict, sent_bytes: int, started: float, status: int = 200) -> None:
+    """started — time.perf_counter() в начале обработки запроса."""
+    if _file is None:
+        return
+    entry = {"t": round(time.time(), 4), "path": path, "status": status,
+             "ms": round((time.perf_counter() - started) * 1000.0, 2), "bytes": sent_bytes}
+    if isinstance(data, dict):
+        if data.get("trace"):
+            entry["trace"] = data["trace"]
+        if data.get("error"):
+            entry["error"] = str(data["error"])
+        entry.update(_summary(data))
+    line = json.dumps(entry, ensure_ascii=False)
+    with _lock:
+        if _file is not None:
+            _file.write(line + "\n")
+            _file.flush()
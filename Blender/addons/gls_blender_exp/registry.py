@@ -1,44 +1,214 @@
 # SPDX-Copyright (C) 2025 D.Jorkin
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+"""
+Обработчики узлов по bl_idname.
 
-from typing import Callable, Optional
-
-from .handlers.mapping_handler import handle as _handle_mapping
-from .handlers.tex_image_handler import handle as _handle_tex_image
-from .handlers.mix_handler import handle as _handle_mix
-from .handlers.math_handler import handle as _handle_math
-from .handlers.tex_noise_handler import handle as _handle_tex_noise
-from .handlers.tex_white_noise_handler import handle as _handle_tex_white_noise
-from .handlers.normal_map_handler import handle as _handle_normal_map
-from .handlers.bump_handler import handle as _handle_bump
-from .handlers.vector_math_handler import handle as _handle_vector_math
-from .handlers.map_range_handler import handle as _handle_map_range
-from .handlers.combine_color_handler import handle as _handle_combine_color
-from .handlers.separate_color_handler import handle as _handle_separate_color
-from .handlers.combine_xyz_handler import handle as _handle_combine_xyz
-from .handlers.separate_xyz_handler import handle as _handle_separate_xyz
-from .handlers.color_ramp_handler import handle as _handle_color_ramp
+Встроенные обработчики описаны путём к модулю и импортируются при первом
+узле этого типа: регистрация аддона их не грузит. Сторонние (узлы студии)
+добавляются без правки аддона — из другого аддона или скрипта:
+
+    from gls_blender_exp import registry
+    registry.register_handler("MyStudioNode", "studio_gsl.nodes:handle")
+
+или через entry point группы "gsl_exporter.handlers" (имя — bl_idname,
+значение — "модуль:функция"); такие читаются один раз при первом неизвестном
+типе узла. Связи настраиваются так же: link_adapters.register_link_adapter.
+"""
+import importlib
+import threading
+import time
+from typing import Callable, Optional, Union
+
+from .config import HANDLER_INSTRUMENTATION, HANDLER_SLOW_MS
+from . import metrics
 
 _NodeHandler = Callable[[object, dict, dict, object], None]
 
-_REGISTRY: dict[str, _NodeHandler] = {
-    "ShaderNodeMapping": _handle_mapping,
-    "ShaderNodeTexImage": _handle_tex_image,
-    "ShaderNodeMix": _handle_mix,
-    "ShaderNodeMath": _handle_math,
-    "ShaderNodeTexNoise": _handle_tex_noise,
-    "ShaderNodeNormalMap": _handle_normal_map,
-    "ShaderNodeBump": _handle_bump,
-    "ShaderNodeVectorMath": _handle_vector_math,
-    "ShaderNodeMapRange": _handle_map_range,
-    "ShaderNodeTexWhiteNoise": _handle_tex_white_noise,
-    "ShaderNodeCombineColor": _handle_combine_color,
-    "ShaderNodeSeparateColor": _handle_separate_color,
-    "ShaderNodeCombineXYZ": _handle_combine_xyz,
-    "ShaderNodeSeparateXYZ": _handle_separate_xyz,
-    "ShaderNodeValToRGB": _handle_color_ramp,
+# Встроенные обработчики лежат в handlers/
+_BUILTIN = __package__ + ".handlers."
+
+# bl_idname → "модуль:функция" (полное имя модуля)
+_HANDLER_PATHS: dict[str, str] = {
+    "ShaderNodeMapping": _BUILTIN + "mapping_handler:handle",
+    "ShaderNodeTexImage": _BUILTIN + "tex_image_handler:handle",
+    "ShaderNodeMix": _BUILTIN + "mix_handler:handle",
+    "ShaderNodeMath": _BUILTIN + "math_handler:handle",
+    "ShaderNodeTexNoise": _BUILTIN + "tex_noise_handler:handle",
+    "ShaderNodeNormalMap": _BUILTIN + "normal_map_handler:handle",
+    "ShaderNodeBump": _BUILTIN + "bump_handler:handle",
+    "ShaderNodeVectorMath": _BUILTIN + "vector_math_handler:handle",
+    "ShaderNodeMapRange": _BUILTIN + "map_range_handler:handle",
+    "ShaderNodeTexWhiteNoise": _BUILTIN + "tex_white_noise_handler:handle",
+    "ShaderNodeCombineColor": _BUILTIN + "combine_color_handler:handle",
+    "ShaderNodeSeparateColor": _BUILTIN + "separate_color_handler:handle",
+    "ShaderNodeCombineXYZ": _BUILTIN + "combine_xyz_handler:handle",
+    "ShaderNodeSeparateXYZ": _BUILTIN + "separate_xyz_handler:handle",
+    "ShaderNodeValToRGB": _BUILTIN + "color_ramp_handler:handle",
 }
 
+ENTRY_POINT_GROUP = "gsl_exporter.handlers"
+
+# Загруженные обработчики (встроенные по мере надобности и сторонние)
+_REGISTRY: dict[str, _NodeHandler] = {}
+_load_lock = threading.Lock()
+_entry_points_loaded = False
+
+
+def resolve(path: str) -> Callable:
+    """"модуль:атрибут" → объект; модуль импортируется как есть (в том числе сторонний верхнего уровня)."""
+    module_name, _, attr = path.partition(":")
+    return getattr(importlib.import_module(module_name), attr or "handle")
+
+
+def register_handler(bl_idname: str, handler: Union[_NodeHandler, str]) -> None:
+    """Обработчик для типа узла; строка "модуль:функция" импортируется при первом узле."""
+    with _load_lock:
+        if isinstance(handler, str):
+            _HANDLER_PATHS[bl_idname] = handler
+            _REGISTRY.pop(bl_idname, None)
+        else:
+            _REGISTRY[bl_idname] = handler
+
+
+def unregister_handler(bl_idname: str) -> None:
+    with _load_lock:
+        _REGISTRY.pop(bl_idname, None)
+        _HANDLER_PATHS.pop(bl_idname, None)
+
+
+def known_handlers() -> list[str]:
+    return sorted(set(_HANDLER_PATHS) | set(_REGISTRY))
+
+
+def load_entry_points(group: str = ENTRY_POINT_GROUP) -> dict[str, str]:
+    """Пути из установленных пакетов; уже заданные обработчики не перекрываются."""
+    found: dict[str, str] = {}
+    try:
+        from importlib.metadata import entry_points
+        eps = entry_points(group=group)
+    except Exception:
+        return found
+    for ep in eps:
+        found.setdefault(ep.name, ep.value)
+    return found
+
+
+def _load(bl_idname: str) -> Optional[_NodeHandler]:
+    global _entry_points_loaded
+    # типы без обработчика (BSDF, Output…) встречаются в каждом материале: без замка
+    if _entry_points_loaded and bl_idname not in _HANDLER_PATHS:
+        return None
+    with _load_lock:
+        handler = _REGISTRY.get(bl_idname)
+        if handler is not None:
+            return handler
+        path = _HANDLER_PATHS.get(bl_idname)
+        if path is None and not _entry_points_loaded:
+            _entry_points_loaded = True
+            for name, value in load_entry_points().items():
+                _HANDLER_PATHS.setdefault(name, value)
+            path = _HANDLER_PATHS.get(bl_idname)
+        if path is None:
+            return None
+        try:
+            handler = resolve(path)
+        except Exception as e:
+            print(f"[GSL Exporter] Failed to load handler {path} for {bl_idname}: {e}")
+            # не пытаться на каждом узле
+            _HANDLER_PATHS.pop(bl_idname, None)
+            return None
+        _REGISTRY[bl_idname] = handler
+        return handler
+
+
+def load_all() -> dict[str, _NodeHandler]:
+    """Импортирует все известные обработчики (для бенчмарков и проверок)."""
+    for bl_idname in known_handlers():
+        _load(bl_idname)
+    return dict(_REGISTRY)
+
+
+#region Instrumentation
+
+_stats_lock = threading.Lock()
+# bl_idname → [вызовы, секунды, максимум секунд, ошибки, медленные вызовы]
+_STATS: dict[str, list] = {}
+# обёртки по bl_idname; пересоздаются, если обработчик в _REGISTRY подменили
+_WRAPPED: dict[str, _NodeHandler] = {}
+
+
+def _instrument(bl_idname: str, handler: _NodeHandler) -> _NodeHandler:
+    """Время, счётчики и изоляция ошибок: упавший обработчик помечает узел и экспорт идёт дальше."""
+    def wrapped(node, node_info: dict, params: dict, mat) -> None:
+        error = None
+        snapshot = dict(params)
+        t0 = time.perf_counter()
+        try:
+            handler(node, node_info, params, mat)
+        except Exception as e:
+            error = e
+            # недописанные параметры не уходят в Godot: узел остаётся с тем, что было до обработчика
+            params.clear()
+            params.update(snapshot)
+        spent = time.perf_counter() - t0
+        slow = spent * 1000.0 > HANDLER_SLOW_MS > 0
+        with _stats_lock:
+            entry = _STATS.get(bl_idname)
+            if entry is None:
+                entry = _STATS[bl_idname] = [0, 0.0, 0.0, 0, 0]
+            entry[0] += 1
+            entry[1] += spent
+            entry[2] = max(entry[2], spent)
+            entry[3] += error is not None
+            entry[4] += slow
+        metrics.HANDLER_SECONDS.inc(spent, bl_idname)
+        metrics.HANDLER_CALLS.inc(1, bl_idname)
+        metrics.add_timing("handlers", spent)
+        name = getattr(node, "name", "")
+        if error is not None:
+            metrics.HANDLER_ERRORS.inc(1, bl_idname)
+            node_info["error"] = f"{type(error).__name__}: {error}"
+            print(f"[GSL Exporter] {bl_idname} handler failed on '{name}' ({getattr(mat, 'name', '')}): {error}")
+        if slow:
+            metrics.HANDLER_SLOW.inc(1, bl_idname)
+            print(f"[GSL Exporter] Slow {bl_idname} handler on '{name}': {spent * 1000.0:.1f} ms")
+
+    wrapped.__wrapped__ = handler  # type: ignore[attr-defined]
+    return wrapped
+
+
+def handler_stats() -> dict[str, dict]:
+    """Сводка по обработчикам с момента запуска (или reset_handler_stats), дорогие первыми."""
+    with _stats_lock:
+        items = [(bl, list(v)) for bl, v in _STATS.items()]
+    total = sum(v[1] for _, v in items) or 1.0
+    out: dict[str, dict] = {}
+    for bl, (calls, sec, max_sec, errors, slow) in sorted(items, key=lambda kv: -kv[1][1]):
+        out[bl] = {
+            "calls": calls,
+            "total_ms": round(sec * 1000.0, 3),
+            "mean_us": round(sec * 1e6 / calls, 2) if calls else 0.0,
+            "max_ms": round(max_sec * 1000.0, 3),
+            "share": round(sec / total, 4),
+            "errors": errors,
+            "slow": slow,
+        }
+    return out
+
+
+def reset_handler_stats() -> None:
+    with _stats_lock:
+        _STATS.clear()
+
+#endregion
+
+
 def get_node_handler(bl_idname: str) -> Optional[_NodeHandler]:
-    return _REGISTRY.get(bl_idname)
+    handler = _REGISTRY.get(bl_idname) or _load(bl_idname)
+    if handler is None or not HANDLER_INSTRUMENTATION:
+        return handler
+    wrapped = _WRAPPED.get(bl_idname)
+    if wrapped is None or wrapped.__wrapped__ is not handler:  # type: ignore[attr-defined]
+        wrapped = _WRAPPED[bl_idname] = _instrument(bl_idname, handler)
+    return wrapped
@@ -0,0 +1,148 @@
+# SPDX-FileCopyrightText: 2025 D.Jorkin
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+История экспортированных ревизий материалов и построение дельт между ними.
+"""
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from .config import REVISION_HISTORY
+
+_lock = threading.Lock()
+# material name -> OrderedDict[revision, payload] (старые ревизии в начале)
+_history: dict[str, "OrderedDict[str, dict]"] = {}
+
+
+# Не входят в ревизию: служебное и производное от графа
+_UNVERSIONED = ("revision", "trace", "stats")
+# В дельте идут отдельно от остальных ключей верхнего уровня (lod, baked, packed, …)
+_DELTA_OWN = _UNVERSIONED + ("material", "nodes", "links")
+
+
+def revision_of(data: dict) -> str:
+    blob = json.dumps(
+        {k: v for k, v in data.items() if k not in _UNVERSIONED},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha1(blob.encode()).hexdigest()[:16]
+
+
+def remember(data: dict) -> str:
+    rev = revision_of(data)
+    material = str(data.get("material", ""))
+    with _lock:
+        revs = _history.setdefault(material, OrderedDict())
+        if rev in revs:
+            revs.move_to_end(rev)
+        else:
+            revs[rev] = copy.deepcopy(data)
+        while len(revs) > max(1, REVISION_HISTORY):
+            revs.popitem(last=False)
+    return rev
+
+
+def lookup(material: str, rev: str) -> Optional[dict]:
+    with _lock:
+        return _history.get(material, {}).get(rev)
+
+
+def clear() -> None:
+    with _lock:
+        _history.clear()
+
+
+def _diff_node(old: dict, new: dict) -> Optional[dict]:
+    change: dict = {"id": new.get("id")}
+    for key, val in new.items():
+        if key in ("id", "params"):
+            continue
+        if old.get(key) != val:
+            change[key] = val
+
+    old_params: dict = old.get("params", {}) or {}
+    new_params: dict = new.get("params", {}) or {}
+    changed = {k: v for k, v in new_params.items() if k not in old_params or old_params[k] != v}
+    removed = [k for k in old_params if k not in new_params]
+    if changed:
+        change["params"] = changed
+    if removed:
+        change["params_removed"] = removed
+
+    if len(change) == 1:
+        return None
+    return change
+
+
+def make_delta(old: dict, new: dict) -> dict:
+    old_nodes = {n.get("id"): n for n in old.get("nodes", [])}
+    new_nodes = {n.get("id"): n for n in new.get("nodes", [])}
+
+    added = [n for nid, n in new_nodes.items() if nid not in old_nodes]
+    removed = [nid for nid in old_nodes if nid not in new_nodes]
+    modified: list[dict] = []
+    for nid, n in new_nodes.items():
+        if nid not in old_nodes:
+            continue
+        change = _diff_node(old_nodes[nid], n)
+        if change is not None:
+            modified.append(change)
+
+    old_links = list(old.get("links", []))
+    new_links = list(new.get("links", []))
+    old_set = set(old_links)
+    new_set = set(new_links)
+
+    delta = {
+        "nodes_added": added,
+        "nodes_removed": removed,
+        "nodes_modified": modified,
+        "links_added": [l for l in new_links if l not in old_set],
+        "links_removed": [l for l in old_links if l not in new_set],
+    }
+    # отчёты верхнего уровня (lod, baked, packed, preprocessed, samplers…) целиком, если изменились
+    fields = {k: v for k, v in new.items() if k not in _DELTA_OWN and old.get(k) != v}
+    fields_removed = [k for k in old if k not in _DELTA_OWN and k not in new]
+    if fields:
+        delta["fields"] = fields
+    if fields_removed:
+        delta["fields_removed"] = fields_removed
+    return delta
+
+
+def resolve(data: dict, known_revisions: Iterable[str] = ()) -> dict:
+    """
+    Запоминает payload как новую ревизию. Если клиент прислал ревизию, которая
+    есть в истории этого материала, вместо полного payload возвращается дельта.
+    """
+    rev = remember(data)
+    material = str(data.get("material", ""))
+
+    for base in known_revisions:
+        base = str(base).strip()
+        if not base:
+            continue
+        old = lookup(material, base)
+        if old is None:
+            continue
+        delta = {
+            "material": material,
+            "revision": rev,
+            "base_revision": base,
+            "delta": make_delta(old, data),
+        }
+        if "stats" in data:
+            delta["stats"] = data["stats"]
+        return delta
+
+    full = dict(data)
+    full["revision"] = rev
+    return full
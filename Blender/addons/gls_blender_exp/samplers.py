@@ -0,0 +1,68 @@
+# SPDX-FileCopyrightText: 2025 D.Jorkin
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Общие sampler-ы для Image Texture.
+
+Каждый модуль Texture Image в Godot объявляет свой sampler2D. Узлы с одним и тем
+же изображением (хеш содержимого, иначе путь) получают одинаковый номер
+params["sampler"], и Godot объявляет для них один sampler-uniform. Фильтрация,
+повтор и цветовое пространство в Tex_image.gdshaderinc считаются в коде, а не
+хинтами uniform-а, поэтому состояние выборки у общего sampler-а не расходится.
+
+Узлы, одинаковые целиком (те же параметры и тот же вход Vector), сливаются в
+один — это убирает и лишние выборки, а не только привязки.
+"""
+from __future__ import annotations
+
+import json
+
+from .utils import parse_link
+
+_TEX_IMAGE = "TexImageModule"
+_VECTOR_INPUT = 0
+
+
+def image_key(params: dict) -> str:
+    return str(params.get("image_hash") or params.get("image_path") or "")
+
+
+def _merge_duplicates(payload: dict) -> int:
+    links = [parse_link(l) for l in payload.get("links", [])]
+    vector_src = {t: (f, o) for f, o, t, i in links if i == _VECTOR_INPUT}
+
+    keep: dict[str, str] = {}
+    replaced: dict[str, str] = {}
+    for node in payload.get("nodes", []):
+        if node.get("class") != _TEX_IMAGE or not image_key(node.get("params", {})):
+            continue
+        params = {k: v for k, v in node.get("params", {}).items() if k != "sampler"}
+        key = json.dumps([params, vector_src.get(node["id"])], sort_keys=True)
+        if key in keep:
+            replaced[node["id"]] = keep[key]
+        else:
+            keep[key] = node["id"]
+    if not replaced:
+        return 0
+
+    rewired = {(replaced.get(f, f), o, t, i) for f, o, t, i in links if t not in replaced}
+    payload["nodes"] = [n for n in payload["nodes"] if n["id"] not in replaced]
+    payload["links"] = [f"{f},{o},{t},{i}" for f, o, t, i in sorted(rewired)]
+    return len(replaced)
+
+
+def assign(payload: dict) -> dict:
+    """Сливает одинаковые узлы и нумерует sampler-ы; можно вызывать повторно."""
+    merged = _merge_duplicates(payload)
+    slots: dict[str, int] = {}
+    for node in payload.get("nodes", []):
+        if node.get("class") != _TEX_IMAGE:
+            continue
+        params = node.setdefault("params", {})
+        key = image_key(params)
+        if not key:
+            params.pop("sampler", None)
+            continue
+        params["sampler"] = slots.setdefault(key, len(slots))
+        node["params"] = dict(sorted(params.items()))
+    return {"samplers": len(slots), "merged_nodes": merged}
@@ -3,13 +3,22 @@
 
 """
 HTTP/UDP сервер GSL. Отвечает на запросы Godot и уведомляет о статусе.
+
+HTTP/1.1 с keep-alive: у каждого ответа есть Content-Length, поэтому по одному
+соединению идут подряд и конвейером сотни запросов. Простой дольше
+KEEPALIVE_TIMEOUT закрывает соединение, сверх MAX_CONNECTIONS соединений
+новые обслуживают один запрос.
 """
 from __future__ import annotations
 
 import json
+import os
 import threading
 import socket
-from http.server import BaseHTTPRequestHandler, HTTPServer
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
+from typing import Optional
 from urllib.parse import urlparse, parse_qs
 
 try:
@@ -17,36 +26,333 @@ try:
 except Exception:
     bpy = None  # type: ignore
 
-from .config import HOST, PORT, GODOT_UDP_PORT
-from .exporter import collect_material_data
+from .config import HOST, PORT, PORT_RANGE, GODOT_UDP_PORT, ANNOUNCE_INTERVAL, RECORD_SESSIONS, DEBUG_TOP
+from .config import KEEPALIVE_TIMEOUT, KEEPALIVE_MAX_REQUESTS, MAX_CONNECTIONS
+from .exporter import collect_material_data, collect_batch_data
+from . import revisions
+from . import options
+from . import textures
+from . import recorder
+from . import metrics
+from . import profiling
+from . import registry
+
+# Размер куска при отдаче изображения
+_IMAGE_CHUNK = 1 << 20
+# Тело GET больше этого не дочитывается, соединение просто закрывается
+_MAX_DRAIN = 1 << 16
+
+# Заголовок с id трассировки: Godot присылает свой, иначе сервер выдаёт новый
+TRACE_HEADER = "X-GSL-Trace"
 
 # Экземпляр HTTP‑сервера и поток его запуска
 _server: HTTPServer | None = None
 _server_thread: threading.Thread | None = None
 
+# Идентичность этого Blender для обнаружения из Godot (announce по UDP и GET /instance).
+# blend и material обновляет таймер _announce в главном потоке
+INSTANCE_ID = uuid.uuid4().hex[:12]
+_instance: dict = {"instance": INSTANCE_ID, "pid": os.getpid(), "port": 0, "blend": "", "material": ""}
+# Сервер (любого ядра) запущен: таймер _announce работает, пока это True
+_announcing = False
+
+
+# Пути с известной меткой endpoint в метриках; остальное — "other"
+_ENDPOINTS = ("/link", "/batch", "/image", "/instance", "/metrics", "/handlers", "/debug/profile", "/debug/memory")
+
+
+def _endpoint(path: str) -> str:
+    if path.startswith("/image/"):
+        return "/image"
+    return path if path in _ENDPOINTS else "other"
+
 
 class GSLRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # таймаут сокета: столько соединение ждёт следующий запрос
+    timeout = KEEPALIVE_TIMEOUT
+    # заголовки и тело уходят отдельными send: без TCP_NODELAY второй ждёт ACK (~40 мс)
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        self._accepted = time.perf_counter()
+        self._status = 0
+        self._served = 0
+        self._in_request = False
+        self._in_error = self._error_keepalive = False
+        acquire = getattr(self.server, "acquire_connection", None)
+        self._keepalive = acquire(self.request) if acquire else False
+        metrics.HTTP_CONNECTIONS.inc(1, "keepalive" if self._keepalive else "single")
+        metrics.HTTP_OPEN_CONNECTIONS.inc()
+        super().setup()
+
+    def finish(self):
+        try:
+            super().finish()
+        finally:
+            release = getattr(self.server, "release_connection", None)
+            if release:
+                release(self.request, self._keepalive)
+            metrics.HTTP_OPEN_CONNECTIONS.dec()
+            metrics.HTTP_CONNECTION_REQUESTS.observe(self._served)
+
+    def parse_request(self):
+        self._in_request = False
+        return super().parse_request()
+
+    def _begin(self) -> float:
+        """Начало разобранного запроса: метрики и решение, оставлять ли соединение открытым."""
+        started = time.perf_counter()
+        if self._served == 0:
+            # на повторных запросах соединения здесь был бы простой клиента, а не приём
+            metrics.HTTP_ACCEPT.observe(started - self._accepted)
+        self._served += 1
+        self._in_request = True
+        if not self._keepalive or self._served >= KEEPALIVE_MAX_REQUESTS:
+            self.close_connection = True
+        self._drain_body()
+        return started
+
+    def _drain_body(self) -> None:
+        # GET без тела; если клиент его прислал, байты не должны стать началом следующего запроса
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            self.close_connection = True
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            self.close_connection = True
+            return
+        if length > _MAX_DRAIN:
+            self.close_connection = True
+        elif length > 0:
+            self.rfile.read(length)
+
+    def send_response(self, code, message=None):
+        self._status = code
+        super().send_response(code, message)
+        if self._in_error and not self._error_keepalive:
+            return  # send_error сам пишет Connection: close
+        if self.close_connection:
+            self.send_header("Connection", "close")
+            return
+        self.send_header("Keep-Alive", f"timeout={KEEPALIVE_TIMEOUT:g}, max={KEEPALIVE_MAX_REQUESTS - self._served}")
+        if self.request_version == "HTTP/1.0":
+            self.send_header("Connection", "keep-alive")
+
+    def send_error(self, code, message=None, explain=None):
+        # stdlib закрывает соединение после любой ошибки. Ответы обработчиков (404, 409 …)
+        # framing не ломают; закрывается только ошибка разбора самого запроса
+        self._in_error = True
+        self._error_keepalive = self._in_request and not self.close_connection
+        try:
+            super().send_error(code, message, explain)
+        finally:
+            self._in_error = self._error_keepalive = False
+
+    def send_header(self, keyword, value):
+        if self._error_keepalive and keyword.lower() == "connection":
+            return
+        super().send_header(keyword, value)
 
     def do_GET(self):
+        started = self._begin()
         parsed = urlparse(self.path)
-        if parsed.path == "/link":
-            self._handle_link()
-        else:
-            self.send_error(404)
+        try:
+            if parsed.path == "/link":
+                self._handle_link(parse_qs(parsed.query))
+            elif parsed.path == "/batch":
+                self._handle_batch(parse_qs(parsed.query))
+            elif parsed.path.startswith("/image/"):
+                self._handle_image(parsed.path[len("/image/"):])
+            elif parsed.path == "/instance":
+                self._send_json(instance_info(), "/instance")
+            elif parsed.path == "/metrics":
+                self._handle_metrics()
+            elif parsed.path == "/handlers":
+                # ?reset=1 — обнулить сводку после чтения
+                self._send_json({"handlers": registry.handler_stats()}, "/handlers")
+                if _query_flag(parse_qs(parsed.query), "reset"):
+                    registry.reset_handler_stats()
+            elif parsed.path in ("/debug/profile", "/debug/memory"):
+                self._handle_debug(parsed.path, parse_qs(parsed.query))
+            else:
+                self.send_error(404)
+        finally:
+            self._count_request(parsed.path, started)
+
+    def do_HEAD(self):
+        started = self._begin()
+        parsed = urlparse(self.path)
+        try:
+            if parsed.path.startswith("/image/"):
+                self._handle_image(parsed.path[len("/image/"):], head=True)
+            else:
+                self.send_error(404)
+        finally:
+            self._count_request(parsed.path, started)
+
+    def _count_request(self, path: str, started: float) -> None:
+        self._in_request = False
+        endpoint = _endpoint(path)
+        metrics.HTTP_REQUESTS.inc(1, endpoint, str(self._status or 500))
+        metrics.HTTP_DURATION.observe(time.perf_counter() - started, endpoint)
 
     # Отключаем стандартный спам логов BaseHTTPRequestHandler в консоль
     def log_message(self, format, *args):  # noqa: A003  (совпадает по имени с базовым API)
         return
 
-    def _handle_link(self):
-        data = collect_material_data()
-        payload = json.dumps(data, ensure_ascii=False).encode()
+    def _trace_id(self, query: dict) -> str:
+        return trace_id(self.headers.get(TRACE_HEADER), query)
+
+    def _handle_link(self, query: dict):
+        started = time.perf_counter()
+        trace = self._trace_id(query)
+        timings: dict = {}
+        data = collect_material_data(options.from_query(query), timings)
+        if "error" not in data:
+            data = revisions.resolve(data, known_revisions(query))
+        data["trace"] = trace
+        recorder.record(self.path, data, self._send_json(data, "/link", timings, started), started)
+
+    def _handle_batch(self, query: dict):
+        # имена материалов передаются повторяющимся параметром: ?material=A&material=B
+        names = query.get("material", []) or None
+        group = _query_flag(query, "group")
+        library = _query_flag(query, "library")
+        opts = options.from_query(query)
+        started = time.perf_counter()
+        trace = self._trace_id(query)
+        timings: dict = {}
+        data = collect_batch_data(names, group=group, library=library, opts=opts, timings=timings)
+        data["trace"] = trace
+        recorder.record(self.path, data, self._send_json(data, "/batch", timings, started), started)
+
+    def _handle_metrics(self):
+        body = metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle_debug(self, path: str, query: dict):
+        if not profiling.enabled:
+            self.send_error(403, "Debug endpoints are disabled in the add-on preferences")
+            return
+        try:
+            seconds = float(query.get("seconds", ["10"])[0])
+            limit = int(query.get("limit", [str(DEBUG_TOP)])[0])
+            if path == "/debug/profile":
+                text = profiling.capture_profile(seconds, query.get("sort", ["cumulative"])[0], limit)
+            else:
+                text = profiling.capture_memory(seconds, limit, int(query.get("frames", ["1"])[0]))
+        except ValueError:
+            self.send_error(400, "seconds, limit and frames must be numbers")
+            return
+        except profiling.CaptureBusy as e:
+            self.send_error(409, str(e))
+            return
+        body = text.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle_image(self, digest: str, head: bool = False):
+        entry = textures.lookup(digest)
+        if entry is None:
+            self.send_error(404)
+            return
+        try:
+            view, closer = textures.open_source(entry)
+        except OSError:
+            self.send_error(410)
+            return
+        try:
+            size = len(view)
+            try:
+                byte_range = textures.parse_range(self.headers.get("Range"), size)
+            except ValueError:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            start, end = byte_range if byte_range else (0, size - 1)
+
+            self.send_response(206 if byte_range else 200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Accept-Ranges", "bytes")
+            # адрес по содержимому: под этим хешем байты не меняются
+            self.send_header("ETag", f'"{digest}"')
+            self.send_header("Cache-Control", "public, max-age=31536000, immutable")
+            if byte_range:
+                self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+            self.send_header("Content-Length", str(end - start + 1))
+            self.end_headers()
+            if head:
+                return
+            for pos in range(start, end + 1, _IMAGE_CHUNK):
+                self.wfile.write(view[pos:min(pos + _IMAGE_CHUNK, end + 1)])
+        finally:
+            view.release()
+            if closer is not None:
+                closer.close()
 
+    def _send_json(self, data: dict, endpoint: str, timings: Optional[dict] = None,
+                   started: Optional[float] = None) -> int:
+        payload, headers = json_response(data, endpoint, timings, started)
         self.send_response(200)
-        self.send_header("Content-Type", "application/json; charset=utf-8")
-        self.send_header("Content-Length", str(len(payload)))
+        for name, value in headers:
+            self.send_header(name, value)
         self.end_headers()
         self.wfile.write(payload)
+        return len(payload)
+
+
+#region Shared with async_server
+
+def json_response(data: dict, endpoint: str, timings: Optional[dict] = None,
+                  started: Optional[float] = None) -> tuple[bytes, list[tuple[str, str]]]:
+    """Тело и заголовки JSON-ответа: метрики кодирования, Server-Timing, id трассировки, строка лога."""
+    t0 = time.perf_counter()
+    payload = json.dumps(data, ensure_ascii=False).encode()
+    encode = time.perf_counter() - t0
+    metrics.JSON_ENCODE.observe(encode, endpoint)
+    metrics.PAYLOAD_BYTES.observe(len(payload), endpoint)
+
+    headers = [("Content-Type", "application/json; charset=utf-8"), ("Content-Length", str(len(payload)))]
+    trace = data.get("trace")
+    if timings is not None:
+        timings["encode"] = encode
+        if started is not None:
+            timings["total"] = time.perf_counter() - started
+        headers.append(("Server-Timing", metrics.server_timing(timings)))
+    if trace:
+        headers.append((TRACE_HEADER, trace))
+        phases = ", ".join(f"{k} {v * 1000.0:.1f}" for k, v in (timings or {}).items())
+        print(f"[GSL Exporter] {endpoint} trace={trace} {len(payload)} B; ms: {phases}")
+    return payload, headers
+
+
+def trace_id(header: Optional[str], query: dict) -> str:
+    raw = header or query.get("trace", [""])[0]
+    raw = "".join(c for c in raw if c.isalnum() or c in "-_")[:64]
+    return raw or uuid.uuid4().hex[:16]
+
+
+def known_revisions(query: dict) -> list[str]:
+    # rev может прийти несколькими параметрами или списком через запятую
+    return [r for v in query.get("rev", []) for r in v.split(",")]
+
+#endregion
+
+
+def _query_flag(query: dict, name: str) -> bool:
+    return query.get(name, ["0"])[0].lower() in ("1", "true", "yes")
+
 
 def _send_udp_json(payload: dict, port: int):
     msg = json.dumps(payload).encode()
@@ -55,23 +361,128 @@ def _send_udp_json(payload: dict, port: int):
     sock.close()
 
 
+def instance_info() -> dict:
+    return dict(_instance)
+
+
 def _notify_godot(status: str):
-    _send_udp_json({"status": status}, GODOT_UDP_PORT)
+    try:
+        _send_udp_json({"status": status, **_instance}, GODOT_UDP_PORT)
+    except OSError:
+        pass
+
+
+def notify_progress(stage: str, done: int, total: int) -> None:
+    try:
+        _send_udp_json({"status": "progress", "instance": INSTANCE_ID, "stage": stage, "done": done,
+                        "total": total}, GODOT_UDP_PORT)
+    except OSError:
+        pass
+
+
+def _announce():
+    # таймер Blender: читает bpy в главном потоке и рассылает, пока сервер работает
+    if not _announcing:
+        return None
+    if bpy is not None:
+        try:
+            _instance["blend"] = bpy.data.filepath
+            obj = bpy.context.object
+            mat = obj.active_material if obj is not None else None
+            _instance["material"] = mat.name if mat is not None else ""
+        except Exception:
+            pass
+    _notify_godot("announce")
+    return ANNOUNCE_INTERVAL
+
 
+class _GSLServer(ThreadingHTTPServer):
+    # Поток на запрос: окно /debug/* держит свой запрос, пока идут экспорты.
+    # Экспорты всё равно идут в главный поток Blender по одному (_run_on_main_thread)
+    daemon_threads = True
+    # SO_REUSEADDR в Windows даёт второму Blender занять тот же порт молча
+    allow_reuse_address = os.name != "nt"
 
-def _start_server():
-    global _server
-    _server = HTTPServer((HOST, PORT), GSLRequestHandler)
-    _server.serve_forever()
+    def __init__(self, *args, **kwargs):
+        self._conn_lock = threading.Lock()
+        self._open: set = set()
+        self._keepalive_count = 0
+        super().__init__(*args, **kwargs)
+
+    def acquire_connection(self, sock) -> bool:
+        """Учесть соединение; True — ему положен keep-alive (в пределах MAX_CONNECTIONS)."""
+        with self._conn_lock:
+            self._open.add(sock)
+            if self._keepalive_count >= MAX_CONNECTIONS:
+                return False
+            self._keepalive_count += 1
+            return True
+
+    def release_connection(self, sock, keepalive: bool) -> None:
+        with self._conn_lock:
+            self._open.discard(sock)
+            if keepalive:
+                self._keepalive_count -= 1
+
+    def server_close(self):
+        super().server_close()
+        # простаивающие keep-alive соединения иначе висят в потоках до KEEPALIVE_TIMEOUT
+        with self._conn_lock:
+            open_socks = list(self._open)
+        for sock in open_socks:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+def make_server(host: str = HOST, port: int = PORT) -> HTTPServer:
+    return _GSLServer((host, port), GSLRequestHandler)
+
+
+def _bind_server() -> HTTPServer:
+    """Первый свободный порт из PORT … PORT + PORT_RANGE - 1: несколько Blender рядом."""
+    last_error: Optional[OSError] = None
+    for port in range(PORT, PORT + max(1, PORT_RANGE)):
+        try:
+            return make_server(HOST, port)
+        except OSError as e:
+            # занят или зарезервирован системой (Windows отдаёт и WSAEACCES) — следующий
+            last_error = e
+    raise last_error or OSError(f"no free port in {PORT}..{PORT + PORT_RANGE - 1}")
+
+
+def server_started(port: int) -> None:
+    """Общее для обоих ядер после bind: запись сессий, порт экземпляра, "started" и announce."""
+    global _announcing
+    if RECORD_SESSIONS and not recorder.active():
+        recorder.start(RECORD_SESSIONS)
+    _instance["port"] = port
+    if port != PORT:
+        print(f"[GSL Exporter] Port {PORT} is busy, serving on {port}")
+    _announcing = True
+    _notify_godot("started")
+    if bpy is not None and not bpy.app.timers.is_registered(_announce):
+        bpy.app.timers.register(_announce, first_interval=0.0, persistent=True)
+
+
+def server_stopped() -> None:
+    global _announcing
+    _announcing = False
+    recorder.stop()
+    if bpy is not None and bpy.app.timers.is_registered(_announce):
+        bpy.app.timers.unregister(_announce)
+    _notify_godot("stopped")
 
 
 def launch_server() -> None:
-    global _server_thread
+    global _server, _server_thread
     if _server_thread and _server_thread.is_alive():
         return
-    _server_thread = threading.Thread(target=_start_server, daemon=True)
+    _server = _bind_server()
+    _server_thread = threading.Thread(target=_server.serve_forever, daemon=True)
     _server_thread.start()
-    _notify_godot("started")
+    server_started(_server.server_address[1])
 
 
 def stop_server() -> None:
@@ -85,4 +496,4 @@ def stop_server() -> None:
     if _server_thread and _server_thread.is_alive():
         _server_thread.join(timeout=1.0)
     _server_thread = None
-    _notify_godot("stopped")
+    server_stopped()
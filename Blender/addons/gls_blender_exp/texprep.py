@@ -0,0 +1,273 @@
+# SPDX-FileCopyrightText: 2025 D.Jorkin
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Предобработка текстур по профилю (options: texture_profile=<имя>).
+
+Профиль из config.TEXTURE_PROFILES ограничивает сторону изображения, приводит
+её к степени двойки и, если нужно, заранее строит mip-уровни. С mip-уровнями
+результат — несжатый RGBA8 DDS со всей цепочкой: Godot грузит его напрямую, без
+импорта. Без них результат — PNG. Файлы лежат в кэше под хешем содержимого
+исходника и параметрами, так что повторный экспорт и другие .blend их
+переиспользуют.
+
+Картинку с файлом на диске процесс пула декодирует и уменьшает сам через Pillow.
+Упакованные в .blend изображения (и любые, если Pillow нет) уменьшает Blender в
+главном потоке; mip-уровни и запись всегда считаются в пуле. 16-битные и
+float-изображения остаются как есть: результат 8-битный.
+"""
+from __future__ import annotations
+
+import os
+import struct
+import tempfile
+from typing import Callable, Optional
+
+try:
+    import bpy  # type: ignore
+except Exception:  # pragma: no cover
+    bpy = None  # type: ignore
+
+try:
+    import numpy as np  # type: ignore
+except Exception:  # pragma: no cover
+    np = None  # type: ignore
+
+try:
+    from PIL import Image  # type: ignore
+except Exception:  # pragma: no cover
+    Image = None  # type: ignore
+
+from .config import TEXTURE_PROFILES, TEXTURE_CACHE_DIR_NAME
+from .bake import write_png
+from . import options
+from . import textures
+from . import workers
+
+_TEX_IMAGE = "TexImageModule"
+_MAX_BYTE_DEPTH = 32
+
+
+def get_profile(name) -> Optional[dict]:
+    if not name:
+        return None
+    profile = TEXTURE_PROFILES.get(str(name))
+    if profile is None:
+        print(f"[GSL Exporter] Unknown texture profile: {name}")
+    return profile
+
+
+def _cache_dir() -> str:
+    return options.get("texture_cache_dir") or os.path.join(tempfile.gettempdir(), TEXTURE_CACHE_DIR_NAME)
+
+
+def _pot(n: int) -> int:
+    # ближайшая степень двойки; при равенстве — большая
+    lo = 1 << (max(1, n).bit_length() - 1)
+    return lo if n - lo < lo * 2 - n else lo * 2
+
+
+def target_size(width: int, height: int, profile: dict) -> tuple[int, int]:
+    max_size = int(profile.get("max_size", 0))
+    scale = min(1.0, max_size / max(width, height)) if max_size else 1.0
+    w, h = max(1, round(width * scale)), max(1, round(height * scale))
+    if profile.get("pot"):
+        w, h = _pot(w), _pot(h)
+        if max_size:
+            # степень двойки не должна вывести за предел профиля
+            while max(w, h) > max_size and max(w, h) > 1:
+                w, h = max(1, w // 2), max(1, h // 2)
+    return w, h
+
+
+#region Capture
+
+def _is_byte_image(img) -> bool:
+    if img is None or getattr(img, "is_float", False):
+        return False
+    try:
+        return 0 < int(img.depth) <= _MAX_BYTE_DEPTH and img.size[0] > 0 and img.size[1] > 0
+    except Exception:
+        return False
+
+
+def capture(payload: dict, images: dict, profile: dict) -> list[dict]:
+    """Задачи предобработки материала; images — id узла → bpy Image. Вызывать в главном потоке."""
+    mips = bool(profile.get("mips"))
+    ext = "dds" if mips else "png"
+    jobs: list[dict] = []
+    for node in payload.get("nodes", []):
+        params = node.get("params", {})
+        img = images.get(node["id"])
+        if node.get("class") != _TEX_IMAGE or not params.get("image_file") or not _is_byte_image(img):
+            continue
+        width, height = int(img.size[0]), int(img.size[1])
+        size = target_size(width, height, profile)
+        if size == (width, height) and not mips:
+            continue
+        src = params.get("image_path") if getattr(img, "packed_file", None) is None else None
+        base = os.path.splitext(params.get("image_file") or img.name)[0]
+        suffix = f"{size[0]}x{size[1]}" + ("_mips" if mips else "")
+        # хеш нового содержимого ещё не посчитан (textures.hash_pending): путь — в resolve_hashes()
+        jobs.append({
+            "node": node["id"], "image": img.name, "hash": None, "params": params,
+            "source": src if src and os.path.isfile(src) else None, "size": size, "mips": mips,
+            "path": None, "name": f"{suffix}.{ext}", "file": f"{base}_{suffix}.{ext}",
+        })
+    return jobs
+
+
+def resolve_hashes(items: list[tuple[dict, list]]) -> None:
+    """После textures.hash_pending и до упаковки каналов: хеш исходника → путь результата в кэше."""
+    out_dir = _cache_dir()
+    for _, jobs in items:
+        for job in list(jobs):
+            digest = job.pop("params").get("image_hash")
+            if not digest:
+                jobs.remove(job)  # не удалось прочитать исходник
+                continue
+            job["hash"] = digest
+            job["path"] = os.path.join(out_dir, f"{digest}_{job['name']}")
+
+
+def read_scaled(jobs: list[dict]) -> dict[str, object]:
+    """path задачи → RGBA uint8 (h, w, 4) уже нужного размера; вызывать в главном потоке."""
+    out: dict[str, object] = {}
+    if bpy is None or np is None:
+        return out
+    for job in jobs:
+        img = bpy.data.images.get(job["image"])
+        if not _is_byte_image(img) or job["path"] in out:
+            continue
+        w, h = job["size"]
+        scaled = img.copy()
+        try:
+            if tuple(scaled.size) != (w, h):
+                scaled.scale(w, h)
+            channels = int(scaled.channels)
+            px = np.empty(w * h * channels, dtype=np.float32)
+            scaled.pixels.foreach_get(px)
+        finally:
+            bpy.data.images.remove(scaled)
+        px = px.reshape(h, w, channels)[::-1]
+        rgba = np.empty((h, w, 4), dtype=np.uint8)
+        rgba[..., :3] = np.round(np.clip(px[..., :3] if channels >= 3 else px[..., :1], 0.0, 1.0) * 255.0)
+        rgba[..., 3] = np.round(np.clip(px[..., 3], 0.0, 1.0) * 255.0) if channels == 4 else 255
+        out[job["path"]] = rgba
+    return out
+
+#endregion
+
+
+#region Process
+
+def _load_scaled(path: str, size: tuple[int, int]):
+    im = Image.open(path)
+    im.draft("RGBA", size)  # JPEG декодируется сразу в уменьшенном виде
+    im = im.convert("RGBA")
+    if im.size != tuple(size):
+        im = im.resize(tuple(size), Image.LANCZOS, reducing_gap=3.0)
+    return np.asarray(im, dtype=np.uint8)
+
+
+def mip_chain(rgba) -> list:
+    """Уровни 2×2-усреднением до 1×1; у неквадратной текстуры меньшая сторона стоит на 1."""
+    levels = [rgba]
+    cur = rgba
+    while cur.shape[0] > 1 or cur.shape[1] > 1:
+        acc = cur.astype(np.uint16)
+        if acc.shape[0] > 1:
+            acc = acc[0:acc.shape[0] // 2 * 2:2] + acc[1::2]
+        else:
+            acc = acc * 2
+        if acc.shape[1] > 1:
+            acc = acc[:, 0:acc.shape[1] // 2 * 2:2] + acc[:, 1::2]
+        else:
+            acc = acc * 2
+        cur = ((acc + 2) >> 2).astype(np.uint8)
+        levels.append(cur)
+    return levels
+
+
+# DDS: заголовок с RGBA8 без сжатия (DDPF_RGB | DDPF_ALPHAPIXELS) и цепочка mip
+_DDSD_FLAGS = 0x1 | 0x2 | 0x4 | 0x8 | 0x1000 | 0x20000
+_DDS_CAPS = 0x8 | 0x1000 | 0x400000
+
+
+def write_dds(path: str, levels: list) -> None:
+    h, w = levels[0].shape[:2]
+    pixel_format = struct.pack("<8I", 32, 0x41, 0, 32, 0x000000FF, 0x0000FF00, 0x00FF0000, 0xFF000000)
+    header = struct.pack("<7I", 124, _DDSD_FLAGS, h, w, w * 4, 0, len(levels)) + b"\0" * 44
+    header += pixel_format + struct.pack("<5I", _DDS_CAPS, 0, 0, 0, 0)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(b"DDS " + header)
+        for level in levels:
+            fh.write(np.ascontiguousarray(level, dtype=np.uint8).tobytes())
+    os.replace(tmp, path)
+
+
+def _process(job: dict, rgba=None) -> str:
+    # выполняется в процессе пула
+    if rgba is None:
+        rgba = _load_scaled(job["source"], job["size"])
+    if job["mips"]:
+        write_dds(job["path"], mip_chain(rgba))
+    else:
+        write_png(job["path"], rgba)
+    return job["path"]
+
+
+def process_materials(items: list[tuple[dict, list]], read_pixels: Callable,
+                      progress: Optional[Callable[[int, int], None]] = None) -> None:
+    """
+    items — пары (payload, capture()). read_pixels(jobs) уменьшает в главном
+    потоке то, что пул не прочитает сам (read_scaled). Готовые файлы из кэша не
+    пересчитываются.
+    """
+    if np is not None:
+        todo = {job["path"]: job for _, jobs in items for job in jobs if not os.path.exists(job["path"])}
+        own = [j for j in todo.values() if j["source"] and Image is not None]
+        blender = [j for j in todo.values() if not (j["source"] and Image is not None)]
+        pixels: dict = {}
+        if blender:
+            pixels = read_pixels(blender)
+            if not isinstance(pixels, dict) or "error" in pixels:
+                print(f"[GSL Exporter] Texture preprocessing skipped for {len(blender)} images: "
+                      f"{pixels.get('error') if isinstance(pixels, dict) else pixels}")
+                pixels = {}
+        tasks = [(j,) for j in own] + [(j, pixels[j["path"]]) for j in blender if j["path"] in pixels]
+        if tasks:
+            os.makedirs(_cache_dir(), exist_ok=True)
+            results = workers.run_all(_process, tasks, "Texture", progress)
+            for (job, *_), result in zip(tasks, results):
+                if isinstance(result, Exception):
+                    print(f"[GSL Exporter] Texture preprocessing failed for {job['image']}: {result}")
+
+    for payload, jobs in items:
+        apply(payload, jobs)
+
+
+def apply(payload: dict, jobs: list[dict]) -> None:
+    """Переводит узлы на готовые файлы; payload["preprocessed"] — что заменено."""
+    nodes = {n["id"]: n for n in payload.get("nodes", [])}
+    report = []
+    for job in jobs:
+        node = nodes.get(job["node"])
+        # узел могли перевести на другую картинку (упаковка каналов) — исходник уже не тот
+        if node is None or node.get("params", {}).get("image_hash") != job["hash"]:
+            continue
+        if not os.path.exists(job["path"]):
+            continue
+        info = textures.register_file(job["path"])
+        if info is None:
+            continue
+        path = job["path"].replace("\\", "/")
+        node["params"].update({"image_path": path, "image_hash": info["hash"], "image_bytes": info["size"],
+                               "image_file": job["file"], "image_width": job["size"][0],
+                               "image_height": job["size"][1]})
+        report.append({"node": job["node"], "image": path})
+    if report:
+        payload["preprocessed"] = report
+
+#endregion
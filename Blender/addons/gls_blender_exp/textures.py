@@ -0,0 +1,206 @@
+# SPDX-FileCopyrightText: 2025 D.Jorkin
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Индекс содержимого текстур для передачи по хешу (/image/<hash>).
+
+Файл на диске хешируется один раз на (путь, mtime, размер), упакованное в .blend
+изображение — один раз на (имя, размер, packed_file). Godot кладёт текстуру под
+именем с хешем и не копирует её повторно; упакованные изображения он скачивает с
+сервера.
+
+register_* вызываются из обработчика в главном потоке и только смотрят в индекс:
+неизвестное содержимое откладывается (take_pending) и хешируется в потоке
+запроса (hash_pending), чтобы большая текстура не съела LINK_TIMEOUT.
+lookup/open_source — из потока запроса, поэтому индекс под блокировкой и не
+трогает bpy. Новая версия того же файла или изображения вытесняет старую.
+"""
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from .config import TEXTURE_INDEX_MAX
+
+_CHUNK = 1 << 20
+
+_lock = threading.Lock()
+# (kind, path|name, версия…) → hash; порядок — давность использования
+_by_key: "OrderedDict[tuple, str]" = OrderedDict()
+# (kind, path|name) → последний ключ: при смене версии старая запись уходит
+_current: dict[tuple, tuple] = {}
+# hash → {"path": str|None, "data": memoryview|None, "size": int, "mtime_ns": int, "file": str}
+_entries: dict[str, dict] = {}
+# отложенное хеширование текущего экспорта: пишет только главный поток
+_pending: list = []
+
+
+def _digest_file(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()[:16]
+
+
+def _known(key: tuple) -> Optional[str]:
+    with _lock:
+        digest = _by_key.get(key)
+        if digest is not None:
+            _by_key.move_to_end(key)
+        return digest
+
+
+def _store(key: tuple, digest: str, entry: dict) -> None:
+    with _lock:
+        stale = _current.get(key[:2])
+        if stale is not None and stale != key:
+            _drop(stale)
+        _current[key[:2]] = key
+        _by_key[key] = digest
+        _by_key.move_to_end(key)
+        _entries[digest] = entry
+        while len(_by_key) > TEXTURE_INDEX_MAX:
+            _drop(next(iter(_by_key)))
+
+
+def _drop(key: tuple) -> None:
+    # под _lock; запись по хешу живёт, пока на неё ссылается хоть один ключ
+    digest = _by_key.pop(key, None)
+    if _current.get(key[:2]) == key:
+        del _current[key[:2]]
+    if digest is not None and digest not in _by_key.values():
+        _entries.pop(digest, None)
+
+
+def register_file(path: str, node_id: Optional[str] = None) -> Optional[dict]:
+    """
+    Сведения о файле. С node_id (обработчик в главном потоке) хеш нового файла
+    откладывается до hash_pending(), без него (постобработка) считается сразу.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = ("file", os.path.normcase(os.path.abspath(path)), st.st_mtime_ns, st.st_size)
+    entry = {"path": path, "data": None, "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+             "file": os.path.basename(path)}
+    digest = _known(key)
+    if digest is None and node_id is None:
+        digest = _digest_file(path)
+        _store(key, digest, entry)
+    elif digest is None:
+        _pending.append((node_id, key, entry))
+    return {"hash": digest, **entry}
+
+
+def register_packed(name: str, packed, file_name: str, node_id: str) -> dict:
+    """
+    packed — bpy PackedFile. Его data (копия всех байт) читается, только если эта
+    версия ещё не в индексе: повторный экспорт обходится без копирования и SHA-1.
+    """
+    size = int(getattr(packed, "size", 0) or 0)
+    identity = packed.as_pointer() if hasattr(packed, "as_pointer") else id(packed)
+    key = ("packed", name, size, identity)
+    digest = _known(key)
+    if digest is not None:
+        with _lock:
+            entry = _entries.get(digest)
+        if entry is not None:
+            return {"hash": digest, **entry}
+    data = memoryview(packed.data)
+    entry = {"path": None, "data": data, "size": len(data), "mtime_ns": 0, "file": file_name}
+    _pending.append((node_id, key, entry))
+    return {"hash": None, **entry}
+
+
+def take_pending() -> list:
+    jobs = _pending[:]
+    _pending.clear()
+    return jobs
+
+
+def hash_pending(jobs: list, nodes: list[dict]) -> None:
+    """Хеширует отложенное и дописывает image_hash в params узлов; вызывается вне главного потока."""
+    by_id = {n["id"]: n for n in nodes}
+    for node_id, key, entry in jobs:
+        digest = _known(key)
+        if digest is None:
+            try:
+                if entry["data"] is not None:
+                    digest = hashlib.sha1(entry["data"]).hexdigest()[:16]
+                else:
+                    digest = _digest_file(entry["path"])
+            except OSError as e:
+                print(f"[GSL Exporter] Failed to index texture {entry['file']}: {e}")
+                continue
+            _store(key, digest, entry)
+        node = by_id.get(node_id)
+        if node is not None:
+            node.setdefault("params", {})["image_hash"] = digest
+
+
+def lookup(digest: str) -> Optional[dict]:
+    with _lock:
+        return _entries.get(digest)
+
+
+def open_source(entry: dict):
+    """
+    Буфер с байтами изображения: memoryview упакованных данных или mmap файла.
+    Второе значение — что закрыть после отправки (или None).
+    """
+    if entry.get("data") is not None:
+        return memoryview(entry["data"]), None
+    fh = open(entry["path"], "rb")
+    try:
+        st = os.fstat(fh.fileno())
+        size = st.st_size
+        if size != entry["size"] or st.st_mtime_ns != entry["mtime_ns"]:
+            # файл изменился после индексации — под этим хешем его больше нет
+            raise OSError(f"{entry['path']} changed since it was indexed")
+        if size == 0:
+            return memoryview(b""), None
+        mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    finally:
+        fh.close()
+    return memoryview(mm), mm
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[tuple[int, int]]:
+    """
+    Один диапазон "bytes=a-b" / "bytes=a-" / "bytes=-n" → (start, end) включительно.
+    None — заголовка нет или формат не поддерживается (отдаём весь файл);
+    ValueError — диапазон вне файла (416).
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    if size <= 0:
+        raise ValueError(header)
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        start = int(first) if first else None
+        end = int(last) if last else None
+    except ValueError:
+        return None
+    if start is None:
+        if not end:
+            raise ValueError(header)
+        return max(0, size - end), size - 1
+    if end is None:
+        end = size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, min(end, size - 1)
+
+
+def clear() -> None:
+    with _lock:
+        _by_key.clear()
+        _current.clear()
+        _entries.clear()
+    _pending.clear()
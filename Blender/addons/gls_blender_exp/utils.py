@@ -1,5 +1,7 @@
 # SPDX-FileCopyrightText: 2025 D.Jorkin
 # SPDX-License-Identifier: GPL-3.0-or-later
+import hashlib
+import json
 import re
 
 
@@ -8,8 +10,47 @@ def sanitize(text: str) -> str:
     return re.sub(r"[^0-9A-Za-z_]+", "_", text)
 
 
-def make_node_id(name: str, idx: int) -> str:
-    return f"{sanitize(name)}_{idx:03d}"
+def make_node_id(name: str) -> str:
+    # Имя узла уникально в пределах дерева и не зависит от порядка tree.nodes.
+    # Короткий хеш исходного имени разводит имена, совпавшие после sanitize
+    # (например "Math.001" и "Math_001").
+    digest = hashlib.sha1(name.encode("utf-8")).hexdigest()[:6]
+    return f"{sanitize(name)}_{digest}"
+
+
+def canonical_value(value):
+    """
+    Приводит значение параметра к каноническому виду: float с точностью float32
+    (9 значащих цифр — любой float32 восстанавливается без потерь, без -0.0),
+    словари с отсортированными ключами.
+    """
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, float):
+        if value != value or value in (float("inf"), float("-inf")):
+            return value
+        v = float(f"{value:.9g}")
+        return 0.0 if v == 0.0 else v
+    if isinstance(value, dict):
+        return {k: canonical_value(value[k]) for k in sorted(value)}
+    if isinstance(value, (list, tuple)):
+        return [canonical_value(v) for v in value]
+    return value
+
+
+def parse_link(link: str) -> tuple[str, int, str, int]:
+    # формат: "from_id,out_idx,to_id,in_idx"
+    from_id, out_idx, to_id, in_idx = link.split(",")
+    return from_id, int(out_idx), to_id, int(in_idx)
+
+
+def subtree_hash(cls: str, params: dict, upstream: list) -> str:
+    """
+    Хеш поддерева: класс узла, нормализованные параметры и отсортированные
+    (in_idx, хеш источника, out_idx) всех входящих связей.
+    """
+    blob = json.dumps([cls, params, upstream], sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()[:16]
 
 
 def bl_to_gsl_class(bl_id: str) -> str:
@@ -0,0 +1,161 @@
+# SPDX-FileCopyrightText: 2025 D.Jorkin
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Группировка материалов пакета по структуре шейдера.
+
+Материалы, у которых совпадают топология графа и все параметры, влияющие на
+генерируемый код (операции, режимы, типы данных), отличаются только значениями
+uniform-ов и могут использовать один .gdshader.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+
+from .utils import parse_link
+
+# Параметры-ресурсы: в Godot это sampler-uniform-ы, а не часть кода шейдера
+_RESOURCE_PARAMS = {"image_path", "image_hash", "image_bytes", "image_file", "image_width", "image_height",
+                    "stops", "lut"}
+
+
+def _digest(obj) -> str:
+    blob = json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def _is_number(v) -> bool:
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def is_uniform_param(key: str, value) -> bool:
+    if key in _RESOURCE_PARAMS:
+        return True
+    # int/bool/str — индексы enum-ов и флаги, влияющие на код
+    if isinstance(value, float):
+        return True
+    if isinstance(value, list) and value and all(_is_number(v) for v in value):
+        return True
+    return False
+
+
+def _node_signature(node: dict) -> list:
+    params: dict = node.get("params", {}) or {}
+    structural = {k: v for k, v in params.items() if not is_uniform_param(k, v)}
+    uniform_keys = sorted(k for k, v in params.items() if is_uniform_param(k, v))
+    return [node.get("class"), node.get("inputs"), node.get("outputs"), structural, uniform_keys]
+
+
+def _topo_order(node_ids: list[str], edges: list[tuple]) -> list[str]:
+    pending = {nid: 0 for nid in node_ids}
+    consumers: dict[str, list[str]] = {nid: [] for nid in node_ids}
+    for from_id, _, to_id, _ in edges:
+        pending[to_id] += 1
+        consumers[from_id].append(to_id)
+    ready = sorted(nid for nid, cnt in pending.items() if cnt == 0)
+    order: list[str] = []
+    while ready:
+        nid = ready.pop()
+        order.append(nid)
+        for to_id in consumers[nid]:
+            pending[to_id] -= 1
+            if pending[to_id] == 0:
+                ready.append(to_id)
+    return order
+
+
+def structural_signatures(payload: dict) -> dict[str, tuple[str, str]]:
+    """
+    Для каждого узла — пара (хеш структуры выше по графу, хеш структуры ниже по графу).
+    Значения uniform-ов в хеши не входят.
+    """
+    nodes = {n["id"]: n for n in payload.get("nodes", [])}
+    edges = []
+    for l in payload.get("links", []):
+        edge = parse_link(l)
+        if edge[0] in nodes and edge[2] in nodes:
+            edges.append(edge)
+
+    upstream: dict[str, list[tuple]] = {nid: [] for nid in nodes}
+    downstream: dict[str, list[tuple]] = {nid: [] for nid in nodes}
+    for from_id, out_idx, to_id, in_idx in edges:
+        upstream[to_id].append((in_idx, from_id, out_idx))
+        downstream[from_id].append((out_idx, to_id, in_idx))
+
+    order = _topo_order(list(nodes), edges)
+
+    up: dict[str, str] = {}
+    for nid in order:
+        ups = sorted([i, up[f], o] for i, f, o in upstream[nid])
+        up[nid] = _digest([_node_signature(nodes[nid]), ups])
+
+    down: dict[str, str] = {}
+    for nid in reversed(order):
+        downs = sorted([o, down[t], i] for o, t, i in downstream[nid])
+        down[nid] = _digest([up[nid], downs])
+
+    return {nid: (up[nid], down[nid]) for nid in order}
+
+
+def structural_key(payload: dict, signatures: dict | None = None) -> str:
+    if signatures is None:
+        signatures = structural_signatures(payload)
+    return _digest(sorted(signatures.values()))
+
+
+def _uniform_values(node: dict) -> dict:
+    params: dict = node.get("params", {}) or {}
+    return {k: v for k, v in params.items() if is_uniform_param(k, v)}
+
+
+def group_variants(payloads: list[dict]) -> dict:
+    """
+    Возвращает одно описание шейдера на группу структурно одинаковых материалов
+    и наборы uniform-значений для каждого материала группы. Значения привязаны
+    к id узлов представителя группы.
+    """
+    groups: dict[str, list[tuple[dict, dict]]] = {}
+    errors: list[dict] = []
+    for payload in payloads:
+        if "error" in payload:
+            errors.append(payload)
+            continue
+        sigs = structural_signatures(payload)
+        groups.setdefault(structural_key(payload, sigs), []).append((payload, sigs))
+
+    shaders: list[dict] = []
+    for key in sorted(groups, key=lambda k: groups[k][0][0].get("material", "")):
+        members = groups[key]
+        rep, rep_sigs = members[0]
+        rep_nodes = {n["id"]: n for n in rep.get("nodes", [])}
+        rep_order = sorted(rep_sigs, key=lambda nid: (rep_sigs[nid], nid))
+
+        materials: dict[str, dict] = {}
+        for payload, sigs in members:
+            nodes = {n["id"]: n for n in payload.get("nodes", [])}
+            order = sorted(sigs, key=lambda nid: (sigs[nid], nid))
+            values: dict[str, dict] = {}
+            for rep_id, nid in zip(rep_order, order):
+                vals = _uniform_values(nodes[nid])
+                if vals:
+                    values[rep_id] = vals
+            materials[str(payload.get("material", ""))] = dict(sorted(values.items()))
+
+        uniform_params = {nid: sorted(_uniform_values(n)) for nid, n in rep_nodes.items() if _uniform_values(n)}
+        shader = {
+            "key": key,
+            "material": rep.get("material"),
+            "nodes": rep.get("nodes", []),
+            "links": rep.get("links", []),
+            "uniform_params": uniform_params,
+            "materials": materials,
+        }
+        if "library_refs" in rep:
+            shader["library_refs"] = rep["library_refs"]
+        shaders.append(shader)
+
+    data: dict = {"shaders": shaders}
+    if errors:
+        data["errors"] = errors
+    return data
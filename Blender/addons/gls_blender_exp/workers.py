@@ -0,0 +1,88 @@
+# SPDX-FileCopyrightText: 2025 D.Jorkin
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Пул процессов для тяжёлой работы экспортёра (запекание, упаковка текстур).
+
+spawn: форк процесса Blender небезопасен, а дочерний Python импортирует пакет
+из папки addons (site.addsitedir) без bpy. Если пул поднять не удалось, работа
+идёт в текущем процессе.
+"""
+from __future__ import annotations
+
+import multiprocessing
+import os
+import site
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Iterable, Optional
+
+from .config import WORKER_PROCESSES
+
+# Папка addons: процессы пула импортируют пакет из неё
+_ADDONS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def worker_count() -> int:
+    return max(1, WORKER_PROCESSES or os.cpu_count() or 1)
+
+
+def new_executor(workers: int, what: str = "Worker") -> Optional[ProcessPoolExecutor]:
+    """None — пул не нужен (один процесс) или недоступен."""
+    if workers <= 1:
+        return None
+    try:
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=site.addsitedir,
+            initargs=(_ADDONS_DIR,),
+        )
+    except Exception as e:
+        print(f"[GSL Exporter] {what} pool unavailable, running in-process: {e}")
+        return None
+
+
+def _call(fn: Callable, job: tuple):
+    try:
+        return fn(*job)
+    except Exception as e:
+        return e
+
+
+def run_all(fn: Callable, jobs: Iterable[tuple], what: str = "Worker",
+            progress: Optional[Callable[[int, int], None]] = None) -> list:
+    """
+    fn(*job) для каждой задачи, результаты в порядке jobs. Исключение задачи
+    возвращается на её месте, а не обрывает остальные. progress(done, total).
+    """
+    jobs = list(jobs)
+    results: list = [None] * len(jobs)
+    done = 0
+
+    def finish(idx: int, value) -> None:
+        nonlocal done
+        results[idx] = value
+        done += 1
+        if progress is not None:
+            progress(done, len(jobs))
+
+    executor = new_executor(min(worker_count(), len(jobs)), what)
+    if executor is not None:
+        try:
+            futures = [executor.submit(fn, *job) for job in jobs]
+            for idx, fut in enumerate(futures):
+                try:
+                    finish(idx, fut.result())
+                except BrokenProcessPool:
+                    # процесс пула упал — задачу досчитываем здесь
+                    finish(idx, _call(fn, jobs[idx]))
+                except Exception as e:
+                    finish(idx, e)
+            return results
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    for idx, job in enumerate(jobs):
+        finish(idx, _call(fn, job))
+    return results
@@ -0,0 +1,92 @@
+# SPDX-FileCopyrightText: 2025 D.Jorkin
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Время регистрации аддона вне Blender (fake_bpy), каждый замер в новом процессе.
+
+    python Blender/bench/addon_register.py [--runs 10] [--json out.json]
+
+import  — import gls_blender_exp;
+register — register(): то, что Blender ждёт при старте;
+deferred — таймеры, отложенные register() (запуск сервера);
+first_export — первый gather_material после этого (ленивые импорты).
+Плюс число модулей аддона, загруженных к концу register().
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+_BENCH_DIR = Path(__file__).resolve().parent
+_ADDONS_DIR = _BENCH_DIR.parent / "addons"
+
+
+def _child() -> None:
+    sys.path.insert(0, str(_BENCH_DIR))
+    import fake_bpy
+    import treegen
+
+    bpy = fake_bpy.install()
+    deferred: list = []
+    # таймеры не выполняются сразу, как в fake_bpy, а копятся: их время меряется отдельно
+    bpy.app.timers.register = lambda fn, first_interval=0.0, persistent=False: deferred.append((fn, persistent))
+    mat = treegen.generate(200, seed=1)
+    sys.path.insert(0, str(_ADDONS_DIR))
+
+    t0 = time.perf_counter()
+    import gls_blender_exp as addon
+    t1 = time.perf_counter()
+    import gls_blender_exp.config as config
+    config.PORT = 0  # без конфликта с запущенным Blender
+    t2 = time.perf_counter()
+    addon.register()
+    t3 = time.perf_counter()
+    loaded = sorted(m for m in sys.modules if m.startswith("gls_blender_exp"))
+    while deferred:
+        fn, persistent = deferred.pop(0)
+        again = fn()
+        # постоянные таймеры (announce, диспетчер) работают всю сессию: в замер — один проход
+        if again is not None and not persistent:
+            deferred.append((fn, persistent))
+    t4 = time.perf_counter()
+    from gls_blender_exp import exporter
+    exporter.gather_material(mat)
+    t5 = time.perf_counter()
+    addon.unregister()
+    print(json.dumps({
+        "import_ms": (t1 - t0) * 1000.0, "register_ms": (t3 - t2) * 1000.0,
+        "deferred_ms": (t4 - t3) * 1000.0, "first_export_ms": (t5 - t4) * 1000.0,
+        "modules_at_register": len(loaded),
+    }))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--json", type=Path, help="записать медианы в JSON")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        _child()
+        return 0
+
+    runs = []
+    for _ in range(max(1, args.runs)):
+        out = subprocess.run([sys.executable, str(Path(__file__).resolve()), "--child"],
+                             capture_output=True, text=True, check=True)
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    summary = {key: round(statistics.median(r[key] for r in runs), 3) for key in runs[0]}
+    for key, value in summary.items():
+        print(f"{key:20s} {value:10.2f}")
+    if args.json:
+        args.json.write_text(json.dumps({"runs": len(runs), "median": summary}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+# SPDX-FileCopyrightText: 2025 D.Jorkin
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Замер экспорта материала вне Blender: fake_bpy + синтетические деревья (treegen).
+
+    python Blender/bench/export_bench.py [--sizes 10,100,1000,5000,20000]
+        [--json out.json] [--save-baseline base.json] [--baseline base.json]
+
+Для каждого размера дерева меряет gather_material целиком, его фазы (узлы,
+связи и всё после них), время каждого обработчика по bl_idname и json.dumps
+ответа. --save-baseline пишет результаты в JSON, --baseline сравнивает с ним.
+Код возвращает 1, если какое-то время выросло больше чем на --tolerance.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import fake_bpy
+
+_ADDONS_DIR = Path(__file__).resolve().parents[1] / "addons"
+
+# Разница меньше этого не считается регрессией: шум таймера на маленьких деревьях
+MIN_REGRESSION_MS = 0.5
+
+
+def load_exporter():
+    fake_bpy.install()
+    if str(_ADDONS_DIR) not in sys.path:
+        sys.path.insert(0, str(_ADDONS_DIR))
+    from gls_blender_exp import exporter, registry  # noqa: E402
+    return exporter, registry
+
+
+def _best(fn, repeat: int) -> tuple[float, object]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+@contextmanager
+def timed_handlers(registry):
+    """Оборачивает обработчики registry; отдаёт {bl_idname: [секунды, вызовы]}."""
+    totals: dict[str, list] = {}
+    original = registry.load_all()
+
+    def wrap(bl_idname, handler):
+        def timed(*args):
+            t0 = time.perf_counter()
+            try:
+                return handler(*args)
+            finally:
+                entry = totals.setdefault(bl_idname, [0.0, 0])
+                entry[0] += time.perf_counter() - t0
+                entry[1] += 1
+        return timed
+
+    registry._REGISTRY.update({k: wrap(k, h) for k, h in original.items()})
+    try:
+        yield totals
+    finally:
+        registry._REGISTRY.clear()
+        registry._REGISTRY.update(original)
+
+
+def bench_size(exporter, registry, size: int, repeat: int, seed: int) -> dict:
+    import treegen
+
+    mat = treegen.generate(size, seed=seed)
+    tree = mat.node_tree
+    gather_s, payload = _best(lambda: exporter.gather_material(mat), repeat)
+    nodes_s, (_, node_id_map) = _best(lambda: exporter._collect_nodes(tree, mat), repeat)
+    links_s, _ = _best(lambda: exporter._collect_links(tree, node_id_map), repeat)
+    encode_s, body = _best(lambda: json.dumps(payload, ensure_ascii=False).encode(), repeat)
+
+    with timed_handlers(registry) as totals:
+        exporter.gather_material(mat)
+    handlers = {
+        bl.replace("ShaderNode", ""): {"ms": round(sec * 1000.0, 3), "calls": calls,
+                                       "us_per_call": round(sec * 1e6 / calls, 2)}
+        for bl, (sec, calls) in sorted(totals.items())
+    }
+    return {
+        "nodes": len(payload["nodes"]),
+        "links": len(payload["links"]),
+        "gather_ms": round(gather_s * 1000.0, 3),
+        "collect_nodes_ms": round(nodes_s * 1000.0, 3),
+        "collect_links_ms": round(links_s * 1000.0, 3),
+        "post_ms": round(max(0.0, gather_s - nodes_s - links_s) * 1000.0, 3),
+        "json_ms": round(encode_s * 1000.0, 3),
+        "json_bytes": len(body),
+        "handlers": handlers,
+    }
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent,
+                             capture_output=True, text=True, timeout=5)
+        return out.stdout.strip()
+    except Exception:
+        return ""
+
+
+def _timings(results: dict) -> dict[str, float]:
+    # плоский список времён: "1000/gather_ms", "1000/handlers/Math"
+    flat: dict[str, float] = {}
+    for size, res in results.items():
+        for key, value in res.items():
+            if key.endswith("_ms"):
+                flat[f"{size}/{key}"] = float(value)
+        for name, h in res.get("handlers", {}).items():
+            flat[f"{size}/handlers/{name}"] = float(h["ms"])
+    return flat
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    cur, base = _timings(current), _timings(baseline)
+    regressions = []
+    for key in sorted(cur.keys() & base.keys()):
+        if cur[key] > base[key] * (1.0 + tolerance) and cur[key] - base[key] > MIN_REGRESSION_MS:
+            regressions.append(f"{key}: {base[key]:.2f} → {cur[key]:.2f} ms (+{cur[key] / max(base[key], 1e-9) - 1.0:.0%})")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(str(s) for s in (10, 100, 1000, 5000, 20000)))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", type=Path, help="записать результаты в JSON")
+    parser.add_argument("--save-baseline", type=Path, help="сохранить результаты как базовые")
+    parser.add_argument("--baseline", type=Path, help="сравнить с базовыми результатами")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="допустимый рост времени (доля)")
+    args = parser.parse_args(argv)
+
+    exporter, registry = load_exporter()
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    results: dict = {}
+    for size in sizes:
+        res = bench_size(exporter, registry, size, args.repeat, args.seed)
+        results[str(size)] = res
+        print(f"{size:6d} nodes  gather {res['gather_ms']:9.2f} ms  (nodes {res['collect_nodes_ms']:.2f}, "
+              f"links {res['collect_links_ms']:.2f}, post {res['post_ms']:.2f})  "
+              f"json {res['json_ms']:.2f} ms / {res['json_bytes'] / 1024:.0f} KiB")
+        slowest = sorted(res["handlers"].items(), key=lambda kv: -kv[1]["ms"])[:3]
+        print("        handlers: " + ", ".join(f"{k} {v['ms']:.2f} ms ({v['us_per_call']:.1f} us)" for k, v in slowest))
+
+    report = {
+        "meta": {"commit": _git_commit(), "python": platform.python_version(), "platform": platform.platform(),
+                 "repeat": args.repeat, "seed": args.seed, "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "results": results,
+    }
+    for path in (args.json, args.save_baseline):
+        if path:
+            path.write_text(json.dumps(report, indent=2))
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        regressions = compare(results, baseline.get("results", {}), args.tolerance)
+        print(f"baseline {baseline.get('meta', {}).get('commit', '?')}: "
+              + ("ok" if not regressions else f"{len(regressions)} regression(s)"))
+        for line in regressions:
+            print("  " + line)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,420 @@
+# SPDX-FileCopyrightText: 2025 D.Jorkin
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Лёгкая замена bpy/mathutils для запуска экспортёра вне Blender.
+
+Моделирует только то, что читают exporter, обработчики и link_adapters:
+сокеты (имя, тип, default_value, enabled/hide/is_linked), узлы с атрибутами,
+связи, Color Ramp, изображения и материалы. Сокеты узлов повторяют порядок и
+имена Blender 4.x — от них зависят индексы в связях.
+
+    import fake_bpy
+    bpy = fake_bpy.install()       # до импорта gls_blender_exp
+    mat = fake_bpy.new_material("Mat")
+    noise = mat.node_tree.nodes.new("ShaderNodeTexNoise")
+"""
+from __future__ import annotations
+
+import sys
+import types
+from typing import Any, Optional
+
+
+class Vector(list):
+    pass
+
+
+class Color(list):
+    pass
+
+
+class Euler(list):
+    pass
+
+
+#region Nodes
+
+class Socket:
+    def __init__(self, name: str, type: str = "VALUE", default_value: Any = None, enabled: bool = True,
+                 identifier: Optional[str] = None):
+        self.name = name
+        self.type = type
+        self.identifier = identifier or name
+        if default_value is not None:
+            self.default_value = default_value
+        self.enabled = enabled
+        self.hide = False
+        self.is_hidden = False
+        self.is_linked = False
+        self.node: Optional["Node"] = None
+
+
+class Sockets(list):
+    def find(self, name: str) -> int:
+        for idx, s in enumerate(self):
+            if s.name == name:
+                return idx
+        return -1
+
+
+def _f(name, value=0.0, **kw):
+    return Socket(name, "VALUE", float(value), **kw)
+
+
+def _v(name, value=(0.0, 0.0, 0.0), **kw):
+    return Socket(name, "VECTOR", Vector(value), **kw)
+
+
+def _c(name, value=(0.8, 0.8, 0.8, 1.0), **kw):
+    return Socket(name, "RGBA", Color(value), **kw)
+
+
+def _s(name, **kw):
+    return Socket(name, "SHADER", **kw)
+
+
+def _out(name, type="VALUE", **kw):
+    return Socket(name, type, **kw)
+
+
+# bl_idname → (входы, выходы, атрибуты узла по умолчанию)
+NODE_TYPES: dict[str, tuple] = {
+    "ShaderNodeTexCoord": (
+        lambda: [],
+        lambda: [_out(n, "VECTOR") for n in ("Generated", "Normal", "UV", "Object", "Camera", "Window", "Reflection")],
+        {"from_instancer": False},
+    ),
+    "ShaderNodeMapping": (
+        lambda: [_v("Vector"), _v("Location"), Socket("Rotation", "VECTOR", Euler((0.0, 0.0, 0.0))),
+                 _v("Scale", (1.0, 1.0, 1.0))],
+        lambda: [_out("Vector", "VECTOR")],
+        {"vector_type": "POINT"},
+    ),
+    "ShaderNodeTexImage": (
+        lambda: [_v("Vector")],
+        lambda: [_out("Color", "RGBA"), _out("Alpha")],
+        {"interpolation": "Linear", "projection": "FLAT", "projection_blend": 0.0,
+         "extension": "REPEAT", "alpha_mode": "STRAIGHT", "image": None},
+    ),
+    "ShaderNodeTexNoise": (
+        lambda: [_v("Vector"), _f("W", enabled=False), _f("Scale", 5.0), _f("Detail", 2.0), _f("Roughness", 0.5),
+                 _f("Lacunarity", 2.0), _f("Offset", enabled=False), _f("Gain", 1.0, enabled=False),
+                 _f("Distortion")],
+        lambda: [_out("Fac"), _out("Color", "RGBA")],
+        {"noise_dimensions": "3D", "noise_type": "FBM", "normalize": True},
+    ),
+    "ShaderNodeTexWhiteNoise": (
+        lambda: [_v("Vector"), _f("W", enabled=False)],
+        lambda: [_out("Value"), _out("Color", "RGBA")],
+        {"noise_dimensions": "3D"},
+    ),
+    "ShaderNodeMath": (
+        lambda: [_f("Value", 0.5), _f("Value", 0.5), _f("Value", 0.5, enabled=False)],
+        lambda: [_out("Value")],
+        {"operation": "ADD", "use_clamp": False},
+    ),
+    "ShaderNodeVectorMath": (
+        lambda: [_v("Vector"), _v("Vector"), _v("Vector", enabled=False), _f("Scale", 1.0, enabled=False)],
+        lambda: [_out("Vector", "VECTOR"), _out("Value", enabled=False)],
+        {"operation": "ADD"},
+    ),
+    "ShaderNodeMix": (
+        lambda: [_f("Factor", 0.5), _v("Factor", (0.5, 0.5, 0.5), enabled=False),
+                 _f("A", enabled=False), _f("B", enabled=False),
+                 _v("A", enabled=False), _v("B", enabled=False),
+                 _c("A", (0.5, 0.5, 0.5, 1.0)), _c("B", (0.5, 0.5, 0.5, 1.0))],
+        lambda: [_out("Result", enabled=False), _out("Result", "VECTOR", enabled=False), _out("Result", "RGBA")],
+        {"data_type": "RGBA", "blend_type": "MIX", "clamp_factor": True, "clamp_result": False,
+         "factor_mode": "UNIFORM"},
+    ),
+    "ShaderNodeMapRange": (
+        lambda: [_f("Value", 1.0), _f("From Min"), _f("From Max", 1.0), _f("To Min"), _f("To Max", 1.0),
+                 _f("Steps", 4.0, enabled=False), _v("Vector", enabled=False),
+                 _v("From Min", enabled=False, identifier="From_Min_FLOAT3"),
+                 _v("From Max", (1.0, 1.0, 1.0), enabled=False, identifier="From_Max_FLOAT3"),
+                 _v("To Min", enabled=False, identifier="To_Min_FLOAT3"),
+                 _v("To Max", (1.0, 1.0, 1.0), enabled=False, identifier="To_Max_FLOAT3"),
+                 _v("Steps", (4.0, 4.0, 4.0), enabled=False, identifier="Steps_FLOAT3")],
+        lambda: [_out("Result"), _out("Vector", "VECTOR", enabled=False)],
+        {"data_type": "FLOAT", "interpolation_type": "LINEAR", "clamp": True},
+    ),
+    "ShaderNodeSeparateColor": (
+        lambda: [_c("Color")],
+        lambda: [_out("Red"), _out("Green"), _out("Blue")],
+        {"mode": "RGB"},
+    ),
+    "ShaderNodeCombineColor": (
+        lambda: [_f("Red"), _f("Green"), _f("Blue")],
+        lambda: [_out("Color", "RGBA")],
+        {"mode": "RGB"},
+    ),
+    "ShaderNodeSeparateXYZ": (
+        lambda: [_v("Vector")],
+        lambda: [_out("X"), _out("Y"), _out("Z")],
+        {},
+    ),
+    "ShaderNodeCombineXYZ": (
+        lambda: [_f("X"), _f("Y"), _f("Z")],
+        lambda: [_out("Vector", "VECTOR")],
+        {},
+    ),
+    "ShaderNodeValToRGB": (
+        lambda: [_f("Fac", 0.5)],
+        lambda: [_out("Color", "RGBA"), _out("Alpha")],
+        {},
+    ),
+    "ShaderNodeBump": (
+        lambda: [_f("Strength", 1.0), _f("Distance", 1.0), _f("Filter Width", 0.1), _f("Height", 1.0),
+                 _v("Normal")],
+        lambda: [_out("Normal", "VECTOR")],
+        {"invert": False},
+    ),
+    "ShaderNodeNormalMap": (
+        lambda: [_f("Strength", 1.0), _c("Color", (0.5, 0.5, 1.0, 1.0))],
+        lambda: [_out("Normal", "VECTOR")],
+        {"space": "TANGENT", "uv_map": ""},
+    ),
+    "ShaderNodeBsdfPrincipled": (
+        lambda: [_c("Base Color"), _f("Metallic"), _f("Roughness", 0.5), _f("IOR", 1.5), _f("Alpha", 1.0),
+                 _v("Normal"), _f("Subsurface Weight"), _v("Subsurface Radius", (1.0, 0.2, 0.1)),
+                 _f("Subsurface Scale", 0.05), _f("Specular IOR Level", 0.5), _c("Specular Tint", (1.0, 1.0, 1.0, 1.0)),
+                 _f("Anisotropic"), _f("Anisotropic Rotation"), _v("Tangent"), _f("Transmission Weight"),
+                 _f("Coat Weight"), _f("Coat Roughness", 0.03), _f("Coat IOR", 1.5),
+                 _c("Coat Tint", (1.0, 1.0, 1.0, 1.0)), _v("Coat Normal"), _f("Sheen Weight"),
+                 _f("Sheen Roughness", 0.5), _c("Sheen Tint", (1.0, 1.0, 1.0, 1.0)),
+                 _c("Emission Color", (1.0, 1.0, 1.0, 1.0)), _f("Emission Strength")],
+        lambda: [_out("BSDF", "SHADER")],
+        {"distribution": "MULTI_GGX", "subsurface_method": "RANDOM_WALK"},
+    ),
+    "ShaderNodeOutputMaterial": (
+        lambda: [_s("Surface"), _s("Volume"), _v("Displacement"), _f("Thickness")],
+        lambda: [],
+        {"target": "ALL", "is_active_output": True},
+    ),
+}
+
+
+class Node:
+    def __init__(self, bl_idname: str, name: str):
+        inputs, outputs, attrs = NODE_TYPES[bl_idname]
+        self.bl_idname = bl_idname
+        self.name = name
+        self.label = ""
+        self.inputs = Sockets(inputs())
+        self.outputs = Sockets(outputs())
+        for s in list(self.inputs) + list(self.outputs):
+            s.node = self
+        for key, value in attrs.items():
+            setattr(self, key, value)
+        if bl_idname == "ShaderNodeValToRGB":
+            self.color_ramp = ColorRamp()
+
+    def __repr__(self) -> str:
+        return f"<Node {self.bl_idname} {self.name!r}>"
+
+
+class Link:
+    def __init__(self, from_socket: Socket, to_socket: Socket):
+        self.from_socket = from_socket
+        self.to_socket = to_socket
+        self.from_node = from_socket.node
+        self.to_node = to_socket.node
+        self.is_valid = True
+        from_socket.is_linked = True
+        to_socket.is_linked = True
+
+
+class Nodes(list):
+    def __init__(self):
+        super().__init__()
+        self._names: set[str] = set()
+        self._next: dict[str, int] = {}
+
+    def new(self, bl_idname: str, name: Optional[str] = None) -> Node:
+        base = name or bl_idname.replace("ShaderNode", "")
+        unique, suffix = base, self._next.get(base, 0)
+        while unique in self._names:
+            suffix += 1
+            unique = f"{base}.{suffix:03d}"
+        self._next[base] = suffix
+        self._names.add(unique)
+        node = Node(bl_idname, unique)
+        self.append(node)
+        return node
+
+    def get(self, name: str) -> Optional[Node]:
+        return next((n for n in self if n.name == name), None)
+
+
+class Links(list):
+    def new(self, from_socket: Socket, to_socket: Socket) -> Link:
+        # вход принимает одну связь, как в Blender
+        if to_socket.is_linked:
+            for old in [l for l in self if l.to_socket is to_socket]:
+                self.remove(old)
+        link = Link(from_socket, to_socket)
+        self.append(link)
+        return link
+
+
+class NodeTree:
+    id_type = "NODETREE"
+
+    def __init__(self):
+        self.nodes = Nodes()
+        self.links = Links()
+
+#endregion
+
+
+#region Data
+
+class ColorRampElement:
+    def __init__(self, position: float, color):
+        self.position = float(position)
+        self.color = Color(color)
+        self.alpha = float(color[3])
+
+
+class ColorRampElements(list):
+    def new(self, position: float) -> ColorRampElement:
+        el = ColorRampElement(position, (1.0, 1.0, 1.0, 1.0))
+        self.append(el)
+        self.sort(key=lambda e: e.position)
+        return el
+
+
+class ColorRamp:
+    def __init__(self):
+        self.interpolation = "LINEAR"
+        self.color_mode = "RGB"
+        self.hue_interpolation = "NEAR"
+        self.elements = ColorRampElements([ColorRampElement(0.0, (0.0, 0.0, 0.0, 1.0)),
+                                           ColorRampElement(1.0, (1.0, 1.0, 1.0, 1.0))])
+
+
+class ColorspaceSettings:
+    def __init__(self, name: str = "sRGB"):
+        self.name = name
+
+
+class Pixels:
+    def __init__(self, image: "Image"):
+        self._image = image
+
+    def __len__(self) -> int:
+        w, h = self._image.size
+        return w * h * self._image.channels
+
+    def foreach_get(self, buf) -> None:
+        # детерминированная «картинка»: значения по индексу, без NumPy
+        for idx in range(len(buf)):
+            buf[idx] = (idx % 251) / 250.0
+
+
+class Image:
+    def __init__(self, name: str, width: int = 1024, height: int = 1024, filepath: str = "",
+                 colorspace: str = "sRGB"):
+        self.name = name
+        self.size = (width, height)
+        self.filepath = filepath
+        self.filepath_raw = filepath
+        self.file_format = "PNG"
+        self.colorspace_settings = ColorspaceSettings(colorspace)
+        self.packed_file = None
+        self.is_float = False
+        self.depth = 32
+        self.channels = 4
+        self.alpha_mode = "STRAIGHT"
+        self.pixels = Pixels(self)
+
+
+class Material:
+    id_type = "MATERIAL"
+
+    def __init__(self, name: str):
+        self.name = name
+        self.use_nodes = True
+        self.node_tree = NodeTree()
+        self.users = 1
+        self.is_grease_pencil = False
+
+
+class Collection(dict):
+    """bpy.data.* : доступ по имени, итерация по значениям."""
+
+    def __iter__(self):
+        return iter(list(self.values()))
+
+    def new(self, name: str, *args, **kwargs):
+        raise NotImplementedError
+
+    def remove(self, item) -> None:
+        self.pop(item.name, None)
+
+
+class Materials(Collection):
+    def new(self, name: str) -> Material:
+        mat = Material(name)
+        self[name] = mat
+        return mat
+
+
+class Images(Collection):
+    def new(self, name: str, width: int = 1024, height: int = 1024, **kwargs) -> Image:
+        img = Image(name, width, height, **kwargs)
+        self[name] = img
+        return img
+
+#endregion
+
+
+#region Install
+
+def _make_bpy() -> types.ModuleType:
+    bpy = types.ModuleType("bpy")
+    bpy.types = types.SimpleNamespace(AddonPreferences=object, Operator=object, Panel=object)
+    # таймеры выполняются сразу: «главный поток» — вызывающий
+    bpy.app = types.SimpleNamespace(
+        timers=types.SimpleNamespace(register=lambda fn, **kw: fn(), is_registered=lambda fn: False,
+                                     unregister=lambda fn: None),
+        handlers=types.SimpleNamespace(load_post=[], depsgraph_update_post=[]),
+        version=(4, 2, 0),
+        background=True,
+    )
+    bpy.path = types.SimpleNamespace(abspath=lambda p: p, basename=lambda p: p.replace("\\", "/").split("/")[-1])
+    bpy.utils = types.SimpleNamespace(register_class=lambda c: None, unregister_class=lambda c: None)
+    bpy.props = types.SimpleNamespace(**{k: (lambda **kw: None) for k in (
+        "BoolProperty", "IntProperty", "FloatProperty", "StringProperty", "EnumProperty")})
+    bpy.data = types.SimpleNamespace(materials=Materials(), images=Images(), filepath="")
+    bpy.context = types.SimpleNamespace(object=None, preferences=None)
+    return bpy
+
+
+def install() -> types.ModuleType:
+    """Регистрирует bpy и mathutils в sys.modules; повторный вызов возвращает тот же bpy."""
+    existing = sys.modules.get("bpy")
+    if existing is not None and getattr(existing, "__gsl_fake__", False):
+        return existing
+    bpy = _make_bpy()
+    bpy.__gsl_fake__ = True
+    mathutils = types.ModuleType("mathutils")
+    mathutils.Vector, mathutils.Color, mathutils.Euler = Vector, Color, Euler
+    sys.modules["bpy"] = bpy
+    sys.modules["bpy.types"] = bpy.types
+    sys.modules["bpy.app"] = bpy.app
+    sys.modules["bpy.app.handlers"] = bpy.app.handlers
+    sys.modules["mathutils"] = mathutils
+    return bpy
+
+
+def new_material(name: str) -> Material:
+    bpy = install()
+    return bpy.data.materials.new(name)
+
+
+def link(tree: NodeTree, from_node: Node, out_idx: int, to_node: Node, in_idx: int) -> Link:
+    return tree.links.new(from_node.outputs[out_idx], to_node.inputs[in_idx])
+
+#endregion
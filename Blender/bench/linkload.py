@@ -0,0 +1,553 @@
+# SPDX-FileCopyrightText: 2025 D.Jorkin
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Нагрузка на сервер GSL: повтор записанных сессий и синтетический поток запросов.
+
+    # повтор сессии, записанной recorder.py (config.RECORD_SESSIONS)
+    python Blender/bench/linkload.py replay session.jsonl --concurrency 8 --rate 20
+    # синтетика: /link по материалу из N узлов, часть запросов — /batch
+    python Blender/bench/linkload.py synth --nodes 2000 --requests 200 --concurrency 4
+    # то же по постоянным соединениям и конвейером по 100 запросов в сокет
+    python Blender/bench/linkload.py synth --requests 1000 --keepalive
+    python Blender/bench/linkload.py synth --requests 1000 --pipeline 100 --concurrency 1
+    # только сервер на fake_bpy (для своего клиента); asyncio-ядро с правкой материалов
+    python Blender/bench/linkload.py serve --port 5055
+    python Blender/bench/linkload.py serve --core asyncio --mutate-ms 200
+
+Без --url сервер поднимается в отдельном процессе на fake_bpy: материалы
+из сессии заменяются синтетическими деревьями того же размера (treegen), а
+главный поток Blender — очередью таймеров с --stall-ms задержкой на задачу, чтобы
+проверять путь с таймаутом 2 с. Отчёт: пропускная способность, p50/p95/p99,
+доля ошибок и таймаутов, байты в обе стороны, число TCP-соединений.
+"""
+from __future__ import annotations
+
+import argparse
+import heapq
+import http.client
+import json
+import queue
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlencode, urlparse
+
+_BENCH_DIR = Path(__file__).resolve().parent
+_ADDONS_DIR = _BENCH_DIR.parent / "addons"
+
+# Ответ сервера, когда главный поток Blender не успел (exporter._run_on_main_thread)
+_TIMEOUT_MARKER = b'"error": "timeout"'
+
+
+#region Session
+
+def load_session(path: Path) -> list[dict]:
+    entries = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if line:
+            entries.append(json.loads(line))
+    entries.sort(key=lambda e: e.get("t", 0.0))
+    return entries
+
+
+def session_materials(entries: list[dict]) -> dict[str, int]:
+    """Материал → наибольшее записанное число узлов (для синтетической замены)."""
+    sizes: dict[str, int] = {}
+    for e in entries:
+        for m in e.get("materials", [e]):
+            name = m.get("material")
+            if name:
+                sizes[name] = max(sizes.get(name, 0), int(m.get("nodes") or 0))
+    return sizes
+
+
+def schedule(entries: list[dict], count: int, rate: float, speed: float) -> list[tuple[float, str]]:
+    """(смещение от старта в секундах, путь); сессия повторяется по кругу до count запросов."""
+    if not entries:
+        return []
+    count = count or len(entries)
+    base = entries[0].get("t", 0.0)
+    span = entries[-1].get("t", 0.0) - base
+    out = []
+    for idx in range(count):
+        e = entries[idx % len(entries)]
+        if rate > 0:
+            offset = idx / rate
+        else:
+            cycle = idx // len(entries)
+            offset = ((e.get("t", 0.0) - base) + cycle * (span + 0.001)) / max(speed, 1e-6)
+        out.append((offset, e["path"]))
+    return out
+
+
+def synthetic_entries(materials: list[str], nodes: int, batch_ratio: float) -> list[dict]:
+    entries = [{"path": "/link", "material": materials[0], "nodes": nodes}]
+    if batch_ratio > 0:
+        query = urlencode([("material", m) for m in materials])
+        batch = {"path": f"/batch?{query}", "materials": [{"material": m, "nodes": nodes} for m in materials]}
+        every = max(1, round(1.0 / batch_ratio))
+        entries = entries * (every - 1) + [batch]
+    return entries
+
+#endregion
+
+
+#region Local server
+
+class MainLoop:
+    """
+    Главный поток Blender: задачи bpy.app.timers выполняются по одной, разовые — с задержкой stall.
+    Как в Blender, число из функции — через сколько секунд вызвать её снова, None — снять таймер.
+    """
+
+    def __init__(self, stall_ms: float):
+        self.stall = stall_ms / 1000.0
+        self.due: list = []  # куча (время, порядковый номер, fn, persistent)
+        self.seq = 0
+        self.cond = threading.Condition()
+
+    def register(self, fn, first_interval: float = 0.0, persistent: bool = False):
+        with self.cond:
+            self.seq += 1
+            heapq.heappush(self.due, (time.monotonic() + (first_interval or 0.0), self.seq, fn, persistent))
+            self.cond.notify()
+
+    def is_registered(self, fn) -> bool:
+        with self.cond:
+            return any(entry[2] == fn for entry in self.due)
+
+    def unregister(self, fn) -> None:
+        with self.cond:
+            self.due = [entry for entry in self.due if entry[2] != fn]
+            heapq.heapify(self.due)
+
+    def stop(self) -> None:
+        self.register(None)
+
+    def run(self) -> None:
+        while True:
+            with self.cond:
+                while not self.due or self.due[0][0] > time.monotonic():
+                    self.cond.wait(self.due[0][0] - time.monotonic() if self.due else None)
+                _, _, fn, persistent = heapq.heappop(self.due)
+            if fn is None:
+                return
+            # stall — занятость одной задачи экспорта, а не опроса постоянного таймера
+            if self.stall and not persistent:
+                time.sleep(self.stall)
+            again = fn()
+            if again is not None:
+                self.register(fn, again, persistent)
+
+
+def _mutate(bpy, interval: float):
+    """Правка материалов по таймеру, как от пользователя: первое число-вход каждого дерева → время."""
+    depsgraph = type("Depsgraph", (), {})()
+
+    def _tick():
+        updates = []
+        stamp = round(time.time() % 100.0, 4)
+        for mat in bpy.data.materials:
+            for node in mat.node_tree.nodes:
+                sock = next((s for s in node.inputs if s.type == "VALUE" and not s.is_linked), None)
+                if sock is not None:
+                    sock.default_value = stamp
+                    updates.append(type("Update", (), {"id": mat})())
+                    break
+        depsgraph.updates = updates
+        for handler in list(bpy.app.handlers.depsgraph_update_post):
+            handler(None, depsgraph)
+        return interval
+    return _tick
+
+
+def serve(port: int, materials: dict[str, int], stall_ms: float, ready_out=None,
+          core: str = "threading", mutate_ms: float = 0.0) -> None:
+    sys.path.insert(0, str(_BENCH_DIR))
+    import fake_bpy
+    import treegen
+
+    bpy = fake_bpy.install()
+    loop = MainLoop(stall_ms)
+    bpy.app.timers.register = loop.register
+    bpy.app.timers.is_registered = loop.is_registered
+    bpy.app.timers.unregister = loop.unregister
+    sys.path.insert(0, str(_ADDONS_DIR))
+
+    active = None
+    for idx, (name, nodes) in enumerate(sorted(materials.items(), key=lambda kv: -kv[1])):
+        mat = treegen.generate(max(nodes, 3), seed=idx, name=name)
+        active = active or mat
+    # /link экспортирует активный объект: им становится самый большой материал сессии
+    bpy.context.object = type("Object", (), {"active_material": active})()
+
+    if core == "asyncio":
+        from gls_blender_exp import async_server
+        bound = async_server.launch_server("127.0.0.1", port).port
+    else:
+        from gls_blender_exp import server
+        httpd = server.make_server("127.0.0.1", port)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        bound = httpd.server_address[1]
+    if mutate_ms > 0:
+        loop.register(_mutate(bpy, mutate_ms / 1000.0), mutate_ms / 1000.0, persistent=True)
+    print(f"READY {bound}", file=ready_out or sys.stdout, flush=True)
+    loop.run()
+
+
+def start_local(materials: dict[str, int], stall_ms: float, core: str = "threading",
+                mutate_ms: float = 0.0) -> tuple[subprocess.Popen, int]:
+    cmd = [sys.executable, str(Path(__file__).resolve()), "serve", "--port", "0", "--core", core,
+           "--stall-ms", str(stall_ms), "--mutate-ms", str(mutate_ms), "--materials-json", json.dumps(materials)]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    for line in proc.stdout:  # type: ignore[union-attr]
+        if line.startswith("READY "):
+            # строки лога сервера дальше никто не читает: без этого pipe заполнится и сервер встанет
+            threading.Thread(target=proc.stdout.read, daemon=True).start()  # type: ignore[union-attr]
+            return proc, int(line.split()[1])
+    raise RuntimeError("local server exited before it was ready")
+
+#endregion
+
+
+#region Load
+
+class Result:
+    __slots__ = ("path", "ok", "timeout", "status", "latency", "sent", "received", "error")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.ok = False
+        self.timeout = False
+        self.status = 0
+        self.latency = 0.0
+        self.sent = 0
+        self.received = 0
+        self.error = ""
+
+
+def _request_bytes(host: str, port: int, path: str) -> bytes:
+    return f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nAccept-Encoding: identity\r\n\r\n".encode()
+
+
+def _fill(res: Result, status: int, header_bytes: int, body: bytes) -> None:
+    res.status = status
+    res.received = len(body) + header_bytes
+    res.timeout = _TIMEOUT_MARKER in body[:256]
+    res.ok = status == 200 and not body.startswith(b'{"error"')
+    if not res.ok and not res.timeout:
+        res.error = body[:120].decode("utf-8", "replace")
+
+
+def _request(host: str, port: int, path: str, timeout: float,
+             conn: Optional[http.client.HTTPConnection] = None) -> Result:
+    """Один запрос; с conn — по уже открытому keep-alive соединению (переподключается само)."""
+    res = Result(path)
+    res.sent = len(_request_bytes(host, port, path))
+    own = conn is None
+    if conn is None:
+        conn = http.client.HTTPConnection(host, port, timeout=timeout)
+    t0 = time.perf_counter()
+    try:
+        conn.request("GET", path)
+        resp = conn.getresponse()
+        body = resp.read()
+        _fill(res, resp.status, sum(len(k) + len(v) + 4 for k, v in resp.getheaders()) + 17, body)
+    except TimeoutError:
+        res.timeout = True
+        res.error = "client timeout"
+        conn.close()
+    except OSError as e:
+        res.error = f"{type(e).__name__}: {e}"
+        conn.close()
+    finally:
+        if own:
+            conn.close()
+    res.latency = time.perf_counter() - t0
+    return res
+
+
+def _read_response(fp) -> tuple[int, int, bytes, bool]:
+    """Статус, байты заголовков, тело, закрывает ли сервер соединение. Сервер всегда шлёт Content-Length."""
+    status_line = fp.readline()
+    if not status_line:
+        raise ConnectionResetError("server closed the connection")
+    header_bytes = len(status_line)
+    headers = {}
+    while True:
+        line = fp.readline()
+        header_bytes += len(line)
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    body = fp.read(int(headers.get("content-length", "0")))
+    return int(status_line.split()[1]), header_bytes, body, headers.get("connection", "").lower() == "close"
+
+
+def _pipeline(host: str, port: int, paths: list[str], depth: int, timeout: float) -> tuple[list[Result], int]:
+    """Запросы пачками по depth в одном сокете: пачка уходит целиком, потом читаются ответы по порядку."""
+    results: list[Result] = []
+    connections = 0
+    sock = fp = None
+    todo = list(paths)
+    while todo:
+        if sock is None:
+            sock = socket.create_connection((host, port), timeout=timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            fp = sock.makefile("rb")
+            connections += 1
+        chunk, todo = todo[:depth], todo[depth:]
+        t0 = time.perf_counter()
+        answered = 0
+        try:
+            sock.sendall(b"".join(_request_bytes(host, port, p) for p in chunk))
+            for path in chunk:
+                status, header_bytes, body, closing = _read_response(fp)
+                res = Result(path)
+                res.sent = len(_request_bytes(host, port, path))
+                _fill(res, status, header_bytes, body)
+                res.latency = time.perf_counter() - t0
+                results.append(res)
+                answered += 1
+                if closing:
+                    break
+        except (OSError, ValueError) as e:
+            if answered == 0:
+                # без единого ответа повтор не поможет
+                for path in chunk:
+                    res = Result(path)
+                    res.timeout = isinstance(e, TimeoutError)
+                    res.error = "client timeout" if res.timeout else f"{type(e).__name__}: {e}"
+                    res.latency = time.perf_counter() - t0
+                    results.append(res)
+                answered = len(chunk)
+        if answered < len(chunk):
+            # сервер закрыл соединение (KEEPALIVE_MAX_REQUESTS): остаток — по новому
+            todo = chunk[answered:] + todo
+            fp.close()
+            sock.close()
+            sock = fp = None
+    if sock is not None:
+        fp.close()
+        sock.close()
+    return results, connections
+
+
+def run_load(host: str, port: int, plan: list[tuple[float, str]], concurrency: int, timeout: float,
+             keepalive: bool = False) -> tuple[list[Result], float, int]:
+    """Открытая модель: запросы уходят по расписанию, не дожидаясь ответов (до concurrency одновременно)."""
+    pending: queue.Queue = queue.Queue()
+    results: list[Result] = []
+    lock = threading.Lock()
+    connections = [0]
+
+    def worker():
+        # keep-alive: одно соединение на поток, HTTPConnection сам открывает новое после закрытия
+        conn = http.client.HTTPConnection(host, port, timeout=timeout) if keepalive else None
+        while True:
+            path = pending.get()
+            if path is None:
+                if conn is not None:
+                    conn.close()
+                return
+            fresh = conn is None or conn.sock is None
+            res = _request(host, port, path, timeout, conn)
+            with lock:
+                results.append(res)
+                connections[0] += fresh
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, concurrency))]
+    for t in threads:
+        t.start()
+    start = time.perf_counter()
+    for offset, path in plan:
+        delay = start + offset - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        pending.put(path)
+    for _ in threads:
+        pending.put(None)
+    for t in threads:
+        t.join()
+    return results, time.perf_counter() - start, connections[0]
+
+
+def run_pipeline(host: str, port: int, plan: list[tuple[float, str]], concurrency: int, depth: int,
+                 timeout: float) -> tuple[list[Result], float, int]:
+    """Закрытая модель: расписание не соблюдается, concurrency сокетов гонят запросы конвейером."""
+    paths = [path for _, path in plan]
+    shares = [paths[i::max(1, concurrency)] for i in range(max(1, concurrency))]
+    results: list[Result] = []
+    connections = [0]
+    lock = threading.Lock()
+
+    def worker(share: list[str]):
+        res, conns = _pipeline(host, port, share, depth, timeout)
+        with lock:
+            results.extend(res)
+            connections[0] += conns
+
+    threads = [threading.Thread(target=worker, args=(share,), daemon=True) for share in shares if share]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, time.perf_counter() - start, connections[0]
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(q / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[idx]
+
+
+def summarize(results: list[Result], elapsed: float, connections: int = 0) -> dict:
+    def block(items: list[Result]) -> dict:
+        lat = sorted(r.latency * 1000.0 for r in items)
+        n = len(items)
+        return {
+            "requests": n,
+            "throughput_rps": round(n / elapsed, 2) if elapsed > 0 else 0.0,
+            "p50_ms": round(_percentile(lat, 50), 2),
+            "p95_ms": round(_percentile(lat, 95), 2),
+            "p99_ms": round(_percentile(lat, 99), 2),
+            "max_ms": round(lat[-1], 2) if lat else 0.0,
+            "error_rate": round(sum(1 for r in items if not r.ok and not r.timeout) / n, 4) if n else 0.0,
+            "timeout_rate": round(sum(1 for r in items if r.timeout) / n, 4) if n else 0.0,
+            "bytes_sent": sum(r.sent for r in items),
+            "bytes_received": sum(r.received for r in items),
+        }
+
+    by_endpoint: dict[str, list[Result]] = {}
+    for r in results:
+        by_endpoint.setdefault(urlparse(r.path).path, []).append(r)
+    errors: dict[str, int] = {}
+    for r in results:
+        if r.error:
+            errors[r.error] = errors.get(r.error, 0) + 1
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "connections": connections,
+        "total": block(results),
+        "endpoints": {k: block(v) for k, v in sorted(by_endpoint.items())},
+        "errors": dict(sorted(errors.items(), key=lambda kv: -kv[1])[:10]),
+    }
+
+
+def print_summary(summary: dict) -> None:
+    def line(name: str, b: dict) -> str:
+        return (f"{name:8s} {b['requests']:6d} req  {b['throughput_rps']:8.2f} req/s  "
+                f"p50 {b['p50_ms']:8.1f}  p95 {b['p95_ms']:8.1f}  p99 {b['p99_ms']:8.1f} ms  "
+                f"err {b['error_rate']:6.2%}  timeout {b['timeout_rate']:6.2%}  "
+                f"{b['bytes_sent'] / 1024:.0f} KiB out / {b['bytes_received'] / 1024:.0f} KiB in")
+    print(line("total", summary["total"]))
+    print(f"{'':8s} {summary['connections']} TCP connections")
+    for name, b in summary["endpoints"].items():
+        print(line(name, b))
+    for msg, count in summary["errors"].items():
+        print(f"  {count:5d} × {msg}")
+
+#endregion
+
+
+def _run(args, entries: list[dict]) -> int:
+    plan = schedule(entries, args.requests, args.rate, args.speed)
+    proc: Optional[subprocess.Popen] = None
+    if args.url:
+        parsed = urlparse(args.url)
+        host, port = parsed.hostname or "127.0.0.1", parsed.port or 80
+    else:
+        proc, port = start_local(session_materials(entries), args.stall_ms, args.core)
+        host = "127.0.0.1"
+    try:
+        if args.pipeline > 0:
+            results, elapsed, connections = run_pipeline(host, port, plan, args.concurrency, args.pipeline,
+                                                         args.timeout)
+        else:
+            results, elapsed, connections = run_load(host, port, plan, args.concurrency, args.timeout,
+                                                     args.keepalive)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=5)
+    summary = summarize(results, elapsed, connections)
+    summary["config"] = {"concurrency": args.concurrency, "rate": args.rate, "speed": args.speed,
+                         "stall_ms": args.stall_ms, "url": args.url or "local",
+                         "keepalive": args.keepalive, "pipeline": args.pipeline}
+    print_summary(summary)
+    if args.json:
+        args.json.write_text(json.dumps(summary, indent=2))
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def load_options(p):
+        p.add_argument("--url", help="внешний сервер, например http://127.0.0.1:5050; без него — локальный на fake_bpy")
+        p.add_argument("--concurrency", type=int, default=4)
+        p.add_argument("--rate", type=float, default=0.0, help="запросов в секунду; 0 — темп записи (--speed)")
+        p.add_argument("--speed", type=float, default=1.0, help="ускорение записанного темпа")
+        p.add_argument("--requests", type=int, default=0, help="сколько запросов; 0 — вся сессия один раз")
+        p.add_argument("--timeout", type=float, default=10.0, help="таймаут клиента, с")
+        p.add_argument("--stall-ms", type=float, default=0.0, help="занятость главного потока на задачу (локальный сервер)")
+        p.add_argument("--keepalive", action="store_true", help="одно постоянное соединение на поток")
+        p.add_argument("--pipeline", type=int, default=0,
+                       help="конвейер: столько запросов подряд в сокет до чтения ответов; 0 — выкл.")
+        p.add_argument("--core", choices=("threading", "asyncio"), default="threading",
+                       help="ядро локального сервера")
+        p.add_argument("--json", type=Path, help="записать отчёт в JSON")
+
+    p_replay = sub.add_parser("replay", help="повторить записанную сессию")
+    p_replay.add_argument("session", type=Path)
+    load_options(p_replay)
+
+    p_synth = sub.add_parser("synth", help="синтетический поток запросов")
+    p_synth.add_argument("--nodes", type=int, default=500)
+    p_synth.add_argument("--materials", type=int, default=4)
+    p_synth.add_argument("--batch-ratio", type=float, default=0.0, help="доля запросов /batch")
+    load_options(p_synth)
+
+    p_serve = sub.add_parser("serve", help="только сервер на fake_bpy")
+    p_serve.add_argument("--port", type=int, default=5055)
+    p_serve.add_argument("--session", type=Path)
+    p_serve.add_argument("--nodes", type=int, default=500)
+    p_serve.add_argument("--stall-ms", type=float, default=0.0)
+    p_serve.add_argument("--materials-json", help=argparse.SUPPRESS)
+    p_serve.add_argument("--core", choices=("threading", "asyncio"), default="threading", help="ядро сервера")
+    p_serve.add_argument("--mutate-ms", type=float, default=0.0,
+                         help="менять материалы и звать depsgraph_update_post каждые N мс; 0 — выкл.")
+
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        if args.materials_json:
+            materials = json.loads(args.materials_json)
+        elif args.session:
+            materials = session_materials(load_session(args.session))
+        else:
+            materials = {"Bench": args.nodes}
+        serve(args.port, materials, args.stall_ms, core=args.core, mutate_ms=args.mutate_ms)
+        return 0
+    if args.command == "replay":
+        entries = load_session(args.session)
+    else:
+        if args.rate <= 0:
+            args.rate = 1000.0
+        names = [f"Bench_{idx}" for idx in range(max(1, args.materials))]
+        entries = synthetic_entries(names, args.nodes, args.batch_ratio)
+        args.requests = args.requests or 100
+    return _run(args, entries)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
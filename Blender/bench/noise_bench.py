@@ -0,0 +1,152 @@
+# SPDX-FileCopyrightText: 2025 D.Jorkin
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Сверка и замер NumPy-шума (gls_blender_exp/noise.py) вне Blender.
+
+    python Blender/bench/noise_bench.py [--points 1000000] [--json out.json]
+
+Сначала сверяет хеш с эталонными значениями и векторные фракталы с построчным
+переносом шейдера (fractal_scalar), затем меряет скорость на N точках.
+Код возвращает 1, если сверка не прошла.
+"""
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+_NOISE_PATH = Path(__file__).resolve().parents[1] / "addons" / "gls_blender_exp" / "noise.py"
+
+
+def load_noise():
+    # noise.py не зависит от bpy, грузим его напрямую, минуя __init__ аддона
+    spec = importlib.util.spec_from_file_location("gls_noise", _NOISE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)  # type: ignore[union-attr]
+    return module
+
+
+# hash_uint*/hash_int* из blender_hash.gdshaderinc
+REFERENCE_HASHES = [
+    ((0,), 2501500005),
+    ((1,), 1255655072),
+    ((-1,), 1116397369),
+    ((0, 0), 3695015161),
+    ((1, 2), 272092061),
+    ((-5, 7), 37125420),
+    ((0, 0, 0), 2624515579),
+    ((1, 2, 3), 3100736010),
+    ((-3, 4, -5), 3741279303),
+    ((0, 0, 0, 0), 479202252),
+    ((1, 2, 3, 4), 92593857),
+    ((-1, -2, -3, -4), 1120939713),
+]
+
+# (fractal_type, detail, roughness, lacunarity, offset, gain)
+PARITY_CASES = [
+    (3, 2.0, 0.5, 2.0, 0.0, 1.0),
+    (3, 4.7, 0.6, 2.3, 0.0, 1.0),
+    (0, 3.5, 0.5, 2.0, 0.0, 1.0),
+    (1, 5.0, 0.5, 2.0, 1.0, 2.0),
+    (2, 4.3, 0.5, 2.0, 0.7, 1.5),
+    (4, 3.6, 0.5, 2.0, 0.4, 1.0),
+    (4, 0.0, 0.5, 2.0, 0.4, 1.0),
+]
+
+TOLERANCE = 1e-9
+
+
+def check_parity(noise, samples: int = 64) -> list[str]:
+    failures: list[str] = []
+    for keys, expected in REFERENCE_HASHES:
+        got = int(noise.hash_int(*keys)[0])
+        if got != expected or noise.hash_uint_scalar(*keys) != expected:
+            failures.append(f"hash{keys}: {got} != {expected}")
+
+    rng = np.random.default_rng(7)
+    for dims in (1, 2, 3, 4):
+        pts = (rng.random((samples, dims)) - 0.5) * 40.0
+        got = noise.snoise(pts)
+        ref = np.array([noise.snoise_scalar(list(p)) for p in pts])
+        err = float(np.abs(got - ref).max())
+        if err > TOLERANCE:
+            failures.append(f"snoise {dims}D: max err {err:.3g}")
+        for ftype, detail, rough, lac, offset, gain in PARITY_CASES:
+            got = noise.fractal(ftype, pts, detail, rough, lac, offset, gain, True)
+            ref = np.array([noise.fractal_scalar(ftype, list(p), detail, rough, lac, offset, gain, True) for p in pts])
+            err = float(np.abs(got - ref).max())
+            if err > TOLERANCE:
+                name = noise.FRACTAL_TYPES[ftype]
+                failures.append(f"{name} {dims}D detail={detail}: max err {err:.3g}")
+
+    # detail как массив: каждая точка со своим числом октав
+    pts = (rng.random((samples, 3)) - 0.5) * 40.0
+    details = rng.random(samples) * 6.0
+    for ftype in range(5):
+        got = noise.fractal(ftype, pts, details, 0.5, 2.0, 0.5, 1.2, True)
+        ref = np.array([noise.fractal_scalar(ftype, list(p), float(d), 0.5, 2.0, 0.5, 1.2, True)
+                        for p, d in zip(pts, details)])
+        err = float(np.abs(got - ref).max())
+        if err > TOLERANCE:
+            failures.append(f"{noise.FRACTAL_TYPES[ftype]} per-point detail: max err {err:.3g}")
+    return failures
+
+
+def _timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run_benchmark(noise, points: int, repeat: int = 3) -> dict:
+    rng = np.random.default_rng(0)
+    results: dict = {"points": points}
+    for dims in (1, 2, 3, 4):
+        pts = (rng.random((points, dims)) - 0.5) * 100.0
+        ip = np.floor(pts).astype(np.int64)
+        keys = [ip[:, k] for k in range(dims)]
+        results[f"hash_{dims}d"] = _timed(lambda: noise.hash_int(*keys), repeat)
+        results[f"perlin_{dims}d"] = _timed(lambda: noise.perlin(pts), repeat)
+        for ftype, name in enumerate(noise.FRACTAL_TYPES):
+            results[f"{name.lower()}_{dims}d_detail2"] = _timed(
+                lambda: noise.fractal(ftype, pts, 2.0, 0.5, 2.0, 0.5, 1.0, True), repeat)
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-parity", action="store_true")
+    parser.add_argument("--json", type=Path, help="записать результаты в JSON")
+    args = parser.parse_args(argv)
+
+    noise = load_noise()
+    failures: list[str] = []
+    if not args.skip_parity:
+        failures = check_parity(noise)
+        print("parity: ok" if not failures else "parity: FAILED")
+        for f in failures:
+            print("  " + f)
+
+    results = run_benchmark(noise, args.points, args.repeat)
+    for key, seconds in results.items():
+        if key == "points":
+            continue
+        print(f"{key:40s} {seconds * 1000.0:9.1f} ms  {args.points / seconds / 1e6:7.2f} Msamples/s")
+    if args.json:
+        args.json.write_text(json.dumps({"results": results, "parity_failures": failures}, indent=2))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+# SPDX-FileCopyrightText: 2025 D.Jorkin
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Подписчики WebSocket /subscribe у asyncio-ядра: рассылка изменений многим клиентам.
+
+    python Blender/bench/subscribers.py --clients 32 --slow 2 --seconds 10 --mutate-ms 200
+    python Blender/bench/subscribers.py --url ws://127.0.0.1:5050/subscribe --clients 8
+
+Без --url поднимает linkload.py serve --core asyncio на fake_bpy, который правит
+материалы каждые --mutate-ms. Медленные клиенты подписываются и больше не читают
+сокет: сервер должен их отключить, не задерживая остальных. Отчёт: события и
+байты на быстрого клиента, разброс прихода одной ревизии между клиентами,
+отключённые медленные и метрики gsl_ws_* сервера.
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+import urllib.request
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlparse
+
+_BENCH_DIR = Path(__file__).resolve().parent
+
+
+def _connect(host: str, port: int, path: str, rcvbuf: int = 0) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if rcvbuf:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+    sock.connect((host, port))
+    key = base64.b64encode(os.urandom(16)).decode()
+    sock.sendall((f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nUpgrade: websocket\r\n"
+                  f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+    head = b""
+    while b"\r\n\r\n" not in head:
+        chunk = sock.recv(1)
+        if not chunk:
+            raise ConnectionError("closed during handshake")
+        head += chunk
+    if not head.startswith(b"HTTP/1.1 101"):
+        raise ConnectionError(head.split(b"\r\n", 1)[0].decode())
+    return sock
+
+
+def _send_text(sock: socket.socket, text: str) -> None:
+    data = text.encode()
+    mask = os.urandom(4)
+    if len(data) < 126:
+        head = struct.pack("!BB", 0x81, 0x80 | len(data))
+    else:
+        head = struct.pack("!BBH", 0x81, 0x80 | 126, len(data))
+    sock.sendall(head + mask + bytes(b ^ mask[i % 4] for i, b in enumerate(data)))
+
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("closed")
+        buf += chunk
+    return bytes(buf)
+
+
+def _recv_frame(sock: socket.socket) -> tuple[int, bytes]:
+    b1, b2 = _recv_exact(sock, 2)
+    length = b2 & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", _recv_exact(sock, 2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", _recv_exact(sock, 8))[0]
+    return b1 & 0x0F, _recv_exact(sock, length)
+
+
+class Client:
+    def __init__(self, idx: int, slow: bool):
+        self.idx, self.slow = idx, slow
+        self.events = 0
+        self.bytes = 0
+        self.arrivals: dict[tuple[str, str], float] = {}  # (материал, ревизия) → время прихода
+        self.disconnected: Optional[str] = None
+
+    def run(self, host: str, port: int, path: str, subscribe: dict, until: float) -> None:
+        try:
+            sock = _connect(host, port, path, rcvbuf=4096 if self.slow else 0)
+        except OSError as e:
+            self.disconnected = f"connect: {e}"
+            return
+        try:
+            _send_text(sock, json.dumps(subscribe))
+            if self.slow:
+                # не читает: буфер сервера растёт, пока тот не сдастся; разрыв видно по ошибке записи
+                while time.monotonic() < until:
+                    time.sleep(0.5)
+                    sock.sendall(struct.pack("!BB", 0x89, 0x80) + os.urandom(4))
+                return
+            sock.settimeout(0.5)
+            while time.monotonic() < until:
+                try:
+                    opcode, data = _recv_frame(sock)
+                except socket.timeout:
+                    continue
+                if opcode == 0x8:
+                    self.disconnected = "close frame"
+                    return
+                if opcode != 0x1:
+                    continue
+                self.bytes += len(data)
+                event = json.loads(data)
+                if event.get("event") == "changed":
+                    self.events += 1
+                    self.arrivals[(event["material"], event["revision"])] = time.perf_counter()
+        except (ConnectionError, OSError) as e:
+            self.disconnected = self.disconnected or str(e) or type(e).__name__
+        finally:
+            sock.close()
+
+
+def _ws_metrics(host: str, port: int) -> list[str]:
+    try:
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=5) as resp:
+            text = resp.read().decode()
+    except OSError:
+        return []
+    return [line for line in text.splitlines()
+            if line.startswith(("gsl_ws_", "gsl_dispatch_queue")) and "_bucket" not in line]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="ws://host:port/subscribe; без него — локальный сервер на fake_bpy")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--slow", type=int, default=0, help="сколько из них не читают сокет")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--materials", type=int, default=4)
+    parser.add_argument("--nodes", type=int, default=200)
+    parser.add_argument("--mutate-ms", type=float, default=200.0)
+    parser.add_argument("--no-payload", action="store_true", help="только ревизии, без payload")
+    parser.add_argument("--json", type=Path, help="записать отчёт в JSON")
+    args = parser.parse_args(argv)
+
+    proc = None
+    if args.url:
+        parsed = urlparse(args.url)
+        host, port, path = parsed.hostname or "127.0.0.1", parsed.port or 5050, parsed.path or "/subscribe"
+    else:
+        sys.path.insert(0, str(_BENCH_DIR))
+        import linkload
+        materials = {f"Bench_{idx}": args.nodes for idx in range(max(1, args.materials))}
+        proc, port = linkload.start_local(materials, 0.0, core="asyncio", mutate_ms=args.mutate_ms)
+        host, path = "127.0.0.1", "/subscribe"
+
+    try:
+        subscribe = {"op": "subscribe", "materials": "*", "payload": not args.no_payload}
+        clients = [Client(idx, idx < args.slow) for idx in range(max(1, args.clients))]
+        until = time.monotonic() + args.seconds
+        threads = [threading.Thread(target=c.run, args=(host, port, path, subscribe, until), daemon=True)
+                   for c in clients]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(args.seconds + 10.0)
+        ws = _ws_metrics(host, port)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=5)
+
+    fast = [c for c in clients if not c.slow]
+    slow = [c for c in clients if c.slow]
+    # одна и та же ревизия у всех быстрых: от первого получателя до последнего
+    spreads = []
+    for key in set().union(*(c.arrivals for c in fast)) if fast else ():
+        times = [c.arrivals[key] for c in fast if key in c.arrivals]
+        if len(times) == len(fast) and len(times) > 1:
+            spreads.append((max(times) - min(times)) * 1000.0)
+    spreads.sort()
+    summary = {
+        "clients": len(clients), "slow": len(slow), "seconds": args.seconds,
+        "events_per_client": sum(c.events for c in fast) / max(1, len(fast)),
+        "kib_per_client": sum(c.bytes for c in fast) / max(1, len(fast)) / 1024.0,
+        "fast_disconnected": sum(1 for c in fast if c.disconnected),
+        "slow_disconnected": sum(1 for c in slow if c.disconnected),
+        "spread_p50_ms": spreads[len(spreads) // 2] if spreads else 0.0,
+        "spread_max_ms": spreads[-1] if spreads else 0.0,
+        "server": ws,
+    }
+    for key, value in summary.items():
+        if key == "server":
+            for line in value:
+                print(f"  {line}")
+        else:
+            print(f"{key:20s} {value:.2f}" if isinstance(value, float) else f"{key:20s} {value}")
+    if args.json:
+        args.json.write_text(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+# SPDX-FileCopyrightText: 2025 D.Jorkin
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Синтетические деревья материалов для бенчмарков (от 10 до 20000 узлов).
+
+Смесь типов узлов взята с реальных материалов: много Math/Mix, заметная доля
+текстур, Color Ramp и векторной математики, немного Bump и Normal Map. Граф —
+DAG: каждый узел берёт входы от более ранних, со смещением к недавним (цепочки,
+а не «звезда»), а в конце всё сводится в Principled BSDF → Material Output.
+Генерация детерминирована по seed.
+"""
+from __future__ import annotations
+
+import os
+import random
+import tempfile
+from typing import Optional
+
+import fake_bpy
+
+# bl_idname → доля среди узлов
+NODE_MIX: dict[str, float] = {
+    "ShaderNodeMath": 0.20,
+    "ShaderNodeMix": 0.14,
+    "ShaderNodeTexImage": 0.09,
+    "ShaderNodeTexNoise": 0.07,
+    "ShaderNodeValToRGB": 0.07,
+    "ShaderNodeVectorMath": 0.08,
+    "ShaderNodeMapRange": 0.06,
+    "ShaderNodeMapping": 0.05,
+    "ShaderNodeSeparateColor": 0.04,
+    "ShaderNodeCombineColor": 0.03,
+    "ShaderNodeSeparateXYZ": 0.03,
+    "ShaderNodeCombineXYZ": 0.03,
+    "ShaderNodeTexWhiteNoise": 0.02,
+    "ShaderNodeBump": 0.02,
+    "ShaderNodeNormalMap": 0.02,
+    "ShaderNodeTexCoord": 0.05,
+}
+
+_MATH_OPS = ["ADD", "SUBTRACT", "MULTIPLY", "DIVIDE", "POWER", "MINIMUM", "MAXIMUM", "MULTIPLY_ADD", "SINE", "FRACT"]
+_THREE_INPUT_MATH = {"MULTIPLY_ADD"}
+_UNARY_MATH = {"SINE", "FRACT"}
+_VMATH_OPS = ["ADD", "SUBTRACT", "MULTIPLY", "SCALE", "DOT_PRODUCT", "NORMALIZE", "LENGTH", "CROSS_PRODUCT"]
+_BLEND_TYPES = ["MIX", "MULTIPLY", "ADD", "OVERLAY", "SCREEN", "LINEAR_LIGHT"]
+_NOISE_TYPES = ["FBM", "MULTIFRACTAL", "RIDGED_MULTIFRACTAL", "HETERO_TERRAIN", "HYBRID_MULTIFRACTAL"]
+
+# Доля входов, запитанных связью, и насколько далеко назад смотрит источник
+LINK_PROBABILITY = 0.55
+LOCALITY = 24
+
+SIZES = (10, 100, 1000, 5000, 20000)
+
+
+def _image_files(count: int, directory: str) -> list[str]:
+    # небольшие настоящие файлы: хеширование содержимого (textures.register_file) тоже в замере
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for idx in range(count):
+        path = os.path.join(directory, f"bench_{idx:03d}.png")
+        if not os.path.exists(path):
+            with open(path, "wb") as fh:
+                fh.write(bytes((idx + k) % 256 for k in range(64 * 1024)))
+        paths.append(path)
+    return paths
+
+
+def _configure(node, rng: random.Random, images: list) -> None:
+    bl = node.bl_idname
+    if bl == "ShaderNodeMath":
+        node.operation = rng.choice(_MATH_OPS)
+        node.inputs[2].enabled = node.operation in _THREE_INPUT_MATH
+        node.inputs[1].enabled = node.operation not in _UNARY_MATH
+        node.use_clamp = rng.random() < 0.2
+    elif bl == "ShaderNodeVectorMath":
+        node.operation = rng.choice(_VMATH_OPS)
+        node.inputs[3].enabled = node.operation == "SCALE"
+        node.inputs[1].enabled = node.operation not in ("NORMALIZE", "LENGTH", "SCALE")
+        node.outputs[1].enabled = node.operation in ("DOT_PRODUCT", "LENGTH")
+        node.outputs[0].enabled = not node.outputs[1].enabled
+    elif bl == "ShaderNodeMix":
+        node.blend_type = rng.choice(_BLEND_TYPES)
+    elif bl == "ShaderNodeTexNoise":
+        node.noise_type = rng.choice(_NOISE_TYPES)
+        node.inputs[3].default_value = float(rng.choice((1.0, 2.0, 4.0, 8.0)))
+        node.inputs[6].enabled = node.noise_type != "FBM"
+        node.inputs[7].enabled = node.noise_type in ("RIDGED_MULTIFRACTAL", "HYBRID_MULTIFRACTAL")
+    elif bl == "ShaderNodeTexImage":
+        node.image = rng.choice(images)
+        node.interpolation = rng.choice(("Linear", "Linear", "Closest", "Cubic"))
+    elif bl == "ShaderNodeValToRGB":
+        ramp = node.color_ramp
+        for _ in range(rng.randint(0, 4)):
+            el = ramp.elements.new(rng.random())
+            el.color = fake_bpy.Color((rng.random(), rng.random(), rng.random(), 1.0))
+        ramp.interpolation = rng.choice(("LINEAR", "LINEAR", "EASE", "CONSTANT"))
+    elif bl == "ShaderNodeMapRange":
+        node.interpolation_type = rng.choice(("LINEAR", "LINEAR", "SMOOTHSTEP", "STEPPED"))
+        node.inputs[5].enabled = node.interpolation_type == "STEPPED"
+
+
+def _pick_source(rng: random.Random, created: list, socket_type: str):
+    # недавние узлы вероятнее: так получаются цепочки, как в реальных материалах
+    for _ in range(4):
+        idx = len(created) - 1 - min(int(rng.expovariate(1.0 / LOCALITY)), len(created) - 1)
+        node = created[idx]
+        outs = [s for s in node.outputs if s.enabled and s.type != "SHADER"]
+        if not outs:
+            continue
+        # предпочитаем совпадающий тип; иначе Blender сам приведёт значение
+        same = [s for s in outs if s.type == socket_type]
+        return rng.choice(same or outs)
+    return None
+
+
+def generate(node_count: int, seed: int = 0, name: Optional[str] = None, image_count: int = 16,
+             image_dir: Optional[str] = None):
+    """Материал примерно из node_count узлов (включая BSDF и Output) в fake bpy."""
+    bpy = fake_bpy.install()
+    rng = random.Random(seed)
+    mat = bpy.data.materials.new(name or f"Bench_{node_count}")
+    tree = mat.node_tree
+    paths = _image_files(image_count, image_dir or os.path.join(tempfile.gettempdir(), "gsl_bench_images"))
+    images = []
+    for idx, path in enumerate(paths):
+        img = bpy.data.images.new(f"bench_{idx:03d}.png", 1024, 1024, filepath=path,
+                                  colorspace="Non-Color" if idx % 3 else "sRGB")
+        images.append(img)
+
+    kinds = list(NODE_MIX)
+    weights = [NODE_MIX[k] for k in kinds]
+    created = [tree.nodes.new("ShaderNodeTexCoord")]
+    for _ in range(max(0, node_count - 3)):
+        node = tree.nodes.new(rng.choices(kinds, weights)[0])
+        _configure(node, rng, images)
+        for sock in node.inputs:
+            if sock.enabled and sock.type != "SHADER" and rng.random() < LINK_PROBABILITY:
+                src = _pick_source(rng, created, sock.type)
+                if src is not None:
+                    tree.links.new(src, sock)
+        created.append(node)
+
+    bsdf = tree.nodes.new("ShaderNodeBsdfPrincipled")
+    out = tree.nodes.new("ShaderNodeOutputMaterial")
+    for idx in (0, 1, 2, 5):
+        src = _pick_source(rng, created, bsdf.inputs[idx].type)
+        if src is not None:
+            tree.links.new(src, bsdf.inputs[idx])
+    tree.links.new(bsdf.outputs[0], out.inputs[0])
+    return mat
@@ -0,0 +1,133 @@
+# SPDX-FileCopyrightText: 2025 D.Jorkin
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+@tool
+class_name BlenderConnection
+
+# Persistent HTTP/1.1 connection to one Blender instance. Requests are queued and sent one
+# after another over the same socket instead of a new HTTPRequest (and TCP handshake) per call.
+# Driven by poll() from the editor's _process; callbacks get HTTPRequest.request_completed arguments.
+
+# Blender closes idle connections after KEEPALIVE_TIMEOUT (5 s); close ours a bit earlier
+const IDLE_CLOSE_MS := 4000
+
+var host: String
+var port: int
+var client: HTTPClient = HTTPClient.new()
+var queue: Array[Dictionary] = []  # {path, headers, callback}
+var current: Dictionary = {}
+var body := PackedByteArray()
+var sent: bool = false
+# the request went out over a connection that served earlier ones: if it dies before any
+# response, Blender most likely closed the idle socket, so the request is resent once
+var reused: bool = false
+var served: int = 0
+var idle_since_ms: int = 0
+
+
+func _init(p_host: String, p_port: int) -> void:
+	host = p_host
+	port = p_port
+
+
+func request(path: String, headers: PackedStringArray, callback: Callable) -> void:
+	queue.append({"path": path, "headers": headers, "callback": callback, "retried": false})
+
+
+func is_busy() -> bool:
+	return not current.is_empty() or not queue.is_empty()
+
+
+# Drops queued requests without calling back: used when the editor shuts the listener down
+func close() -> void:
+	client.close()
+	served = 0
+	sent = false
+	current = {}
+	queue.clear()
+
+
+func poll() -> void:
+	if not is_busy():
+		if served > 0 and Time.get_ticks_msec() - idle_since_ms > IDLE_CLOSE_MS:
+			client.close()
+			served = 0
+		return
+	client.poll()
+	match client.get_status():
+		HTTPClient.STATUS_DISCONNECTED:
+			if sent:
+				_fail(HTTPRequest.RESULT_CONNECTION_ERROR)
+				return
+			served = 0
+			if client.connect_to_host(host, port) != OK:
+				_fail(HTTPRequest.RESULT_CANT_CONNECT)
+		HTTPClient.STATUS_CONNECTED:
+			if sent:
+				_complete()  # response without a body (Content-Length: 0)
+			else:
+				_send_next()
+		HTTPClient.STATUS_BODY:
+			_read_body()
+		HTTPClient.STATUS_CANT_RESOLVE:
+			_fail(HTTPRequest.RESULT_CANT_RESOLVE)
+		HTTPClient.STATUS_CANT_CONNECT:
+			_fail(HTTPRequest.RESULT_CANT_CONNECT)
+		HTTPClient.STATUS_CONNECTION_ERROR, HTTPClient.STATUS_TLS_HANDSHAKE_ERROR:
+			_fail(HTTPRequest.RESULT_CONNECTION_ERROR)
+		_:
+			pass  # resolving, connecting, requesting
+
+
+func _send_next() -> void:
+	if current.is_empty():
+		current = queue.pop_front()
+	current.erase("code")
+	current.erase("headers")
+	body.clear()
+	reused = served > 0
+	if client.request(HTTPClient.METHOD_GET, current["path"], current["headers"]) != OK:
+		_fail(HTTPRequest.RESULT_CONNECTION_ERROR)
+		return
+	sent = true
+
+
+func _read_body() -> void:
+	if not current.has("code"):
+		current["code"] = client.get_response_code()
+		current["headers"] = client.get_response_headers()
+	while client.get_status() == HTTPClient.STATUS_BODY:
+		var chunk := client.read_response_body_chunk()
+		if chunk.is_empty():
+			return
+		body.append_array(chunk)
+		client.poll()
+	_complete()
+
+
+func _complete() -> void:
+	var entry := current
+	var code: int = entry.get("code", client.get_response_code())
+	var headers: PackedStringArray = entry.get("headers", client.get_response_headers())
+	var data := body
+	current = {}
+	body = PackedByteArray()
+	sent = false
+	served += 1
+	idle_since_ms = Time.get_ticks_msec()
+	entry["callback"].call(HTTPRequest.RESULT_SUCCESS, code, headers, data)
+
+
+func _fail(result: int) -> void:
+	client.close()
+	var entry := current
+	var retry := sent and reused and not entry.get("retried", false)
+	sent = false
+	served = 0
+	if entry.is_empty():
+		entry = queue.pop_front()
+	elif retry:
+		entry["retried"] = true
+		return  # stays current, goes out again over a fresh connection
+	current = {}
+	entry["callback"].call(result, 0, PackedStringArray(), PackedByteArray())
@@ -15,6 +15,8 @@ var function_blocks := []
 var global_blocks := []
 var defines := {} 
 var uniform_resources := {}
+# uniform → {"hash", "file", "bytes"} для текстур с хешем содержимого от Blender
+var texture_sources := {}
 var uniform_object_resources := {}
 
 func shader_type(type: String) -> void:
@@ -2,6 +2,8 @@ extends RefCounted
 class_name GslLogger
 
 var debug_logging: bool = false
+# trace id → {stage: ms}: one material import from the Blender request to the built chain
+var traces: Dictionary = {}
 
 static var instance: GslLogger
 
@@ -56,3 +58,37 @@ func log_debug(message: String) -> void:
 
 func log_success(message: String) -> void:
 	log_(message, LogLevel.SUCCESS)
+
+#region Trace
+
+func trace_add(trace_id: String, stage: String, ms: float) -> void:
+	if trace_id.is_empty():
+		return
+	if not traces.has(trace_id):
+		traces[trace_id] = {}
+	var stages: Dictionary = traces[trace_id]
+	stages[stage] = float(stages.get(stage, 0.0)) + ms
+
+# Server-Timing: "queue;dur=0.08, gather;dur=22.37" → blender.queue, blender.gather
+func trace_add_server_timing(trace_id: String, header: String) -> void:
+	for part in header.split(",", false):
+		var fields := part.strip_edges().split(";")
+		for field in fields.slice(1):
+			var kv := field.strip_edges().split("=")
+			if kv.size() == 2 and kv[0] == "dur":
+				trace_add(trace_id, "blender." + fields[0].strip_edges(), kv[1].to_float())
+
+func trace_get(trace_id: String, stage: String) -> float:
+	return float(traces.get(trace_id, {}).get(stage, 0.0))
+
+func trace_finish(trace_id: String) -> void:
+	if not traces.has(trace_id):
+		return
+	var stages: Dictionary = traces[trace_id]
+	traces.erase(trace_id)
+	var parts := PackedStringArray()
+	for stage in stages:
+		parts.append("%s %.1f" % [stage, stages[stage]])
+	log_info("Trace %s (ms): %s" % [trace_id, ", ".join(parts)])
+
+#endregion
@@ -42,16 +42,23 @@ func instantiate_modules(data: Dictionary) -> Dictionary:
 		if cls == null:
 			logger.log_warning("Blender node '%s' not supported" % node_type)
 			continue
+		# Exporter handler failed on this node: params fall back to socket defaults
+		if node_dict.has("error"):
+			logger.log_warning("Blender node '%s' exported with defaults: %s" % [node_dict.get("name", node_dict.get("id")), node_dict["error"]])
 		var module: ShaderModule = cls.new()
 		node_table[node_dict.get("id")] = module
 	return node_table
 
 func add_modules_to_mapper(node_table: Dictionary, data: Dictionary) -> void:
+	var sampler_slots := {}
 	for node_dict in data["nodes"]:
 		var id = node_dict.get("id")
 		if not node_table.has(id):
 			continue
 		var module: ShaderModule = node_table[id]
+		# Merkle hash of the node and its whole upstream subgraph (same hash → same generated code)
+		if node_dict.has("hash"):
+			module.set_meta("subtree_hash", str(node_dict["hash"]))
 		# Pass parameters
 		if node_dict.has("params") and typeof(node_dict["params"]) == TYPE_DICTIONARY:
 			for p in node_dict["params"]:
@@ -60,9 +67,27 @@ func add_modules_to_mapper(node_table: Dictionary, data: Dictionary) -> void:
 			# Special handling of texture paths for TextureImageModule
 			if module is TextureImageModule and node_dict.has("params"):
 				var params: Dictionary = node_dict["params"]
+				var uniform_name = module.get_prefixed_name("image_texture")
+				# Nodes sharing an image share one sampler uniform (params.sampler from the exporter)
+				if params.has("sampler"):
+					var slot := int(params["sampler"])
+					if sampler_slots.has(slot):
+						var tex_module: TextureImageModule = module
+						tex_module.shared_sampler = sampler_slots[slot]
+						Mapper_inst.add_module(module)
+						continue
+					sampler_slots[slot] = uniform_name
 				if params.has("image_path") and typeof(params["image_path"]) == TYPE_STRING:
-					var uniform_name = module.get_prefixed_name("image_texture")
 					Builder_inst.uniform_resources[uniform_name] = params["image_path"]
+				# Images packed into the .blend come with a content hash and no path
+				if params.has("image_hash"):
+					if not Builder_inst.uniform_resources.has(uniform_name):
+						Builder_inst.uniform_resources[uniform_name] = ""
+					Builder_inst.texture_sources[uniform_name] = {
+						"hash": str(params["image_hash"]),
+						"file": str(params.get("image_file", "")),
+						"bytes": int(params.get("image_bytes", -1)),
+					}
 			# Special handling for ColorRampModule: register GradientTexture2D
 			if module is ColorRampModule:
 				var crm: ColorRampModule = module
@@ -13,8 +13,12 @@ var logger: GslLogger = GslLogger.get_logger()
 var json_debug_enabled: bool = false
 
 func data_transfer(data: Dictionary) -> void:
+	var trace: String = str(data.get("trace", ""))
+	var build_start := Time.get_ticks_usec()
 	var Importer_inst := Importer.new()
 	var Builder_inst : ShaderBuilder = Importer_inst.build_chain(data)
+	logger.trace_add(trace, "build", (Time.get_ticks_usec() - build_start) / 1000.0)
+	logger.trace_finish(trace)
 	if Builder_inst:
 		builder_ready.emit(Builder_inst)
 	if json_debug_enabled:
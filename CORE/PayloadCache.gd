@@ -0,0 +1,124 @@
+# SPDX-FileCopyrightText: 2025 D.Jorkin
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+@tool
+class_name PayloadCache
+
+const MAX_ENTRIES := 8
+
+var payloads: Dictionary = {}            # revision -> full payload
+var material_revisions: Dictionary = {}  # material -> latest revision
+var order: Array[String] = []
+var logger: GslLogger = GslLogger.get_logger()
+
+
+func known_revisions() -> Array:
+	return material_revisions.values()
+
+
+func clear() -> void:
+	payloads.clear()
+	material_revisions.clear()
+	order.clear()
+
+
+func store(data: Dictionary) -> void:
+	var rev := str(data.get("revision", ""))
+	if rev.is_empty():
+		return
+	if not payloads.has(rev):
+		order.append(rev)
+	payloads[rev] = data
+	material_revisions[str(data.get("material", ""))] = rev
+	while order.size() > MAX_ENTRIES:
+		var old_rev: String = order.pop_front()
+		payloads.erase(old_rev)
+		for mat in material_revisions.keys():
+			if material_revisions[mat] == old_rev:
+				material_revisions.erase(mat)
+
+
+# Returns the full payload; an empty Dictionary means the delta base is unknown
+func resolve(data: Dictionary) -> Dictionary:
+	if not data.has("delta"):
+		store(data)
+		return data
+	var base_rev := str(data.get("base_revision", ""))
+	if not payloads.has(base_rev):
+		logger.log_warning("Unknown base revision %s, full payload required" % base_rev)
+		return {}
+	var full := apply_delta(payloads[base_rev], data["delta"])
+	full["material"] = data.get("material", full.get("material", ""))
+	full["revision"] = data.get("revision", "")
+	if data.has("stats"):
+		full["stats"] = data["stats"]
+	store(full)
+	var delta: Dictionary = data["delta"]
+	logger.log_debug("Delta %s → %s: +%d -%d ~%d nodes, +%d -%d links" % [
+		base_rev, full["revision"],
+		delta.get("nodes_added", []).size(), delta.get("nodes_removed", []).size(),
+		delta.get("nodes_modified", []).size(),
+		delta.get("links_added", []).size(), delta.get("links_removed", []).size(),
+	])
+	return full
+
+
+static func apply_delta(base: Dictionary, delta: Dictionary) -> Dictionary:
+	var removed := {}
+	for nid in delta.get("nodes_removed", []):
+		removed[str(nid)] = true
+	var modified := {}
+	for change in delta.get("nodes_modified", []):
+		if typeof(change) == TYPE_DICTIONARY:
+			modified[str(change.get("id"))] = change
+
+	var nodes: Array = []
+	for node in base.get("nodes", []):
+		var nid := str(node.get("id"))
+		if removed.has(nid):
+			continue
+		var copy: Dictionary = node.duplicate(true)
+		if modified.has(nid):
+			apply_node_change(copy, modified[nid])
+		nodes.append(copy)
+	for node in delta.get("nodes_added", []):
+		nodes.append(node)
+	# Keep the exporter's canonical node order (sorted by id)
+	nodes.sort_custom(func(a, b): return str(a.get("id")) < str(b.get("id")))
+
+	var dropped := {}
+	for l in delta.get("links_removed", []):
+		dropped[str(l)] = true
+	var links: Array = []
+	for l in base.get("links", []):
+		if not dropped.has(str(l)):
+			links.append(l)
+	links.append_array(delta.get("links_added", []))
+
+	var out := base.duplicate()
+	out["nodes"] = nodes
+	out["links"] = links
+	# Top-level reports (lod, baked, packed, samplers...) come whole when they changed
+	var fields: Dictionary = delta.get("fields", {})
+	for key in fields:
+		out[key] = fields[key]
+	for key in delta.get("fields_removed", []):
+		out.erase(key)
+	return out
+
+
+static func apply_node_change(node: Dictionary, change: Dictionary) -> void:
+	for key in change:
+		if key == "id" or key == "params" or key == "params_removed":
+			continue
+		node[key] = change[key]
+	var params: Dictionary = node.get("params", {})
+	for p in change.get("params_removed", []):
+		params.erase(p)
+	var changed: Dictionary = change.get("params", {})
+	for p in changed:
+		params[p] = changed[p]
+	if params.is_empty():
+		node.erase("params")
+	else:
+		node["params"] = params
@@ -5,7 +5,14 @@
 class_name ServerStatusListener
 
 
-const SERVER_URL := "http://127.0.0.1:5050/link"
+const SERVER_HOST := "127.0.0.1"
+# Blender takes the first free port from here up (config.PORT / PORT_RANGE)
+const DEFAULT_PORT := 5050
+const TRACE_HEADER := "X-GSL-Trace"
+# Pseudo-instance: material requests go to every known Blender in parallel
+const ALL_INSTANCES := "*"
+# Blender announces itself every 2 s; an instance silent for longer than this is dropped
+const INSTANCE_TTL_MS := 7000
 
 
 enum Status {
@@ -20,9 +27,18 @@ var udp_port: int = 6020
 var udp_bind_failed: bool = false
 var logger: GslLogger = GslLogger.get_logger()
 var current_status: Status = Status.DISCONNECTED
+var payload_cache: PayloadCache = PayloadCache.new()
+# instance id → {port, blend, material, pid, seen_ms}, from UDP announces and /instance
+var instances: Dictionary = {}
+var selected_instance: String = ""
+# material requests still in flight (several at once when pulling from all instances)
+var pending_requests: int = 0
+# port → BlenderConnection: one keep-alive connection per Blender instance
+var connections: Dictionary = {}
 
 signal server_status_changed(status: Status)
 signal material_data_received(data: Dictionary)
+signal instances_changed
 
 
 func set_status(status: Status) -> void:
@@ -60,25 +76,90 @@ static func get_status_message(status: Status) -> String:
 			return "Unknown status"
 
 
+#region Instances
+
+func selected_port() -> int:
+	return port_of(selected_instance)
+
+
+# Unknown id (nothing selected yet, or "all") falls back to the first known instance
+func port_of(instance_id: String) -> int:
+	if instances.has(instance_id):
+		return int(instances[instance_id]["port"])
+	for id in instances:
+		return int(instances[id]["port"])
+	return DEFAULT_PORT
+
+
+func select_instance(instance_id: String) -> void:
+	if selected_instance == instance_id:
+		return
+	selected_instance = instance_id
+	instances_changed.emit()
+
+
+func instance_labels() -> Dictionary:
+	var labels := {}
+	for id in instances:
+		var info: Dictionary = instances[id]
+		var blend := str(info.get("blend", "")).get_file()
+		var label := "%s :%d" % [blend if not blend.is_empty() else "(unsaved)", int(info.get("port", 0))]
+		if not str(info.get("material", "")).is_empty():
+			label += " · " + str(info["material"])
+		labels[id] = label
+	return labels
+
+
+func update_instance(info: Dictionary) -> void:
+	var id := str(info.get("instance", ""))
+	if id.is_empty():
+		return
+	var is_new := not instances.has(id)
+	var entry: Dictionary = instances.get(id, {})
+	var changed := is_new
+	for key in ["port", "blend", "material", "pid"]:
+		if info.has(key) and entry.get(key) != info[key]:
+			entry[key] = info[key]
+			changed = true
+	entry["seen_ms"] = Time.get_ticks_msec()
+	instances[id] = entry
+	if is_new:
+		logger.log_info("Blender instance on port %d: %s" % [int(entry.get("port", 0)), str(entry.get("blend", "")).get_file()])
+	if changed:
+		instances_changed.emit()
+
+
+func remove_instance(instance_id: String) -> void:
+	if instances.erase(instance_id):
+		instances_changed.emit()
+
+
+func expire_instances() -> void:
+	var now := Time.get_ticks_msec()
+	for id in instances.keys():
+		if now - int(instances[id]["seen_ms"]) > INSTANCE_TTL_MS:
+			remove_instance(id)
+
+#endregion
+
+
+func connection(port: int) -> BlenderConnection:
+	if not connections.has(port):
+		connections[port] = BlenderConnection.new(SERVER_HOST, port)
+	return connections[port]
+
+
+func poll_http() -> void:
+	for port in connections.keys():
+		connections[port].poll()
+
+
 func check_server() -> void:
 	set_status(Status.CHECKING_PORT)
-	var main_loop := Engine.get_main_loop()
-	if main_loop and main_loop is SceneTree:
-		var tree: SceneTree = main_loop
-		var http := HTTPRequest.new()
-		tree.root.add_child(http)
-		http.request_completed.connect(_on_status_request_completed.bind(http))
-		var err := http.request(SERVER_URL)
-		if err != OK:
-			set_status(Status.DISCONNECTED)
-			logger.log_warning("Failed to send status request (%s)" % err)
-			http.queue_free()
+	connection(selected_port()).request("/instance", PackedStringArray(), _on_status_request_completed)
 
 
-func _on_status_request_completed(result: int, response_code: int, headers: PackedStringArray, body: PackedByteArray, http: HTTPRequest) -> void:
-	if is_instance_valid(http):
-		http.queue_free()
-	
+func _on_status_request_completed(result: int, response_code: int, headers: PackedStringArray, body: PackedByteArray) -> void:
 	if result != HTTPRequest.RESULT_SUCCESS:
 		set_status(Status.DISCONNECTED)
 		logger.log_warning("Blender server is not available (result %d)" % result)
@@ -94,51 +175,96 @@ func _on_status_request_completed(result: int, response_code: int, headers: Pack
 		logger.log_error("Empty response from Blender server")
 		return
 	
+	var info = JSON.parse_string(body.get_string_from_utf8())
+	if typeof(info) == TYPE_DICTIONARY:
+		update_instance(info)
 	set_status(Status.CONNECTED)
 
 
-func request_material() -> void:
-	var main_loop := Engine.get_main_loop()
-	if not (main_loop and main_loop is SceneTree):
-		logger.log_error("SceneTree not found – request_material should be called from editor")
+func request_material(use_delta: bool = true, instance_id: String = "") -> void:
+	if instance_id.is_empty():
+		if selected_instance == ALL_INSTANCES:
+			request_material_all()
+			return
+		instance_id = selected_instance
+	# Trace id ties Blender's log line and Server-Timing to our own parse/build timings
+	var trace := "%08x%08x" % [randi(), randi()]
+	var path := "/link"
+	var revs := payload_cache.known_revisions()
+	if use_delta and not revs.is_empty():
+		path += "?rev=" + ",".join(PackedStringArray(revs))
+	pending_requests += 1
+	connection(port_of(instance_id)).request(path, PackedStringArray([TRACE_HEADER + ": " + trace]),
+		_on_material_request_completed.bind(trace, Time.get_ticks_usec(), instance_id))
+
+
+# Active material of every known Blender; the requests run in parallel, results arrive one by one
+func request_material_all() -> void:
+	if instances.is_empty():
+		logger.log_warning("No Blender instances discovered yet")
 		return
-	var tree: SceneTree = main_loop
-	var http := HTTPRequest.new()
-	tree.root.add_child(http)
-	http.request_completed.connect(_on_material_request_completed.bind(http))
-	var err := http.request(SERVER_URL)
-	if err != OK:
-		logger.log_error("Failed to send material request (%s)" % err)
-		set_status(Status.DISCONNECTED)
-		http.queue_free()
+	for id in instances.keys():
+		request_material(true, id)
 
-func _on_material_request_completed(result: int, response_code: int, headers: PackedStringArray, body: PackedByteArray, http: HTTPRequest) -> void:
-	if is_instance_valid(http):
-		http.queue_free()
+func _on_material_request_completed(result: int, response_code: int, headers: PackedStringArray, body: PackedByteArray, trace: String, started_usec: int, instance_id: String) -> void:
+	pending_requests = max(0, pending_requests - 1)
+	
+	logger.trace_add(trace, "roundtrip", (Time.get_ticks_usec() - started_usec) / 1000.0)
+	for header in headers:
+		if header.to_lower().begins_with("server-timing:"):
+			logger.trace_add_server_timing(trace, header.substr(header.find(":") + 1))
+	if logger.trace_get(trace, "blender.total") > 0.0:
+		logger.trace_add(trace, "transfer", logger.trace_get(trace, "roundtrip") - logger.trace_get(trace, "blender.total"))
 	
 	if result != HTTPRequest.RESULT_SUCCESS:
 		set_status(Status.DISCONNECTED)
 		logger.log_error("Blender server is not available (result %d)" % result)
+		logger.trace_finish(trace)
 		return
 	
 	if response_code != 200:
 		set_status(Status.ERROR)
 		logger.log_error("Blender server returned code %d" % response_code)
+		logger.trace_finish(trace)
 		return
 	
 	if body.is_empty():
 		set_status(Status.ERROR)
 		logger.log_error("Empty response from Blender server")
+		logger.trace_finish(trace)
 		return
 	
+	var parse_start := Time.get_ticks_usec()
 	var text := body.get_string_from_utf8()
 	var data = JSON.parse_string(text)
+	logger.trace_add(trace, "parse", (Time.get_ticks_usec() - parse_start) / 1000.0)
 	
 	if typeof(data) != TYPE_DICTIONARY:
 		set_status(Status.ERROR)
 		logger.log_error("Invalid JSON or response format")
+		logger.trace_finish(trace)
 		return
 	
+	if data.has("delta"):
+		var delta_start := Time.get_ticks_usec()
+		data = payload_cache.resolve(data)
+		logger.trace_add(trace, "delta", (Time.get_ticks_usec() - delta_start) / 1000.0)
+		if data.is_empty():
+			logger.trace_finish(trace)
+			request_material(false, instance_id)
+			return
+	elif data.has("revision"):
+		payload_cache.store(data)
+	# Parser finishes the trace after building the chain
+	data["trace"] = trace
+	# Textures of this material are fetched from the same Blender (ShaderSaver.server_port)
+	data["instance"] = instance_id
+	data["port"] = port_of(instance_id)
+
+	if typeof(data.get("stats")) == TYPE_DICTIONARY:
+		for msg in data["stats"].get("over_budget", []):
+			logger.log_warning("Material %s over budget: %s" % [data.get("material", ""), msg])
+
 	if data.has("nodes") and data.has("links"):
 		var nodes = data["nodes"].size()
 		var links = data["links"].size()
@@ -152,6 +278,9 @@ func _on_material_request_completed(result: int, response_code: int, headers: Pa
 
 func shutdown() -> void:
 	set_status(Status.DISCONNECTED)
+	for port in connections:
+		connections[port].close()
+	connections.clear()
 	if udp:
 		udp.close()
 		udp = null
@@ -172,6 +301,10 @@ func poll_udp() -> void:
 	ensure_udp_bound()
 	if not udp:
 		return
+	if not instances.is_empty():
+		expire_instances()
+		if instances.is_empty():
+			set_status(Status.DISCONNECTED)
 	while udp.get_available_packet_count() > 0:
 		var bytes := udp.get_packet()
 		var txt := bytes.get_string_from_utf8()
@@ -179,9 +312,13 @@ func poll_udp() -> void:
 		if typeof(obj) != TYPE_DICTIONARY or not obj.has("status"):
 			continue
 		match obj["status"]:
-			"started":
+			"started", "announce":
+				update_instance(obj)
 				set_status(Status.CONNECTED)
 			"stopped":
-				set_status(Status.DISCONNECTED)
+				remove_instance(str(obj.get("instance", "")))
+				set_status(Status.CONNECTED if not instances.is_empty() else Status.DISCONNECTED)
 			"error":
 				set_status(Status.ERROR)
+			"progress":
+				logger.log_info("Blender %s: %d/%d" % [obj.get("stage", ""), int(obj.get("done", 0)), int(obj.get("total", 0))])
@@ -15,9 +15,18 @@ var waiting_material: ShaderMaterial
 var waiting_material_path: String = ""
 var fs_connected: bool = false
 var texture_copy_policy: String = "copy_if_outside"
+# Сервер Blender, с которого скачиваются текстуры по хешу (/image/<hash>)
+var server_host: String = "127.0.0.1"
+var server_port: int = 5050
+# Keep-alive connection for /image downloads: all textures of a material go over one socket
+var image_client: HTTPClient
+var image_client_port: int = 0
 var current_material_name: String = ""
 var logger: GslLogger = GslLogger.get_logger()
+var dialog_open: bool = false
 
+# Dialog closed either way (saved or cancelled); the editor shows the next queued one
+signal dialog_closed
 
 
 func _enter_tree() -> void:
@@ -28,20 +37,25 @@ func configure_file_dialog() -> void:
 	file_dialog.file_mode = EditorFileDialog.FILE_MODE_SAVE_FILE
 	file_dialog.access = EditorFileDialog.ACCESS_RESOURCES
 	file_dialog.connect("file_selected", _on_file_selected)
+	file_dialog.canceled.connect(_on_dialog_canceled)
 	add_child(file_dialog)
 
-func save_shader_dialog(builder: ShaderBuilder) -> void:
+func save_shader_dialog(builder: ShaderBuilder, file_name: String = "") -> void:
 	current_builder = builder
 	file_dialog.title = "Save Shader"
 	file_dialog.filters = ["*.gdshader; Godot Shader File"]
-	file_dialog.current_dir = save_path
-	file_dialog.popup_centered(Vector2i(800, 600))
+	_popup_dialog(file_name, ".gdshader")
 
-func save_material_dialog(builder: ShaderBuilder) -> void:
+func save_material_dialog(builder: ShaderBuilder, file_name: String = "") -> void:
 	current_builder = builder
 	file_dialog.title = "Save Material"
 	file_dialog.filters = ["*.tres; Godot Material File"]
+	_popup_dialog(file_name, ".tres")
+
+func _popup_dialog(file_name: String, extension: String) -> void:
 	file_dialog.current_dir = save_path
+	file_dialog.current_file = file_name.validate_filename() + extension if not file_name.is_empty() else ""
+	dialog_open = true
 	file_dialog.popup_centered(Vector2i(800, 600))
 
 func _on_file_selected(path: String) -> void:
@@ -49,6 +63,14 @@ func _on_file_selected(path: String) -> void:
 		save_shader_file(path)
 	elif path.ends_with(".tres"):
 		save_material_file(path)
+	_close_dialog()
+
+func _on_dialog_canceled() -> void:
+	_close_dialog()
+
+func _close_dialog() -> void:
+	dialog_open = false
+	dialog_closed.emit()
 
 func save_shader_file(path: String) -> void:
 	save_path = path.get_base_dir()
@@ -120,7 +142,7 @@ func bind_available_textures_and_collect_waiting(material: ShaderMaterial, build
 	if builder.uniform_resources:
 		for uname in builder.uniform_resources.keys():
 			var res_path: String = str(builder.uniform_resources[uname])
-			res_path = ensure_texture_path(res_path, current_material_name)
+			res_path = ensure_texture_path(res_path, current_material_name, builder.texture_sources.get(uname, {}))
 			if ResourceLoader.exists(res_path):
 				var tex := load(res_path) as Texture2D
 				if tex:
@@ -202,7 +224,9 @@ func handle_save_result(error: Error, path: String, type: String) -> void:
 			logger.log_error("Save error %s (code %d)" % [type, error])
 
 
-func ensure_texture_path(raw_path: String, material_name: String) -> String:
+func ensure_texture_path(raw_path: String, material_name: String, source: Dictionary = {}) -> String:
+	if not str(source.get("hash", "")).is_empty():
+		return ensure_texture_by_hash(raw_path, source)
 	if raw_path.is_empty():
 		return raw_path
 	if raw_path.begins_with("res://"):
@@ -236,3 +260,124 @@ func ensure_texture_path(raw_path: String, material_name: String) -> String:
 			return base_dir + "/" + file_name
 	DirAccess.copy_absolute(abs_src, dst_abs)
 	return base_dir + "/" + file_name
+
+
+# Текстура с хешем содержимого лежит в общей папке под именем с хешем: если файл
+# уже есть, он заведомо тот же и не копируется. Упакованные в .blend изображения
+# (и файлы, которых нет на этой машине) скачиваются с сервера Blender.
+func ensure_texture_by_hash(raw_path: String, source: Dictionary) -> String:
+	if raw_path.begins_with("res://"):
+		return raw_path
+	if texture_copy_policy != "copy_if_outside" and not raw_path.is_empty():
+		return raw_path
+	var image_hash := str(source["hash"])
+	var file_name := str(source.get("file", ""))
+	if file_name.is_empty():
+		file_name = raw_path.get_file()
+	var ext := file_name.get_extension()
+	if ext.is_empty():
+		ext = "png"
+	var base_dir := texture_base_dir
+	if base_dir.is_empty():
+		base_dir = "res://GSL_Textures"
+	var res_path := "%s/%s_%s.%s" % [base_dir.rstrip("/"), file_name.get_basename(), image_hash.left(8), ext]
+	var dst_abs := ProjectSettings.globalize_path(res_path)
+	if FileAccess.file_exists(dst_abs):
+		return res_path
+
+	var dir_abs := dst_abs.get_base_dir()
+	if not DirAccess.dir_exists_absolute(dir_abs) and DirAccess.make_dir_recursive_absolute(dir_abs) != OK:
+		return raw_path
+	if not raw_path.is_empty() and FileAccess.file_exists(raw_path):
+		if DirAccess.copy_absolute(raw_path, dst_abs) == OK:
+			return res_path
+	if download_image(image_hash, dst_abs, int(source.get("bytes", -1))):
+		return res_path
+	logger.log_warning("Texture %s (%s) is unavailable" % [file_name, image_hash])
+	return raw_path
+
+
+func _image_connection() -> HTTPClient:
+	if image_client and image_client_port == server_port:
+		image_client.poll()
+		if image_client.get_status() == HTTPClient.STATUS_CONNECTED:
+			return image_client
+	_drop_image_connection()
+	var client := HTTPClient.new()
+	if client.connect_to_host(server_host, server_port) != OK:
+		return null
+	while client.get_status() in [HTTPClient.STATUS_RESOLVING, HTTPClient.STATUS_CONNECTING]:
+		client.poll()
+		OS.delay_msec(1)
+	if client.get_status() != HTTPClient.STATUS_CONNECTED:
+		return null
+	image_client = client
+	image_client_port = server_port
+	return client
+
+
+func _drop_image_connection() -> void:
+	if image_client:
+		image_client.close()
+	image_client = null
+
+
+# Синхронная загрузка /image/<hash>; недокачанный .part докачивается через Range
+func download_image(image_hash: String, dst_abs: String, expected_size: int = -1) -> bool:
+	var reused := image_client != null and image_client_port == server_port
+	var client := _image_connection()
+	if client == null:
+		return false
+
+	var part_path := dst_abs + ".part"
+	var offset := 0
+	if FileAccess.file_exists(part_path):
+		var existing := FileAccess.open(part_path, FileAccess.READ)
+		if existing:
+			offset = existing.get_length()
+			existing.close()
+	var headers := PackedStringArray()
+	if offset > 0:
+		headers.append("Range: bytes=%d-" % offset)
+	if client.request(HTTPClient.METHOD_GET, "/image/" + image_hash, headers) != OK:
+		_drop_image_connection()
+		return false
+	while client.get_status() == HTTPClient.STATUS_REQUESTING:
+		client.poll()
+		OS.delay_msec(1)
+	if not client.has_response():
+		_drop_image_connection()
+		# Blender may have closed the idle keep-alive socket: one more try over a fresh one
+		return reused and download_image(image_hash, dst_abs, expected_size)
+
+	var code := client.get_response_code()
+	var out: FileAccess
+	if code == 206 and offset > 0:
+		out = FileAccess.open(part_path, FileAccess.READ_WRITE)
+		if out:
+			out.seek_end()
+	elif code == 200:
+		out = FileAccess.open(part_path, FileAccess.WRITE)
+	else:
+		logger.log_warning("Blender server returned %d for texture %s" % [code, image_hash])
+		_drop_image_connection()  # unread body would be taken for the next response
+		return false
+	if out == null:
+		_drop_image_connection()
+		return false
+
+	while client.get_status() == HTTPClient.STATUS_BODY:
+		client.poll()
+		var chunk := client.read_response_body_chunk()
+		if chunk.is_empty():
+			OS.delay_msec(1)
+		else:
+			out.store_buffer(chunk)
+	var size := out.get_length()
+	out.close()
+	if client.get_status() != HTTPClient.STATUS_CONNECTED:
+		_drop_image_connection()
+
+	if expected_size >= 0 and size != expected_size:
+		return false
+	return DirAccess.rename_absolute(part_path, dst_abs) == OK
@@ -9,6 +9,8 @@ enum Mode { CONST, LINEAR }
 
 @export var mode: int = Mode.LINEAR
 @export var gradient: Gradient = Gradient.new()
+# LUT baked by the Blender exporter: {"size", "format": "rgba32f"|"rgba8", "data": base64}
+var lut: Dictionary = {}
 
 
 func _init() -> void:
@@ -121,6 +123,9 @@ func set_uniform_override(name: String, value) -> void:
 			gradient.interpolation_mode = Gradient.GRADIENT_INTERPOLATE_LINEAR
 	elif name == "stops":
 		update_gradient_from_stops(value)
+	elif name == "lut":
+		if typeof(value) == TYPE_DICTIONARY:
+			lut = value
 	else:
 		super.set_uniform_override(name, value)
 
@@ -142,9 +147,30 @@ func update_gradient_from_stops(stops) -> void:
 		gradient.add_point(pos, col)
 
 
+func build_lut_texture() -> Texture2D:
+	var size := int(lut.get("size", 0))
+	if size < 2:
+		return null
+	var fmt := Image.FORMAT_RGBAF
+	var texel_bytes := 16
+	if str(lut.get("format", "")) == "rgba8":
+		fmt = Image.FORMAT_RGBA8
+		texel_bytes = 4
+	var raw := Marshalls.base64_to_raw(str(lut.get("data", "")))
+	if raw.size() != size * texel_bytes:
+		return null
+	var img := Image.create_from_data(size, 1, false, fmt, raw)
+	return ImageTexture.create_from_image(img)
+
+
 func register_gradient_resource(builder: ShaderBuilder) -> void:
+	var uniform_name := get_prefixed_name("colormap")
+	if not lut.is_empty():
+		var lut_tex := build_lut_texture()
+		if lut_tex:
+			builder.uniform_object_resources[uniform_name] = lut_tex
+			return
 	var tex := GradientTexture2D.new()
 	tex.gradient = gradient
 	tex.width = 257
-	var uniform_name := get_prefixed_name("colormap")
 	builder.uniform_object_resources[uniform_name] = tex
@@ -18,6 +18,9 @@ enum AlphaModeType { STRAIGHT, PREMULTIPLIED, CHANNEL_PACKED, NONE }
 @export_enum("sRGB", "Non-Color") var color_space: int = ColorSpaceType.SRGB
 @export_enum("Straight", "Premultiplied", "ChannelPacked", "None") var alpha_mode: int = AlphaModeType.STRAIGHT
 
+# sampler другого модуля с тем же изображением (params.sampler из экспортёра); пусто — свой
+var shared_sampler: String = ""
+
 func _init() -> void:
 	super._init()
 	module_name = "Texture Image"
@@ -45,8 +48,13 @@ func get_include_files() -> Array[String]:
 func get_required_shared_varyings() -> Array[int]:
 	return [ShaderSpec.SharedVar.OBJECT_NORMAL]
 
+func get_sampler_name() -> String:
+	if not shared_sampler.is_empty():
+		return shared_sampler
+	return get_prefixed_name("image_texture")
+
 func get_uniform_definitions() -> Dictionary:
-	return {
+	var defs := {
 		"image_texture": [ShaderSpec.ShaderType.SAMPLER2D, null],
 		"interpolation": [ShaderSpec.ShaderType.INT, interpolation, ShaderSpec.UniformHint.ENUM, ["Linear","Closest","Cubic"]],
 		"projection": [ShaderSpec.ShaderType.INT, projection, ShaderSpec.UniformHint.ENUM, ["Flat","Box","Sphere","Tube"]],
@@ -55,6 +63,9 @@ func get_uniform_definitions() -> Dictionary:
 		"color_space": [ShaderSpec.ShaderType.INT, color_space, ShaderSpec.UniformHint.ENUM, ["sRGB","Non-Color"]],
 		"alpha_mode": [ShaderSpec.ShaderType.INT, alpha_mode, ShaderSpec.UniformHint.ENUM, ["Straight","Premultiplied","ChannelPacked","None"]],
 	}
+	if not shared_sampler.is_empty():
+		defs.erase("image_texture")
+	return defs
 
 func get_code_blocks() -> Dictionary:
 	var outputs = get_output_vars()
@@ -70,6 +81,7 @@ func get_code_blocks() -> Dictionary:
 		"coord": coord_expr,
 		"color": outputs["Color"],
 		"alpha": outputs["Alpha"],
+		"sampler": get_sampler_name(),
 		"object_normal": ShaderSpec.shared_var_name(ShaderSpec.SharedVar.OBJECT_NORMAL),
 	}
 
@@ -85,7 +97,7 @@ params_{uid}.alpha_mode     = u_{uid}_alpha_mode;
 
 vec4 tex_{uid} = _sample_image(vec3({coord}), 
 								{object_normal} * ROT_X(-90.0),
-								u_{uid}_image_texture,
+								{sampler},
 								params_{uid});
 
 vec4 {color} = tex_{uid};
@@ -13,6 +13,10 @@ var GSL_logger : GslLogger = GslLogger.get_logger()
 
 enum SaveMode { NONE, SHADER, MATERIAL }
 var save_mode: int = SaveMode.NONE
+# Builders waiting for their save dialog: {builder, mode, port, name}. Pulling from
+# several Blender instances yields several builders, the dialogs are shown one by one
+var save_queue: Array[Dictionary] = []
+var incoming: Dictionary = {}
 
 
 func _ready() -> void:
@@ -22,6 +26,9 @@ func _ready() -> void:
 	SSL_inst.check_server()
 	status_module.refresh_status.connect(_on_refresh_status)
 	SSL_inst.material_data_received.connect(_on_material_data_received)
+	SSL_inst.instances_changed.connect(_on_instances_changed)
+	status_module.instance_selected.connect(_on_instance_selected)
+	Saver_inst.dialog_closed.connect(_show_next_save_dialog)
 	Parser_inst.builder_ready.connect(builder_ready)
 	GSL_logger.message_emitted.connect(_on_log_message)
 	action_panel.create_shader.connect(_on_create_shader_pressed)
@@ -41,6 +48,7 @@ func _exit_tree() -> void:
 func _process(_delta: float) -> void:
 	if SSL_inst:
 		SSL_inst.poll_udp()
+		SSL_inst.poll_http()
 
 func _on_server_status_changed(status: ServerStatusListener.Status) -> void:
 	call_deferred("update_server_status", status)
@@ -48,6 +56,14 @@ func _on_server_status_changed(status: ServerStatusListener.Status) -> void:
 func update_server_status(status: ServerStatusListener.Status) -> void:
 	status_module.set_status(status)
 
+func _on_instances_changed() -> void:
+	if SSL_inst:
+		status_module.set_instances(SSL_inst.instance_labels(), SSL_inst.selected_instance)
+
+func _on_instance_selected(instance_id: String) -> void:
+	if SSL_inst:
+		SSL_inst.select_instance(instance_id)
+
 func _on_log_message(text: String) -> void:
 	log_module.append_line(text)
 
@@ -72,11 +88,27 @@ func _on_bake_aabb_pressed() -> void:
 	GSL_logger.log_success("AABB baked")
 
 func builder_ready(builder: ShaderBuilder) -> void:
-	if save_mode == SaveMode.SHADER:
-		Saver_inst.save_shader_dialog(builder)
-	elif save_mode == SaveMode.MATERIAL:
-		Saver_inst.save_material_dialog(builder)
-	save_mode = SaveMode.NONE
+	if save_mode != SaveMode.NONE:
+		save_queue.append({
+			"builder": builder,
+			"mode": save_mode,
+			"port": int(incoming.get("port", SSL_inst.selected_port() if SSL_inst else ServerStatusListener.DEFAULT_PORT)),
+			"name": str(incoming.get("material", "")),
+		})
+	if not SSL_inst or SSL_inst.pending_requests == 0:
+		save_mode = SaveMode.NONE
+	_show_next_save_dialog()
+
+func _show_next_save_dialog() -> void:
+	if Saver_inst.dialog_open or save_queue.is_empty():
+		return
+	var entry: Dictionary = save_queue.pop_front()
+	# Textures are fetched from the Blender that sent this material
+	Saver_inst.server_port = entry["port"]
+	if entry["mode"] == SaveMode.SHADER:
+		Saver_inst.save_shader_dialog(entry["builder"], entry["name"])
+	else:
+		Saver_inst.save_material_dialog(entry["builder"], entry["name"])
 
 
 func _on_debug_logging_changed(enabled: bool) -> void:
@@ -132,7 +164,9 @@ func _on_save_tex_path_changed(path: String) -> void:
 		Saver_inst.texture_base_dir = cleaned
 
 func _on_material_data_received(data: Dictionary) -> void:
+	incoming = data
 	Parser_inst.data_transfer(data)
+	incoming = {}
 
 
 func _can_request_material() -> bool:
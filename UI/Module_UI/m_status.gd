@@ -5,9 +5,13 @@ extends MarginContainer
 @onready var color_rect: TextureRect = %ColorRect
 @onready var info: Label = %Info
 @onready var button: Button = %Button
+@onready var instances_button: OptionButton = %Instances
 @onready var shader = preload("res://addons/godot_shader_linker_(gsl)/UI/status_dot.gdshader")
 
 signal refresh_status
+signal instance_selected(instance_id: String)
+
+var instance_ids: Array[String] = []
 
 func _ready() -> void:
 	button.icon = get_theme_icon("Reload", "EditorIcons")
@@ -22,5 +26,25 @@ func set_status(status: ServerStatusListener.Status) -> void:
 	color_rect.material.set_shader_parameter("dot_color", ServerStatusListener.get_status_color(status))
 
 
+# Blender instances for the picker; "All instances" is offered once there are several
+func set_instances(labels: Dictionary, selected: String) -> void:
+	instances_button.clear()
+	instance_ids.clear()
+	for id in labels:
+		instances_button.add_item(labels[id])
+		instance_ids.append(id)
+	if labels.size() > 1:
+		instances_button.add_item("All instances")
+		instance_ids.append(ServerStatusListener.ALL_INSTANCES)
+	instances_button.visible = not instance_ids.is_empty()
+	if not instance_ids.is_empty():
+		instances_button.select(max(0, instance_ids.find(selected)))
+
+
+func _on_instances_item_selected(index: int) -> void:
+	if index >= 0 and index < instance_ids.size():
+		instance_selected.emit(instance_ids[index])
+
+
 func _on_button_pressed() -> void:
 	refresh_status.emit()